@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark: single-pass encoding detection vs sequential full-file decode retries
+Generates a mixed-encoding corpus and times both strategies over it
+"""
+
+import argparse
+import codecs
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docreader_encoding import decode_bytes
+
+SAMPLE = "Café naïve résumé — “quoted” text, line {n}\n"
+
+CORPUS_ENCODINGS = {
+    "utf-8": lambda text: text.encode("utf-8"),
+    "utf-8-bom": lambda text: codecs.BOM_UTF8 + text.encode("utf-8"),
+    "cp1252": lambda text: text.encode("cp1252"),
+    "latin-1": lambda text: text.replace("—", "-").replace("“", '"').replace("”", '"').encode("latin-1"),
+    "utf-16": lambda text: text.encode("utf-16"),
+    # Mostly ASCII with a single latin-1 byte near the end: UTF-8 only fails after decoding nearly everything
+    "late-latin-1": lambda text: text.encode("ascii", errors="replace") + "fin\xe9\n".encode("latin-1"),
+}
+
+
+def build_corpus(root: str, files_per_encoding: int, lines: int):
+    """Write files_per_encoding files of each encoding and return their paths"""
+    text = "".join(SAMPLE.format(n=n) for n in range(lines))
+    paths = []
+    for name, encode in CORPUS_ENCODINGS.items():
+        data = encode(text)
+        for i in range(files_per_encoding):
+            path = os.path.join(root, f"{name}-{i}.txt")
+            with open(path, 'wb') as f:
+                f.write(data)
+            paths.append(path)
+    return paths
+
+
+def legacy_read(path: str):
+    """The original strategy: reopen and fully decode the file once per candidate encoding"""
+    for encoding in ['utf-8', 'utf-8-sig', 'latin-1', 'cp1252']:
+        try:
+            with open(path, 'r', encoding=encoding) as f:
+                return f.read(), encoding
+        except UnicodeDecodeError:
+            continue
+    return None, None
+
+
+def detected_read(path: str):
+    """Read once, sniff the encoding and decode from memory"""
+    with open(path, 'rb') as f:
+        return decode_bytes(f.read())
+
+
+def time_strategy(read, paths, repeat: int) -> float:
+    """Return the fastest of repeat passes over the corpus"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for path in paths:
+            read(path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=20, help="Files per encoding")
+    parser.add_argument("--lines", type=int, default=20_000, help="Lines per file")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes per strategy (best is reported)")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="bench-encoding-")
+    try:
+        paths = build_corpus(root, args.files, args.lines)
+        total_mb = sum(os.path.getsize(p) for p in paths) / (1024 * 1024)
+        print(f"Corpus: {len(paths)} files, {total_mb:.1f} MB")
+        print(f"{'encoding':<12}{'legacy':>14}{'detected':>14}{'speedup':>10}  legacy -> detected")
+        for name in CORPUS_ENCODINGS:
+            group = [p for p in paths if os.path.basename(p).rsplit("-", 1)[0] == name]
+            legacy = time_strategy(legacy_read, group, args.repeat)
+            detected = time_strategy(detected_read, group, args.repeat)
+            chosen = f"{legacy_read(group[0])[1]} -> {detected_read(group[0])[1]}"
+            print(f"{name:<12}{legacy:>13.3f}s{detected:>13.3f}s{legacy / detected:>10.2f}  {chosen}")
+        legacy = time_strategy(legacy_read, paths, args.repeat)
+        detected = time_strategy(detected_read, paths, args.repeat)
+        print(f"{'all':<12}{legacy:>13.3f}s{detected:>13.3f}s{legacy / detected:>10.2f}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark: peak memory of a columnar DocumentListing vs the list of document dicts
+Builds and sorts synthetic listings in fresh subprocesses and reports peak RSS above the import baseline
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, Any, Iterator
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docreader_walker import DocumentEntry, make_document_record
+from docreader_listing import DocumentListing
+
+ROOT = "/srv/docs"
+FILES_PER_DIR = 50
+EXTENSIONS = ['.md', '.txt', '.markdown', '.text']
+
+
+def synthetic_entries(count: int) -> Iterator[DocumentEntry]:
+    """Walker entries for count documents spread over nested directories, generated lazily"""
+    for i in range(count):
+        dir_number = i // FILES_PER_DIR
+        rel_dir = os.path.join(f"team{dir_number % 10}", f"project{dir_number % 1000}", f"notes{dir_number}")
+        yield rel_dir, f"document-{i:07d}{EXTENSIONS[i % len(EXTENSIONS)]}", 1000 + i % 50000, 1.7e9 + i
+
+
+def peak_rss_kb() -> int:
+    """Peak resident set size of this process in KiB (VmHWM)"""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1])
+    return 0
+
+
+def reset_peak_rss():
+    """Reset VmHWM to the current RSS so the measurement excludes interpreter start-up"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def build_dicts(count: int) -> int:
+    """The previous representation: a sorted list of find_documents dicts"""
+    documents = [make_document_record(ROOT, *entry) for entry in synthetic_entries(count)]
+    documents.sort(key=lambda doc: (doc["name"].lower(), doc["relative_path"]))
+    return len(documents)
+
+
+def build_listing(count: int) -> int:
+    """The columnar representation used by list_documents"""
+    listing = DocumentListing(ROOT, synthetic_entries(count))
+    listing.sort()
+    return len(listing)
+
+
+MODES = {"dicts": build_dicts, "listing": build_listing}
+
+
+def run_mode(mode: str, count: int) -> Dict[str, Any]:
+    """Measure one representation in this process"""
+    reset_peak_rss()
+    baseline = peak_rss_kb()
+    start = time.perf_counter()
+    documents = MODES[mode](count)
+    seconds = time.perf_counter() - start
+    return {"documents": documents, "peak_kb": peak_rss_kb() - baseline, "seconds": seconds}
+
+
+def measure(mode: str, count: int) -> Dict[str, Any]:
+    """Run one representation in a fresh interpreter so peaks do not carry over"""
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--run", mode, "--sizes", str(count)],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="100000,1000000", help="Comma-separated listing sizes")
+    parser.add_argument("--run", choices=sorted(MODES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    if args.run:
+        print(json.dumps(run_mode(args.run, sizes[0])))
+        return
+
+    print(f"{'documents':>10}{'representation':>16}{'peak MiB':>10}{'bytes/doc':>11}{'seconds':>9}{'saving':>8}")
+    for count in sizes:
+        dicts = measure("dicts", count)
+        listing = measure("listing", count)
+        for name, result in (("dicts", dicts), ("listing", listing)):
+            saving = dicts["peak_kb"] / result["peak_kb"] if result["peak_kb"] else 0.0
+            print(f"{count:>10}{name:>16}{result['peak_kb'] / 1024:>10.1f}"
+                  f"{result['peak_kb'] * 1024 / count:>11.0f}{result['seconds']:>9.2f}{saving:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
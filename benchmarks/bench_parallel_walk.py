@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark: parallel directory traversal on a simulated high-latency filesystem
+Injects an artificial delay into every os.scandir call to stand in for NFS/SMB shares
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docreader_walker import IgnoreRules, walk_documents, make_document_record, document_sort_key
+from bench_walker import EXTENSIONS, build_tree
+
+
+def install_scandir_latency(latency: float):
+    """Wrap os.scandir so every directory listing pays a fixed round-trip delay"""
+    real_scandir = os.scandir
+
+    def slow_scandir(path='.'):
+        time.sleep(latency)
+        return real_scandir(path)
+
+    os.scandir = slow_scandir
+
+
+def run(root: str, parallelism: int):
+    """Walk root with the given parallelism and return the sorted document list"""
+    rules = IgnoreRules(names=(), use_gitignore=False)
+    documents = [
+        make_document_record(root, rel_dir, name, size, mtime)
+        for rel_dir, name, size, mtime in walk_documents(root, EXTENSIONS, True, rules, parallelism)
+    ]
+    documents.sort(key=document_sort_key)
+    return documents
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=20_000, help="Number of files in the synthetic tree")
+    parser.add_argument("--files-per-dir", type=int, default=20, help="Files per synthetic directory")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Artificial delay per scandir call")
+    parser.add_argument("--workers", default="1,2,4,8,16,32", help="Comma-separated worker counts to test")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="bench-parallel-")
+    try:
+        build_tree(root, args.files, files_per_dir=args.files_per_dir)
+        install_scandir_latency(args.latency_ms / 1000.0)
+
+        baseline = None
+        baseline_time = None
+        print(f"{'workers':>8}{'documents':>11}{'seconds':>10}{'speedup':>10}{'same output':>13}")
+        for workers in [int(w) for w in args.workers.split(',')]:
+            start = time.perf_counter()
+            documents = run(root, workers)
+            elapsed = time.perf_counter() - start
+            if baseline is None:
+                baseline, baseline_time = documents, elapsed
+            same = "yes" if documents == baseline else "NO"
+            print(f"{workers:>8}{len(documents):>11}{elapsed:>10.3f}{baseline_time / elapsed:>10.2f}{same:>13}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
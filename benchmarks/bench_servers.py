@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Benchmark: trace replay against the MCP servers over stdio
+Launches a server as a subprocess, replays a recorded or synthetic JSON-RPC trace and reports latency, throughput and peak RSS
+
+Examples:
+  python benchmarks/bench_servers.py docreader --files 20000 --requests 5000 --output docreader.json
+  python benchmarks/bench_servers.py docreader --compare docreader.json
+  python benchmarks/bench_servers.py tts --requests 2000
+  python benchmarks/bench_servers.py docreader --trace session.jsonl --root ~/notes
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVERS = {
+    "docreader": "mcp_document_reader.py",
+    "tts": "mcp_tts_windows.py",
+}
+
+DEFAULT_MIXES = {
+    "docreader": "read_document=6,get_document_info=3,list_documents=1",
+    "tts": "windows_tts=4,get_speech_status=3,list_voices=2,flush_speech=1",
+}
+
+WORDS = ("alpha beta gamma delta server index cache latency document request "
+         "throughput voice queue stream buffer thread walker search token").split()
+
+
+def build_corpus(root: str, files: int, file_bytes: int, files_per_dir: int = 50, seed: int = 1) -> List[str]:
+    """Create a nested tree of .md/.txt files filled with text, returning their paths"""
+    rng = random.Random(seed)
+    paths = []
+    for index in range(files):
+        dir_index = index // files_per_dir
+        directory = os.path.join(root, f"d{dir_index % 10}", f"d{dir_index // 10}")
+        if index % files_per_dir == 0:
+            os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"doc{index}{'.md' if index % 2 else '.txt'}")
+        lines = []
+        size = 0
+        while size < file_bytes:
+            line = " ".join(rng.choice(WORDS) for _ in range(10))
+            lines.append(line)
+            size += len(line) + 1
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+        paths.append(path)
+    return paths
+
+
+def parse_mix(mix: str) -> Dict[str, int]:
+    """Parse "tool=weight,tool=weight" into a dict"""
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        weights[name.strip()] = int(weight or 1)
+    return weights
+
+
+def synthetic_trace(server: str, requests: int, mix: Dict[str, int], paths: List[str], root: str,
+                    list_limit: int, seed: int = 2) -> List[Dict[str, Any]]:
+    """Generate tools/call requests drawn from a weighted tool mix"""
+    rng = random.Random(seed)
+    tools = list(mix)
+    weights = [mix[name] for name in tools]
+    trace = []
+    for _ in range(requests):
+        tool = rng.choices(tools, weights)[0]
+        if tool in ("read_document", "get_document_info"):
+            arguments = {"file_path": rng.choice(paths)}
+        elif tool == "list_documents":
+            arguments = {"directory": root, "limit": list_limit}
+        elif tool == "search_documents":
+            arguments = {"query": " ".join(rng.sample(WORDS, 2)), "directory": root}
+        elif tool == "windows_tts":
+            arguments = {"text": " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 20))) + "."}
+        else:
+            arguments = {}
+        trace.append({"jsonrpc": "2.0", "method": "tools/call", "params": {"name": tool, "arguments": arguments}})
+    return trace
+
+
+def load_trace(path: str) -> List[Any]:
+    """Read a recorded trace: one JSON-RPC request (or batch array) per line"""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def request_label(request: Any) -> str:
+    """Name a request for the per-operation breakdown"""
+    if isinstance(request, list):
+        return "batch"
+    if request.get("method") == "tools/call":
+        return (request.get("params") or {}).get("name", "tools/call")
+    return request.get("method", "?")
+
+
+def peak_rss_kb(pid: int) -> Optional[int]:
+    """Peak resident set size of a running process in KB (Linux only)"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds"""
+    values = sorted(latencies)
+    return {
+        "count": len(values),
+        "mean_ms": sum(values) / len(values) * 1000 if values else 0.0,
+        "p50_ms": percentile(values, 0.50) * 1000,
+        "p95_ms": percentile(values, 0.95) * 1000,
+        "p99_ms": percentile(values, 0.99) * 1000,
+        "max_ms": values[-1] * 1000 if values else 0.0,
+    }
+
+
+def replay(command: List[str], env: Dict[str, str], trace: List[Any], window: int) -> Dict[str, Any]:
+    """Replay a trace keeping up to window requests in flight; returns latencies and resource use"""
+    process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                               cwd=REPO_ROOT, env=env)
+
+    def exchange(request: Dict[str, Any]):
+        process.stdin.write(json.dumps(request).encode("utf-8") + b"\n")
+        process.stdin.flush()
+        return json.loads(process.stdout.readline())
+
+    # The handshake (and process start-up) is not part of the measurement
+    exchange({"jsonrpc": "2.0", "id": "warmup", "method": "initialize", "params": {}})
+
+    slots = threading.BoundedSemaphore(window)
+    sent_at: Dict[str, float] = {}
+    labels: Dict[str, str] = {}
+    latencies: Dict[str, List[float]] = {}
+    errors = [0]
+    expected = [0]
+    done = threading.Event()
+    lock = threading.Lock()
+
+    def read_responses():
+        received = 0
+        for line in process.stdout:
+            now = time.perf_counter()
+            response = json.loads(line)
+            first = response[0] if isinstance(response, list) and response else response
+            key = str(first.get("id")).split(".")[0]
+            if isinstance(response, dict) and "error" in response:
+                errors[0] += 1
+            with lock:
+                start = sent_at.pop(key, None)
+                label = labels.pop(key, "?")
+            if start is not None:
+                latencies.setdefault(label, []).append(now - start)
+            slots.release()
+            received += 1
+            if received == expected[0]:
+                break
+        done.set()
+
+    # Requests get fresh ids; batch elements are numbered "<seq>.<n>"; notifications are not waited for
+    prepared = []
+    for seq, request in enumerate(trace):
+        if isinstance(request, list):
+            elements = [dict(element, id=f"{seq}.{n}") if "id" in element else element
+                        for n, element in enumerate(request)]
+            prepared.append((str(seq), request_label(request), elements, any("id" in e for e in request)))
+        else:
+            waits = "id" in request or request.get("method") == "tools/call"
+            prepared.append((str(seq), request_label(request), dict(request, id=seq) if waits else request, waits))
+    expected[0] = sum(1 for item in prepared if item[3])
+
+    reader = threading.Thread(target=read_responses, daemon=True)
+    reader.start()
+    start = time.perf_counter()
+    for key, label, request, waits in prepared:
+        line = json.dumps(request).encode("utf-8") + b"\n"
+        if waits:
+            slots.acquire()
+            with lock:
+                labels[key] = label
+                sent_at[key] = time.perf_counter()
+        process.stdin.write(line)
+        process.stdin.flush()
+    if expected[0]:
+        done.wait()
+    elapsed = time.perf_counter() - start
+
+    rss = peak_rss_kb(process.pid)
+    process.stdin.close()
+    process.wait()
+    if rss is None:
+        try:
+            import resource
+            rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        except ImportError:
+            rss = None
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    return {
+        "requests": len(all_latencies),
+        "errors": errors[0],
+        "seconds": elapsed,
+        "requests_per_sec": len(all_latencies) / elapsed if elapsed else 0.0,
+        "latency": summarize(all_latencies),
+        "by_operation": {label: summarize(values) for label, values in sorted(latencies.items())},
+        "peak_rss_kb": rss,
+    }
+
+
+def print_report(results: Dict[str, Any], baseline: Dict[str, Any] = None):
+    """Print the run summary, with changes against a baseline run if given"""
+    def delta(path: List[str]) -> str:
+        if baseline is None:
+            return ""
+        old, new = baseline["results"], results["results"]
+        for key in path:
+            old, new = (old or {}).get(key), (new or {}).get(key)
+        if not old or new is None:
+            return ""
+        return f"  ({(new - old) / old * 100:+.1f}%)"
+
+    run = results["results"]
+    latency = run["latency"]
+    print(f"{results['server']}: {run['requests']} requests in {run['seconds']:.2f}s, "
+          f"window {results['config']['window']}, {run['errors']} errors")
+    print(f"  requests/sec  {run['requests_per_sec']:>10.0f}{delta(['requests_per_sec'])}")
+    for name in ("p50_ms", "p95_ms", "p99_ms"):
+        print(f"  {name:<13} {latency[name]:>10.3f}{delta(['latency', name])}")
+    if run["peak_rss_kb"] is not None:
+        print(f"  peak RSS      {run['peak_rss_kb'] / 1024:>8.1f}MB{delta(['peak_rss_kb'])}")
+    print(f"  {'operation':<22}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for label, summary in run["by_operation"].items():
+        print(f"  {label:<22}{summary['count']:>8}{summary['p50_ms']:>10.3f}"
+              f"{summary['p95_ms']:>10.3f}{summary['p99_ms']:>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("server", choices=sorted(SERVERS), help="Server to benchmark")
+    parser.add_argument("--trace", help="Recorded trace to replay (JSON-RPC request per line) instead of a synthetic one")
+    parser.add_argument("--save-trace", help="Write the synthetic trace here so it can be replayed with --trace")
+    parser.add_argument("--requests", type=int, default=5000, help="Synthetic trace length")
+    parser.add_argument("--mix", help="Synthetic tool mix as tool=weight,... (default depends on server)")
+    parser.add_argument("--window", type=int, default=1, help="Requests kept in flight (1 = one at a time)")
+    parser.add_argument("--files", type=int, default=5000, help="Documents in the generated corpus (docreader)")
+    parser.add_argument("--file-bytes", type=int, default=4096, help="Size of each generated document")
+    parser.add_argument("--list-limit", type=int, default=100, help="Page size of synthetic list_documents calls")
+    parser.add_argument("--root", help="Existing document directory to use instead of a generated corpus")
+    parser.add_argument("--char-delay", type=float, default=0.0,
+                        help="Seconds of simulated speech per character in the fake TTS host")
+    parser.add_argument("--output", help="Save results as JSON to this path")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    temp_dir = tempfile.mkdtemp(prefix="bench-servers-")
+    try:
+        paths: List[str] = []
+        root = args.root
+        if args.server == "docreader":
+            env["DOCREADER_CACHE_DIR"] = os.path.join(temp_dir, "cache")
+            if root is None and args.trace is None:
+                root = os.path.join(temp_dir, "corpus")
+                start = time.perf_counter()
+                paths = build_corpus(root, args.files, args.file_bytes)
+                print(f"Built corpus of {args.files} documents in {time.perf_counter() - start:.1f}s")
+            elif root is not None:
+                paths = [os.path.join(d, n) for d, _, names in os.walk(root) for n in names
+                         if n.endswith((".md", ".txt"))]
+        else:
+            host = [sys.executable, os.path.join(REPO_ROOT, "tools", "fake_tts_host.py")]
+            env["TTS_HOST_COMMAND"] = " ".join(f'"{part}"' if " " in part else part for part in host)
+            env["FAKE_TTS_CHAR_DELAY"] = str(args.char_delay)
+            env["TTS_AUDIO_CACHE_DIR"] = os.path.join(temp_dir, "audio")
+
+        if args.trace:
+            trace = load_trace(args.trace)
+        else:
+            mix = parse_mix(args.mix or DEFAULT_MIXES[args.server])
+            trace = synthetic_trace(args.server, args.requests, mix, paths, root, args.list_limit)
+            if args.save_trace:
+                with open(args.save_trace, "w", encoding="utf-8") as f:
+                    f.writelines(json.dumps(request) + "\n" for request in trace)
+
+        command = [sys.executable, os.path.join(REPO_ROOT, SERVERS[args.server])]
+        results = {
+            "server": args.server,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {
+                "trace": args.trace,
+                "requests": len(trace),
+                "mix": None if args.trace else (args.mix or DEFAULT_MIXES[args.server]),
+                "window": args.window,
+                "files": len(paths),
+                "file_bytes": args.file_bytes,
+            },
+            "results": replay(command, env, trace, max(1, args.window)),
+        }
+
+        baseline = None
+        if args.compare:
+            with open(args.compare, encoding="utf-8") as f:
+                baseline = json.load(f)
+        print_report(results, baseline)
+
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+            print(f"Saved results to {args.output}")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Benchmark: single-pass scandir walker vs the legacy per-extension glob loop
+Builds a synthetic document tree and times both discovery paths over it
+"""
+
+import argparse
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Dict, Any, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docreader_walker import IgnoreRules, walk_documents, make_document_record
+
+EXTENSIONS = ['.md', '.txt', '.markdown', '.text']
+NOISE_EXTENSIONS = ['.py', '.json', '.png', '.js']
+
+
+def build_tree(root: str, files: int, files_per_dir: int = 50, fanout: int = 10):
+    """Create a synthetic tree with a mix of document and non-document files"""
+    created = 0
+    dir_index = 0
+    all_exts = EXTENSIONS + NOISE_EXTENSIONS
+    while created < files:
+        parts = []
+        n = dir_index
+        while True:
+            parts.append(f"d{n % fanout}")
+            n //= fanout
+            if n == 0:
+                break
+        directory = os.path.join(root, *parts)
+        os.makedirs(directory, exist_ok=True)
+        for i in range(min(files_per_dir, files - created)):
+            ext = all_exts[(created + i) % len(all_exts)]
+            with open(os.path.join(directory, f"file{i}{ext}"), 'w') as f:
+                f.write("x")
+        created += files_per_dir
+        dir_index += 1
+    node_modules = os.path.join(root, "node_modules", "pkg")
+    os.makedirs(node_modules, exist_ok=True)
+    for i in range(max(1, files // 20)):
+        with open(os.path.join(node_modules, f"readme{i}.md"), 'w') as f:
+            f.write("x")
+
+
+def legacy_find_documents(directory: str, recursive: bool = True) -> List[Dict[str, Any]]:
+    """The original glob-per-extension implementation of find_documents"""
+    documents = []
+    pattern = "**/*" if recursive else "*"
+    for ext in EXTENSIONS:
+        search_pattern = os.path.join(directory, pattern + ext)
+        for file_path in glob.glob(search_pattern, recursive=recursive):
+            if os.path.isfile(file_path):
+                try:
+                    stat = os.stat(file_path)
+                    documents.append({
+                        "path": os.path.abspath(file_path),
+                        "name": os.path.basename(file_path),
+                        "extension": os.path.splitext(file_path)[1],
+                        "size": stat.st_size,
+                        "modified": stat.st_mtime,
+                        "relative_path": os.path.relpath(file_path, directory)
+                    })
+                except OSError:
+                    continue
+    documents.sort(key=lambda x: x['name'].lower())
+    return documents
+
+
+def walker_find_documents(directory: str, rules: IgnoreRules) -> List[Dict[str, Any]]:
+    """The scandir walker path of find_documents"""
+    root = os.path.abspath(directory)
+    documents = [
+        make_document_record(root, rel_dir, name, size, mtime)
+        for rel_dir, name, size, mtime in walk_documents(root, EXTENSIONS, True, rules)
+    ]
+    documents.sort(key=lambda x: x['name'].lower())
+    return documents
+
+
+def best_of(func, repeat: int) -> float:
+    """Return the fastest wall time of repeat runs"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=100_000, help="Number of files in the synthetic tree")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per implementation (best is reported)")
+    parser.add_argument("--root", help="Existing directory to benchmark instead of a synthetic tree")
+    args = parser.parse_args()
+
+    root = args.root
+    temp_dir = None
+    if root is None:
+        temp_dir = tempfile.mkdtemp(prefix="bench-walker-")
+        root = temp_dir
+        start = time.perf_counter()
+        build_tree(root, args.files)
+        print(f"Built synthetic tree of {args.files} files in {time.perf_counter() - start:.1f}s")
+
+    try:
+        no_pruning = IgnoreRules(names=(), use_gitignore=False)
+        default_rules = IgnoreRules()
+
+        legacy_count = len(legacy_find_documents(root))
+        walker_count = len(walker_find_documents(root, no_pruning))
+        pruned_count = len(walker_find_documents(root, default_rules))
+
+        legacy = best_of(lambda: legacy_find_documents(root), args.repeat)
+        walker = best_of(lambda: walker_find_documents(root, no_pruning), args.repeat)
+        pruned = best_of(lambda: walker_find_documents(root, default_rules), args.repeat)
+
+        print(f"{'implementation':<28}{'documents':>10}{'seconds':>10}{'speedup':>10}")
+        print(f"{'glob per extension':<28}{legacy_count:>10}{legacy:>10.3f}{1.0:>10.2f}")
+        print(f"{'scandir walker':<28}{walker_count:>10}{walker:>10.3f}{legacy / walker:>10.2f}")
+        print(f"{'scandir walker + ignores':<28}{pruned_count:>10}{pruned:>10.3f}{legacy / pruned:>10.2f}")
+    finally:
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
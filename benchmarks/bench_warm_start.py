@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark: time to the first list_documents response after the document reader starts
+Starts the server over a synthetic tree with an empty cache, then again with the snapshot the first run left behind
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, Any
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_ROOT)
+
+from bench_walker import build_tree
+
+
+def first_listing(root: str, cache_dir: str, limit: int) -> Dict[str, Any]:
+    """Start a server in root and time the handshake and the first page of its listing"""
+    env = dict(os.environ, DOCREADER_CACHE_DIR=cache_dir)
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, os.path.join(REPO_ROOT, "mcp_document_reader.py")],
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                               cwd=root, env=env)
+
+    def exchange(request: Dict[str, Any]) -> Dict[str, Any]:
+        process.stdin.write(json.dumps(request).encode("utf-8") + b"\n")
+        process.stdin.flush()
+        return json.loads(process.stdout.readline())
+
+    try:
+        exchange({"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {}})
+        ready = time.perf_counter()
+        response = exchange({"jsonrpc": "2.0", "id": 2, "method": "tools/call",
+                             "params": {"name": "list_documents", "arguments": {"directory": root, "limit": limit}}})
+        listed = time.perf_counter()
+        text = response["result"]["content"][0]["text"]
+        return {"startup": ready - start, "listing": listed - ready, "total": listed - start, "text": text}
+    finally:
+        # Closing stdin ends the server, which writes its snapshot on the way out
+        process.stdin.close()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=200_000, help="Number of files in the synthetic tree")
+    parser.add_argument("--limit", type=int, default=100, help="Page size of the listing request")
+    parser.add_argument("--root", help="Existing directory to benchmark instead of a synthetic tree")
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp(prefix="bench-warm-start-")
+    cache_dir = os.path.join(temp_dir, "cache")
+    root = args.root
+    if root is None:
+        root = os.path.join(temp_dir, "tree")
+        start = time.perf_counter()
+        build_tree(root, args.files)
+        print(f"Built synthetic tree of {args.files} files in {time.perf_counter() - start:.1f}s")
+    root = os.path.abspath(root)
+
+    try:
+        cold = first_listing(root, cache_dir, args.limit)
+        warm = first_listing(root, cache_dir, args.limit)
+        snapshot_bytes = sum(os.path.getsize(os.path.join(cache_dir, name)) for name in os.listdir(cache_dir))
+        if cold["text"] != warm["text"]:
+            print("warning: warm listing differs from the cold one")
+
+        print(f"Snapshot: {snapshot_bytes / 1024 / 1024:.1f} MiB")
+        print(f"{'start':<8}{'startup ms':>12}{'listing ms':>12}{'total ms':>10}")
+        for name, result in (("cold", cold), ("warm", warm)):
+            print(f"{name:<8}{result['startup'] * 1000:>12.1f}{result['listing'] * 1000:>12.1f}"
+                  f"{result['total'] * 1000:>10.1f}")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
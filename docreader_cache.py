@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Decoded content cache for the Document Reader MCP server
+Byte-bounded LRU keyed on path and validated against the file's mtime and size
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+
+def get_cache_limit(variable: str, default_mb: int) -> int:
+    """Read a cache size limit in megabytes from the environment, returning bytes"""
+    try:
+        return int(float(os.environ.get(variable, default_mb)) * 1024 * 1024)
+    except ValueError:
+        return default_mb * 1024 * 1024
+
+
+class ContentCache:
+    """LRU cache of decoded file contents bounded by total bytes"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        # path -> (mtime_ns, size, value, cost)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, path: str, stat: os.stat_result) -> Optional[Any]:
+        """Return the cached value if it was stored for the same mtime and size"""
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] != stat.st_mtime_ns or entry[1] != stat.st_size:
+                self._remove(path)
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(path)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, path: str, stat: os.stat_result, value: Any, cost: int):
+        """Store a value, evicting least recently used entries to stay under max_bytes"""
+        if cost > self.max_bytes:
+            return
+        with self._lock:
+            if path in self._entries:
+                self._remove(path)
+            self._entries[path] = (stat.st_mtime_ns, stat.st_size, value, cost)
+            self._bytes += cost
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, path: str):
+        """Drop a path from the cache"""
+        with self._lock:
+            if path in self._entries:
+                self._remove(path)
+                self.invalidations += 1
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, path: str):
+        entry = self._entries.pop(path)
+        self._bytes -= entry[3]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss/eviction counters and current occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Document chunking for the Document Reader MCP server
+Splits files into token-bounded, overlapping chunks that break at markdown structure, cached per file version
+"""
+
+import bisect
+import hashlib
+import mmap
+import os
+from typing import Dict, Any, List, Tuple
+
+from docreader_cache import ContentCache, get_cache_limit
+from docreader_encoding import decode_8bit, FALLBACK_ENCODING
+from docreader_outline import Outline, get_outline
+
+# Token counts are estimated from UTF-8 bytes; about four per token for English text
+BYTES_PER_TOKEN = 4
+DEFAULT_MAX_TOKENS = 512
+DEFAULT_OVERLAP_TOKENS = 64
+MIN_MAX_TOKENS = 16
+
+# Rough per-chunk bookkeeping cost counted against the cache budget
+CHUNK_OVERHEAD_BYTES = 200
+
+chunk_cache = ContentCache(get_cache_limit("DOCREADER_CHUNK_CACHE_MB", 64))
+
+
+class Chunk:
+    """One chunk of a document and where it came from"""
+
+    __slots__ = ("id", "index", "start", "end", "section", "text")
+
+    def __init__(self, chunk_id: str, index: int, start: int, end: int, section: List[str], text: str):
+        self.id = chunk_id
+        self.index = index
+        self.start = start
+        self.end = end
+        self.section = section
+        self.text = text
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Describe the chunk for tool responses"""
+        return {
+            "id": self.id,
+            "index": self.index,
+            "start": self.start,
+            "end": self.end,
+            "section": self.section,
+            "text": self.text
+        }
+
+
+def _char_boundary(data, pos: int, lowest: int) -> int:
+    """Move pos back until it no longer splits a UTF-8 sequence"""
+    while pos > lowest and data[pos] & 0xC0 == 0x80:
+        pos -= 1
+    return pos
+
+
+def _break_point(data, start: int, limit: int, headings: List[int]) -> int:
+    """Pick where a chunk starting at start should end, at most at limit
+
+    Prefers, in order: a heading, a blank line, a line end, a sentence end and a
+    space. Only a heading may end the chunk in its first quarter; the others must
+    leave it at least half full.
+    """
+    i = bisect.bisect_right(headings, limit) - 1
+    if i >= 0 and headings[i] > start + (limit - start) // 4:
+        return headings[i]
+    half = start + (limit - start) // 2
+    for separator in (b'\n\n', b'\n', b'. ', b' '):
+        found = data.rfind(separator, half, limit)
+        if found >= 0:
+            return found + len(separator)
+    return _char_boundary(data, limit, start + 1)
+
+
+def _overlap_start(data, start: int, end: int, overlap: int, headings: List[int]) -> int:
+    """Where the chunk after [start, end) begins: overlap bytes back, moved forward to a line or word start"""
+    if overlap <= 0:
+        return end
+    begin = max(end - overlap, start + 1)
+    # Never reach back across a heading inside the previous chunk
+    i = bisect.bisect_right(headings, end) - 1
+    if i >= 0 and headings[i] >= begin:
+        return headings[i]
+    # A line start is only worth it while at least half of the overlap remains
+    for separator, latest in ((b'\n', end - overlap // 2), (b' ', end - 1)):
+        found = data.find(separator, begin, latest)
+        if found >= 0:
+            return found + 1
+    return _char_boundary(data, begin, start + 1)
+
+
+def split_spans(data, size: int, outline: Outline, max_bytes: int, overlap: int) -> List[Tuple[int, int]]:
+    """Split [0, size) into (start, end) byte spans of at most max_bytes"""
+    start = 3 if outline.encoding == 'utf-8-sig' else 0
+    headings = [section.start for section in outline.sections]
+    heading_set = set(headings)
+    spans = []
+    while start < size:
+        limit = start + max_bytes
+        end = size if limit >= size else _break_point(data, start, limit, headings)
+        spans.append((start, end))
+        if end >= size:
+            break
+        # A new section starts cleanly; anything else repeats the tail of the previous chunk
+        start = end if end in heading_set else _overlap_start(data, start, end, overlap, headings)
+    return spans
+
+
+def _decode(raw: bytes, encoding: str) -> str:
+    if encoding == FALLBACK_ENCODING:
+        text = decode_8bit(raw)[0]
+    else:
+        text = raw.decode('utf-8', errors='replace')
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+
+def build_chunks(path: str, stat: os.stat_result, max_tokens: int, overlap_tokens: int) -> List[Chunk]:
+    """Chunk one file version"""
+    if stat.st_size == 0:
+        return []
+    outline = get_outline(path, stat)
+    section_starts = [section.start for section in outline.sections]
+    chunks = []
+    seen_ids: Dict[str, int] = {}
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        size = min(stat.st_size, len(mm))
+        spans = split_spans(mm, size, outline, max_tokens * BYTES_PER_TOKEN, overlap_tokens * BYTES_PER_TOKEN)
+        for index, (start, end) in enumerate(spans):
+            raw = mm[start:end]
+            # Content-addressed, so unchanged text keeps its id when other parts of the file change
+            chunk_id = hashlib.sha1(raw).hexdigest()[:16]
+            repeats = seen_ids.get(chunk_id, 0)
+            seen_ids[chunk_id] = repeats + 1
+            if repeats:
+                chunk_id = f"{chunk_id}-{repeats}"
+            i = bisect.bisect_right(section_starts, start) - 1
+            section = outline.sections[i].path() if i >= 0 else []
+            chunks.append(Chunk(chunk_id, index, start, end, section, _decode(raw, outline.encoding)))
+    return chunks
+
+
+def get_chunks(path: str, stat: os.stat_result, max_tokens: int = DEFAULT_MAX_TOKENS,
+               overlap_tokens: int = DEFAULT_OVERLAP_TOKENS) -> Tuple[List[Chunk], bool]:
+    """Return (chunks, cached) for this file version and chunk size, chunking it on a cache miss"""
+    key = f"{os.path.abspath(path)}|{max_tokens}|{overlap_tokens}"
+    chunks = chunk_cache.get(key, stat)
+    if chunks is not None:
+        return chunks, True
+    chunks = build_chunks(path, stat, max_tokens, overlap_tokens)
+    cost = sum(len(chunk.text) + CHUNK_OVERHEAD_BYTES for chunk in chunks)
+    chunk_cache.put(key, stat, chunks, cost)
+    return chunks, False
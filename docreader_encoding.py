@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Encoding detection for the Document Reader MCP server
+Sniffs the BOM and validates a bounded UTF-8 prefix so files are decoded once from memory
+"""
+
+import codecs
+from typing import Tuple
+
+# Longer BOMs first: the UTF-32-LE BOM starts with the UTF-16-LE BOM
+BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+UTF8_PROBE_BYTES = 64 * 1024
+
+# Every byte sequence is valid latin-1, so it is the final fallback
+FALLBACK_ENCODING = 'latin-1'
+
+# C1 control bytes (0x80-0x9F) are almost never meant literally; in Windows text they are
+# cp1252 punctuation. Deleting every other byte with bytes.translate finds them at C speed.
+NON_C1_BYTES = bytes(b for b in range(256) if not 0x80 <= b <= 0x9f)
+
+
+def detect_encoding(data: bytes, probe_bytes: int = UTF8_PROBE_BYTES) -> str:
+    """Guess the encoding of a buffer from its BOM and a bounded UTF-8 validation pass"""
+    for bom, encoding in BOMS:
+        if data.startswith(bom):
+            return encoding
+    # A non-final incremental decode accepts a multi-byte sequence cut off by the probe boundary
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        decoder.decode(memoryview(data)[:probe_bytes], final=len(data) <= probe_bytes)
+    except UnicodeDecodeError:
+        return FALLBACK_ENCODING
+    return 'utf-8'
+
+
+def decode_8bit(data: bytes) -> Tuple[str, str]:
+    """Decode non-UTF-8 text as cp1252 when it uses the C1 byte range, otherwise latin-1"""
+    if data.translate(None, NON_C1_BYTES):
+        try:
+            return data.decode('cp1252'), 'cp1252'
+        except UnicodeDecodeError:
+            pass
+    return data.decode(FALLBACK_ENCODING), FALLBACK_ENCODING
+
+
+def decode_bytes(data: bytes) -> Tuple[str, str]:
+    """Decode a buffer with the detected encoding, returning (text, encoding)"""
+    encoding = detect_encoding(data)
+    if encoding == FALLBACK_ENCODING:
+        return decode_8bit(data)
+    try:
+        return data.decode(encoding), encoding
+    except UnicodeDecodeError:
+        # Valid UTF-8 prefix but invalid bytes further in
+        return decode_8bit(data)
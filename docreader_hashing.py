@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Content hashing for the Document Reader MCP server
+Streams files through SHA-256 in fixed-size blocks and caches digests per file version
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+HASH_ALGORITHM = "sha256"
+HASH_BLOCK_SIZE = 1024 * 1024
+HASH_CACHE_SIZE = 65536
+
+_digests: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+_digests_lock = threading.Lock()
+_local = threading.local()
+_hits = 0
+_misses = 0
+_bytes_hashed = 0
+
+
+def _block_buffer() -> memoryview:
+    """Per-thread read buffer, so concurrent hashes never share or reallocate one"""
+    buffer = getattr(_local, "buffer", None)
+    if buffer is None:
+        buffer = _local.buffer = memoryview(bytearray(HASH_BLOCK_SIZE))
+    return buffer
+
+
+def hash_file(path: str) -> Tuple[str, Optional[os.stat_result]]:
+    """Hash a file block by block; returns (hex digest, stat) with stat None if the file changed while being read"""
+    global _bytes_hashed
+    buffer = _block_buffer()
+    digest = hashlib.new(HASH_ALGORITHM)
+    total = 0
+    with open(path, 'rb', buffering=0) as f:
+        before = os.fstat(f.fileno())
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            # hashlib releases the GIL on large updates, so threads hash in parallel
+            digest.update(buffer[:n])
+            total += n
+        after = os.fstat(f.fileno())
+    with _digests_lock:
+        _bytes_hashed += total
+    unchanged = before.st_mtime_ns == after.st_mtime_ns and before.st_size == after.st_size == total
+    return digest.hexdigest(), after if unchanged else None
+
+
+def content_hash(path: str, stat: os.stat_result = None) -> str:
+    """Return the SHA-256 of a file, reusing the cached digest while its mtime and size are unchanged"""
+    global _hits, _misses
+    abs_path = os.path.abspath(path)
+    if stat is None:
+        stat = os.stat(abs_path)
+    key = (abs_path, stat.st_mtime_ns, stat.st_size)
+    with _digests_lock:
+        digest = _digests.get(key)
+        if digest is not None:
+            _digests.move_to_end(key)
+            _hits += 1
+            return digest
+        _misses += 1
+    digest, hashed_stat = hash_file(abs_path)
+    if hashed_stat is not None:
+        with _digests_lock:
+            _digests[(abs_path, hashed_stat.st_mtime_ns, hashed_stat.st_size)] = digest
+            while len(_digests) > HASH_CACHE_SIZE:
+                _digests.popitem(last=False)
+    return digest
+
+
+def hash_cache_stats() -> Dict[str, Any]:
+    """Return the number of cached digests, hit counters and bytes hashed"""
+    with _digests_lock:
+        lookups = _hits + _misses
+        return {
+            "digests": len(_digests),
+            "max_digests": HASH_CACHE_SIZE,
+            "hits": _hits,
+            "misses": _misses,
+            "hit_rate": _hits / lookups if lookups else 0.0,
+            "bytes_hashed": _bytes_hashed
+        }
@@ -0,0 +1,574 @@
+#!/usr/bin/env python3
+"""
+Persistent incremental document index for the Document Reader MCP server
+Caches per-directory listings on disk and only rescans directories whose mtime changed
+"""
+
+import os
+import sys
+import hashlib
+import threading
+import time
+from array import array
+from typing import Dict, Any, Callable, List, Iterable, Iterator, Optional, Tuple
+
+from docreader_listing import DocumentListing, FileColumns
+from docreader_snapshot import read_snapshot, write_snapshot
+from docreader_walker import IgnoreRules, DocumentEntry, scan_directory, make_document_record, traverse
+
+INDEX_FORMAT_VERSION = 4
+
+# A directory modified this close to the moment it was scanned may change again
+# within the same mtime tick, so its mtime is not trusted on the next refresh
+RACY_MTIME_WINDOW_NS = 2_000_000_000
+
+STAT_DIR_FD = os.stat in os.supports_dir_fd
+
+# Listings within this many seconds of the last refresh are served from the index as is
+DEFAULT_REFRESH_INTERVAL = 1.0
+
+# Index changes are written to disk at most this often, and on exit
+SAVE_INTERVAL = 30.0
+# How long exit waits for a running refresh before skipping the final save
+EXIT_FLUSH_TIMEOUT = 5.0
+
+
+def get_cache_dir() -> str:
+    """Get the directory used for persistent document reader caches"""
+    cache_dir = os.environ.get("DOCREADER_CACHE_DIR")
+    if cache_dir:
+        return cache_dir
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "mcp-document-reader")
+
+
+def get_refresh_interval() -> float:
+    """Get the seconds a refresh stays current (DOCREADER_REFRESH_INTERVAL, default 1)"""
+    try:
+        return max(0.0, float(os.environ.get("DOCREADER_REFRESH_INTERVAL", DEFAULT_REFRESH_INTERVAL)))
+    except ValueError:
+        return DEFAULT_REFRESH_INTERVAL
+
+
+class DocumentIndex:
+    """On-disk index of the supported documents below a root directory
+
+    refresh() only checks directory mtimes, which catches files being created,
+    deleted and renamed. Files edited in place keep their directory's mtime, so a
+    refresh that reused directories starts restat() in the background to pick up
+    their new sizes and mtimes without holding up the listing. A watcher that
+    reports in-place edits itself sets watched, and the restat is skipped.
+    """
+
+    def __init__(self, root: str, extensions: List[str], cache_dir: str = None,
+                 refresh_interval: float = DEFAULT_REFRESH_INTERVAL, rules: IgnoreRules = None):
+        self.root = os.path.abspath(root)
+        self.extensions = [ext.lower() for ext in extensions]
+        self.rules = rules or IgnoreRules.from_env()
+        self.cache_dir = cache_dir or get_cache_dir()
+        self.refresh_interval = refresh_interval
+        key = hashlib.sha1(os.path.normcase(self.root).encode("utf-8")).hexdigest()[:16]
+        self.index_path = os.path.join(self.cache_dir, f"index-{key}.snap")
+        # Relative directory path ("" for the root, "/"-separated) ->
+        # {"mtime_ns", "files" (FileColumns), "subdirs", "gitignore", "gitignore_mtime_ns", "rules_key"}
+        self._dirs: Dict[str, Dict[str, Any]] = {}
+        # Every indexed document in entry_sort_key order; None once the index changes
+        self._listing: Optional[DocumentListing] = None
+        # Set after loading a snapshot, whose directories are only parsed when first needed
+        self._pending_dirs: Optional[Callable[[], Iterator[Tuple[str, Dict[str, Any]]]]] = None
+        self._last_refresh = 0.0
+        self._loaded = False
+        self._unsaved = False
+        self._last_save = time.monotonic() - SAVE_INTERVAL
+        self._lock = threading.Lock()
+        self._restat_thread: Optional[threading.Thread] = None
+        # Set while a watcher keeps file sizes and mtimes current
+        self.watched = False
+        # True from warm_start until its background revalidation finishes
+        self.stale = False
+        self.snapshot_load_ms: Optional[float] = None
+        self.snapshot_saves = 0
+        self.refreshes = 0
+        self.rescanned = 0
+        self.reused = 0
+        self.restats = 0
+        self.files_restated = 0
+
+    def load(self) -> bool:
+        """Load the snapshot of the index, discarding it if it belongs to another configuration"""
+        self._loaded = True
+        start = time.perf_counter()
+        try:
+            data, listing, load_dirs = read_snapshot(self.index_path)
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+        if (data.get("version") != INDEX_FORMAT_VERSION
+                or data.get("root") != self.root
+                or data.get("extensions") != self.extensions
+                or data.get("rules") != self.rules.key):
+            return False
+        self._listing = listing
+        self._pending_dirs = load_dirs
+        self.snapshot_load_ms = (time.perf_counter() - start) * 1000
+        return True
+
+    def _ensure_files(self):
+        """Parse the snapshot's directories and split its listing into their file columns, once"""
+        if self._pending_dirs is None:
+            return
+        try:
+            self._dirs = dict(self._pending_dirs())
+        except ValueError:
+            self._dirs = {}
+        files = {rel_dir: FileColumns([], array('q'), array('d')) for rel_dir in self._dirs}
+        listing = self._listing
+        names = list(listing.names)
+        by_id = [files.setdefault(rel_dir, FileColumns([], array('q'), array('d'))) for rel_dir in listing.dirs]
+        for dir_id, name, size, mtime in zip(listing.dir_index, names, listing.sizes, listing.mtimes):
+            columns = by_id[dir_id]
+            columns.names.append(name)
+            columns.sizes.append(size)
+            columns.mtimes.append(mtime)
+        for rel_dir, entry in self._dirs.items():
+            entry["files"] = files[rel_dir]
+        # Same contents, now sharing the decoded strings instead of decoding each access
+        listing.names = names
+        self._pending_dirs = None
+
+    def _build_listing(self) -> DocumentListing:
+        listing = DocumentListing(self.root, self._entries())
+        listing.sort()
+        return listing
+
+    def save(self):
+        """Atomically write a snapshot of the index to the cache directory"""
+        self._ensure_files()
+        if self._listing is None:
+            self._listing = self._build_listing()
+        data = {
+            "version": INDEX_FORMAT_VERSION,
+            "root": self.root,
+            "extensions": self.extensions,
+            "rules": self.rules.key
+        }
+        dirs = [(rel_dir, {key: value for key, value in entry.items() if key != "files"})
+                for rel_dir, entry in self._dirs.items()]
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        write_snapshot(tmp_path, data, self._listing, dirs)
+        os.replace(tmp_path, self.index_path)
+        self._unsaved = False
+        self._last_save = time.monotonic()
+        self.snapshot_saves += 1
+
+    def _changed(self):
+        """Drop the sorted listing and save the snapshot if the last save is old enough"""
+        self._listing = None
+        self._unsaved = True
+        if time.monotonic() - self._last_save >= SAVE_INTERVAL:
+            try:
+                self.save()
+            except OSError:
+                pass
+
+    def flush(self, timeout: float = -1):
+        """Write index changes that are not on disk yet, giving up if the index stays busy for timeout seconds"""
+        if not self._lock.acquire(timeout=timeout):
+            return
+        try:
+            if self._unsaved:
+                self.save()
+        except OSError:
+            pass
+        finally:
+            self._lock.release()
+
+    @staticmethod
+    def _gitignore_mtime_ns(abs_dir: str, entry: Dict[str, Any]):
+        """Stat the .gitignore of a directory that had one, since editing it in place keeps the directory mtime"""
+        if entry["gitignore"] is None:
+            return None
+        try:
+            return os.stat(os.path.join(abs_dir, ".gitignore")).st_mtime_ns
+        except OSError:
+            return None
+
+    @staticmethod
+    def _restat_files(abs_dir: str, files: FileColumns) -> Optional[FileColumns]:
+        """Stat the files of an unchanged directory, since editing one in place keeps the directory mtime
+
+        Returns files itself if nothing changed, new columns if a size or mtime did,
+        and None if a file is gone and the directory must be rescanned.
+        """
+        sizes = array('q')
+        mtimes = array('d')
+        dir_fd = None
+        try:
+            if files.names and STAT_DIR_FD:
+                # Relative stats skip resolving the directory path again for every file
+                dir_fd = os.open(abs_dir, os.O_RDONLY)
+            for name in files.names:
+                if dir_fd is None:
+                    stat = os.stat(os.path.join(abs_dir, name))
+                else:
+                    stat = os.stat(name, dir_fd=dir_fd)
+                sizes.append(stat.st_size)
+                mtimes.append(stat.st_mtime)
+        except OSError:
+            return None
+        finally:
+            if dir_fd is not None:
+                os.close(dir_fd)
+        if sizes == files.sizes and mtimes == files.mtimes:
+            return files
+        return FileColumns(files.names, sizes, mtimes)
+
+    def _visit(self, node, ext_set: frozenset, rescan: bool = False):
+        """Check one directory, rescanning it if needed; returns ((rel_dir, entry, rescanned), children)"""
+        rel_dir, parent_rules = node
+        abs_dir = os.path.join(self.root, rel_dir) if rel_dir else self.root
+        try:
+            mtime_ns = os.stat(abs_dir).st_mtime_ns
+        except OSError:
+            return None, []
+
+        entry = self._dirs.get(rel_dir)
+        dir_rules = None
+        if not rescan and entry is not None and entry["mtime_ns"] == mtime_ns \
+                and self._gitignore_mtime_ns(abs_dir, entry) == entry["gitignore_mtime_ns"]:
+            # A changed .gitignore higher up invalidates an otherwise unchanged directory
+            dir_rules = parent_rules.child(rel_dir, entry["gitignore"])
+            if dir_rules.key != entry["rules_key"]:
+                dir_rules = None
+
+        rescanned = dir_rules is None
+        if rescanned:
+            try:
+                files, subdirs, gitignore, dir_rules = scan_directory(abs_dir, rel_dir, ext_set, parent_rules)
+            except OSError:
+                return None, []
+            if time.time_ns() - mtime_ns < RACY_MTIME_WINDOW_NS:
+                mtime_ns = None
+            entry = {
+                "mtime_ns": mtime_ns,
+                "files": FileColumns.from_rows(files),
+                "subdirs": subdirs,
+                "gitignore": gitignore,
+                "gitignore_mtime_ns": None,
+                "rules_key": dir_rules.key
+            }
+            entry["gitignore_mtime_ns"] = self._gitignore_mtime_ns(abs_dir, entry)
+
+        children = [(f"{rel_dir}/{subdir}" if rel_dir else subdir, dir_rules) for subdir in entry["subdirs"]]
+        return (rel_dir, entry, rescanned), children
+
+    def refresh(self, force: bool = False, parallelism: int = 1, rescan: bool = False) -> Dict[str, int]:
+        """Bring the index up to date, rescanning only directories whose mtime or ignore rules changed
+
+        Does nothing within refresh_interval of the last refresh unless forced. Files
+        in reused directories are restat'ed in the background unless a watcher covers
+        them. With rescan every directory is scanned again.
+        """
+        with self._lock:
+            stats = {"directories": 0, "rescanned": 0, "reused": 0}
+            if not self._loaded:
+                self.load()
+            if not force and self._dirs and time.monotonic() - self._last_refresh < self.refresh_interval:
+                return stats
+            self._ensure_files()
+
+            ext_set = frozenset(self.extensions)
+            seen = set()
+            visit = lambda node: self._visit(node, ext_set, rescan)
+            for result in traverse([("", self.rules)], visit, parallelism):
+                if result is None:
+                    continue
+                rel_dir, entry, rescanned = result
+                if rescanned:
+                    self._dirs[rel_dir] = entry
+                    stats["rescanned"] += 1
+                else:
+                    stats["reused"] += 1
+                stats["directories"] += 1
+                seen.add(rel_dir)
+
+            self.refreshes += 1
+            self.rescanned += stats["rescanned"]
+            self.reused += stats["reused"]
+
+            removed = [d for d in self._dirs if d not in seen]
+            for rel_dir in removed:
+                del self._dirs[rel_dir]
+
+            self._last_refresh = time.monotonic()
+            if stats["rescanned"] or removed:
+                self._changed()
+            if stats["reused"] and not self.watched:
+                self._start_restat()
+            return stats
+
+    def _start_restat(self):
+        """Run restat() in the background unless a pass is already running"""
+        if self._restat_thread is not None and self._restat_thread.is_alive():
+            return
+        self._restat_thread = threading.Thread(target=self.restat, daemon=True, name="docreader-restat")
+        self._restat_thread.start()
+
+    def restat(self) -> int:
+        """Stat every indexed file and apply in-place edits; returns the number of directories updated
+
+        Runs without the lock except to apply the results, so listings keep being
+        served while it stats. A directory that changed meanwhile keeps its newer
+        entry, and one whose file vanished is rescanned.
+        """
+        with self._lock:
+            self._ensure_files()
+            dirs = list(self._dirs.items())
+        changed = []
+        vanished = []
+        for rel_dir, entry in dirs:
+            abs_dir = os.path.join(self.root, rel_dir) if rel_dir else self.root
+            files = self._restat_files(abs_dir, entry["files"])
+            if files is None:
+                vanished.append(rel_dir)
+            elif files is not entry["files"]:
+                changed.append((rel_dir, entry, files))
+        updated = 0
+        with self._lock:
+            for rel_dir, entry, files in changed:
+                if self._dirs.get(rel_dir) is entry:
+                    self._dirs[rel_dir] = dict(entry, files=files)
+                    updated += 1
+            self.restats += 1
+            self.files_restated += sum(len(entry["files"]) for _, entry in dirs)
+            if updated:
+                self._changed()
+        if vanished:
+            updated += len(self.apply_changes(vanished)["rescanned"])
+        return updated
+
+    def _rules_for(self, rel_dir: str) -> IgnoreRules:
+        """Rebuild the rules a scan of rel_dir starts from out of its indexed ancestors' .gitignore lines"""
+        rules = self.rules
+        ancestor = ""
+        for part in rel_dir.split('/') if rel_dir else []:
+            entry = self._dirs.get(ancestor)
+            if entry is not None:
+                rules = rules.child(ancestor, entry["gitignore"])
+            ancestor = f"{ancestor}/{part}" if ancestor else part
+        return rules
+
+    def _drop_subtree(self, rel_dir: str, keep=()) -> List[str]:
+        """Remove rel_dir and everything below it from the index, except the paths in keep"""
+        prefix = f"{rel_dir}/" if rel_dir else ""
+        removed = [d for d in self._dirs if (d == rel_dir or d.startswith(prefix)) and d not in keep]
+        for d in removed:
+            del self._dirs[d]
+        return removed
+
+    def _update_file(self, rel_dir: str, name: str) -> bool:
+        """Refresh the size and mtime of one indexed file; False if the directory needs a rescan instead"""
+        entry = self._dirs.get(rel_dir)
+        # Not indexed: ignored, or new and already reported as a directory change
+        if entry is None or name not in entry["files"].names:
+            return True
+        try:
+            stat = os.stat(os.path.join(self.root, rel_dir, name))
+        except OSError:
+            return False
+        entry["files"].update(name, stat.st_size, stat.st_mtime)
+        return True
+
+    def apply_changes(self, rel_dirs: Iterable[str] = (),
+                      files: Iterable[Tuple[str, str]] = ()) -> Dict[str, List[str]]:
+        """Apply changes reported by a filesystem watcher without rewalking the tree
+
+        rel_dirs are directories whose entries changed: each is rescanned, new
+        subdirectories are scanned in full and vanished ones dropped with their
+        subtrees. files are (rel_dir, name) pairs modified in place, which only need
+        a stat. Returns the directories rescanned, added and removed.
+        """
+        with self._lock:
+            if not self._loaded:
+                self.load()
+            self._ensure_files()
+            changes = {"rescanned": [], "added": [], "removed": []}
+            rel_dirs = set(rel_dirs)
+            updated = 0
+            for rel_dir, name in files:
+                if rel_dir in rel_dirs:
+                    continue
+                if self._update_file(rel_dir, name):
+                    updated += 1
+                else:
+                    rel_dirs.add(rel_dir)
+
+            ext_set = frozenset(self.extensions)
+            # Parents first, so a rescanned parent has already added or dropped its children
+            for rel_dir in sorted(rel_dirs, key=lambda d: d.count('/') + 1 if d else 0):
+                old = self._dirs.get(rel_dir)
+                if old is None:
+                    continue
+                result, children = self._visit((rel_dir, self._rules_for(rel_dir)), ext_set, rescan=True)
+                if result is None:
+                    changes["removed"].extend(self._drop_subtree(rel_dir))
+                    continue
+                entry = result[1]
+                self._dirs[rel_dir] = entry
+                changes["rescanned"].append(rel_dir)
+
+                subdirs = set(entry["subdirs"])
+                for subdir in old["subdirs"]:
+                    if subdir not in subdirs:
+                        changes["removed"].extend(self._drop_subtree(f"{rel_dir}/{subdir}" if rel_dir else subdir))
+                if entry["rules_key"] != old["rules_key"]:
+                    # Its .gitignore changed, so every directory below must be checked against the new rules
+                    recheck = children
+                else:
+                    old_subdirs = set(old["subdirs"])
+                    recheck = [child for child, name in zip(children, entry["subdirs"]) if name not in old_subdirs]
+
+                for child in recheck:
+                    seen = set()
+                    for result in traverse([child], lambda node: self._visit(node, ext_set)):
+                        if result is None:
+                            continue
+                        child_dir, child_entry, rescanned = result
+                        if child_dir not in self._dirs:
+                            changes["added"].append(child_dir)
+                        self._dirs[child_dir] = child_entry
+                        if rescanned:
+                            self.rescanned += 1
+                        else:
+                            self.reused += 1
+                        seen.add(child_dir)
+                    changes["removed"].extend(self._drop_subtree(child[0], keep=seen))
+
+            self.rescanned += len(changes["rescanned"])
+            if updated or changes["rescanned"] or changes["removed"]:
+                self._changed()
+            return changes
+
+    def directories(self) -> List[str]:
+        """Return the relative path of every indexed directory"""
+        with self._lock:
+            return list(self._dirs)
+
+    def _entries(self) -> Iterator[DocumentEntry]:
+        self._ensure_files()
+        for rel_dir, entry in list(self._dirs.items()):
+            for name, size, mtime in entry["files"]:
+                yield rel_dir, name, size, mtime
+
+    def iter_entries(self) -> Iterator[DocumentEntry]:
+        """Yield (relative dir, name, size, mtime) for every indexed file below the root"""
+        listing = self._listing
+        if listing is not None:
+            yield from listing
+            return
+        with self._lock:
+            self._ensure_files()
+            dirs = list(self._dirs.items())
+        for rel_dir, entry in dirs:
+            for name, size, mtime in entry["files"]:
+                yield rel_dir, name, size, mtime
+
+    def listing(self) -> DocumentListing:
+        """Return every indexed document, as of the last refresh, as a sorted listing shared until the index changes
+
+        The listing is only replaced, never modified, so it can be read without the
+        lock while a refresh is running.
+        """
+        listing = self._listing
+        if listing is not None:
+            return listing
+        with self._lock:
+            if self._listing is None:
+                self._listing = self._build_listing()
+            return self._listing
+
+    def warm_start(self, revalidate: Callable[[], Any]) -> bool:
+        """Load the snapshot, if not loaded yet, and run revalidate (which should refresh the index) in the background
+
+        Until revalidate returns, stale is True and callers may serve the snapshot
+        as it was written instead of waiting. Returns whether a snapshot was loaded.
+        """
+        if self._loaded:
+            return False
+        with self._lock:
+            if self._loaded or not self.load():
+                return False
+            self.stale = True
+
+        def run():
+            try:
+                revalidate()
+            finally:
+                self.stale = False
+
+        threading.Thread(target=run, daemon=True, name="docreader-revalidate").start()
+        return True
+
+    def documents(self) -> List[Dict[str, Any]]:
+        """Return document records for every indexed file below the root"""
+        return [make_document_record(self.root, *entry) for entry in self.iter_entries()]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return index size and directory reuse counters"""
+        with self._lock:
+            checked = self.rescanned + self.reused
+            if self._pending_dirs is not None:
+                documents = len(self._listing)
+            else:
+                documents = sum(len(entry["files"]) for entry in self._dirs.values())
+            return {
+                "directories": len(self._dirs) if self._pending_dirs is None else None,
+                "documents": documents,
+                "refreshes": self.refreshes,
+                "directories_rescanned": self.rescanned,
+                "directories_reused": self.reused,
+                "reuse_rate": self.reused / checked if checked else 0.0,
+                "restats": self.restats,
+                "files_restated": self.files_restated,
+                "snapshot_load_ms": self.snapshot_load_ms,
+                "snapshot_saves": self.snapshot_saves,
+                "stale": self.stale
+            }
+
+
+_indexes: Dict[str, DocumentIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_document_index(root: str, extensions: List[str]) -> DocumentIndex:
+    """Get the shared index for a root directory, creating it on first use"""
+    key = os.path.normcase(os.path.abspath(root))
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = DocumentIndex(root, extensions, refresh_interval=get_refresh_interval())
+            _indexes[key] = index
+        return index
+
+
+def index_stats() -> Dict[str, Dict[str, Any]]:
+    """Return the stats of every shared index, keyed by root directory"""
+    with _indexes_lock:
+        indexes = list(_indexes.values())
+    return {index.root: index.stats() for index in indexes}
+
+
+def flush_indexes():
+    """Write every shared index with unsaved changes to its snapshot, for use at exit"""
+    with _indexes_lock:
+        indexes = list(_indexes.values())
+    for index in indexes:
+        index.flush(EXIT_FLUSH_TIMEOUT)
+
+
+def index_enabled() -> bool:
+    """Check whether the persistent index is enabled (DOCREADER_INDEX=0 disables it)"""
+    return os.environ.get("DOCREADER_INDEX", "1").lower() not in ("0", "false", "no", "off")
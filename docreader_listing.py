@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Compact document listings for the Document Reader MCP server
+Columnar storage with interned directories and array-backed size/mtime columns; dicts are built only for responses
+"""
+
+import os
+from array import array
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+
+from docreader_walker import DocumentEntry, entry_relative_path, make_document_record
+
+PACKED_NAMES_BLOCK = 16384
+
+
+class DocumentRecord:
+    """One listed document, read from a listing without building a dict"""
+
+    __slots__ = ("root", "rel_dir", "name", "size", "modified")
+
+    def __init__(self, root: str, rel_dir: str, name: str, size: int, modified: float):
+        self.root = root
+        self.rel_dir = rel_dir
+        self.name = name
+        self.size = size
+        self.modified = modified
+
+    @property
+    def relative_path(self) -> str:
+        return entry_relative_path(self.rel_dir, self.name)
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.root, self.relative_path)
+
+    @property
+    def extension(self) -> str:
+        dot = self.name.rfind('.')
+        return self.name[dot:] if dot > 0 else ""
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Build the document dict returned by find_documents"""
+        return make_document_record(self.root, self.rel_dir, self.name, self.size, self.modified)
+
+
+class PackedNames:
+    """Read-only sequence of names stored as one NUL-separated UTF-8 blob with start offsets
+
+    Names are decoded only when accessed, so a listing loaded from a snapshot can
+    serve its first page without building a string for every document.
+    """
+
+    __slots__ = ("blob", "offsets")
+
+    def __init__(self, blob: bytes, offsets: array):
+        self.blob = blob
+        # offsets[i] is where name i starts; the final entry is len(blob) + 1
+        self.offsets = offsets
+
+    @staticmethod
+    def pack(names: Iterable[str]) -> Tuple[bytes, array]:
+        """Encode names into a blob and offset column for PackedNames"""
+        encoded = [name.encode('utf-8', 'surrogateescape') for name in names]
+        offsets = array('q', [0])
+        position = 0
+        for raw in encoded:
+            position += len(raw) + 1
+            offsets.append(position)
+        return b"\0".join(encoded), offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        if i < 0:
+            i += len(self)
+        return self.blob[self.offsets[i]:self.offsets[i + 1] - 1].decode('utf-8', 'surrogateescape')
+
+    def __iter__(self) -> Iterator[str]:
+        # Decode in blocks so a background pass over millions of names never holds the GIL for long
+        offsets = self.offsets
+        for start in range(0, len(self), PACKED_NAMES_BLOCK):
+            stop = min(start + PACKED_NAMES_BLOCK, len(self))
+            yield from self.blob[offsets[start]:offsets[stop] - 1].decode('utf-8', 'surrogateescape').split('\0')
+
+
+class DocumentListing:
+    """Documents below a root, stored column by column
+
+    Each directory string is stored once and referenced by index, and sizes and
+    mtimes live in typed arrays, so a document costs its name plus 20 bytes of
+    columns instead of a six-key dict with two full path strings.
+    """
+
+    __slots__ = ("root", "dirs", "_dir_ids", "dir_index", "names", "sizes", "mtimes")
+
+    def __init__(self, root: str, entries: Iterable[DocumentEntry] = ()):
+        self.root = root
+        self.dirs: List[str] = []
+        self._dir_ids: Dict[str, int] = {}
+        self.dir_index = array('I')
+        self.names: List[str] = []
+        self.sizes = array('q')
+        self.mtimes = array('d')
+        self.extend(entries)
+
+    @classmethod
+    def from_columns(cls, root: str, dirs: List[str], dir_index: array, names, sizes: array,
+                     mtimes: array) -> "DocumentListing":
+        """Wrap existing columns, such as those of a snapshot; names may be PackedNames"""
+        listing = cls(root)
+        listing.dirs = dirs
+        listing._dir_ids = {rel_dir: i for i, rel_dir in enumerate(dirs)}
+        listing.dir_index = dir_index
+        listing.names = names
+        listing.sizes = sizes
+        listing.mtimes = mtimes
+        return listing
+
+    def append(self, rel_dir: str, name: str, size: int, mtime: float):
+        """Add one walker entry"""
+        dir_id = self._dir_ids.get(rel_dir)
+        if dir_id is None:
+            dir_id = self._dir_ids[rel_dir] = len(self.dirs)
+            self.dirs.append(rel_dir)
+        self.dir_index.append(dir_id)
+        self.names.append(name)
+        self.sizes.append(size)
+        self.mtimes.append(mtime)
+
+    def extend(self, entries: Iterable[DocumentEntry]):
+        """Add walker entries"""
+        append = self.append
+        for rel_dir, name, size, mtime in entries:
+            append(rel_dir, name, size, mtime)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __iter__(self) -> Iterator[DocumentEntry]:
+        dirs = self.dirs
+        return zip((dirs[i] for i in self.dir_index), self.names, self.sizes, self.mtimes)
+
+    def entries(self, start: int = 0, stop: Optional[int] = None) -> Iterator[DocumentEntry]:
+        """Yield walker entries for documents [start, stop)"""
+        dirs = self.dirs
+        for i in range(start, len(self) if stop is None else min(stop, len(self))):
+            yield dirs[self.dir_index[i]], self.names[i], self.sizes[i], self.mtimes[i]
+
+    def record(self, i: int) -> DocumentRecord:
+        """Return the i-th document as a record"""
+        return DocumentRecord(self.root, self.dirs[self.dir_index[i]], self.names[i], self.sizes[i], self.mtimes[i])
+
+    def records(self, start: int = 0, stop: Optional[int] = None) -> Iterator[DocumentRecord]:
+        """Yield records for documents [start, stop)"""
+        for i in range(start, len(self) if stop is None else min(stop, len(self))):
+            yield self.record(i)
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Materialize every document as a dict, for callers that need the find_documents format"""
+        return [record.to_dict() for record in self.records()]
+
+    def sort_key(self, i: int) -> str:
+        """Single-string equivalent of entry_sort_key; the NUL separator sorts before any name character"""
+        name = self.names[i]
+        return f"{name.lower()}\0{entry_relative_path(self.dirs[self.dir_index[i]], name)}"
+
+    def position_after(self, sort_key: Tuple[str, str]) -> int:
+        """In a sorted listing, the index of the first document whose entry_sort_key is greater than sort_key"""
+        key = f"{sort_key[0]}\0{sort_key[1]}"
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            if self.sort_key(middle) <= key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def sort(self):
+        """Order documents by entry_sort_key, permuting every column in place"""
+        order = sorted(range(len(self)), key=self.sort_key)
+        self.dir_index = array('I', (self.dir_index[i] for i in order))
+        self.names = [self.names[i] for i in order]
+        self.sizes = array('q', (self.sizes[i] for i in order))
+        self.mtimes = array('d', (self.mtimes[i] for i in order))
+
+
+class FileColumns:
+    """The files of one indexed directory: names with parallel size and mtime arrays"""
+
+    __slots__ = ("names", "sizes", "mtimes")
+
+    def __init__(self, names: List[str], sizes: array, mtimes: array):
+        self.names = names
+        self.sizes = sizes
+        self.mtimes = mtimes
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[str, int, float]]) -> "FileColumns":
+        """Build columns from scan_directory's [name, size, mtime] rows"""
+        columns = cls([], array('q'), array('d'))
+        for name, size, mtime in rows:
+            columns.names.append(name)
+            columns.sizes.append(size)
+            columns.mtimes.append(mtime)
+        return columns
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __iter__(self) -> Iterator[Tuple[str, int, float]]:
+        return zip(self.names, self.sizes, self.mtimes)
+
+    def update(self, name: str, size: int, mtime: float) -> bool:
+        """Set the size and mtime of a listed file; False if it is not listed"""
+        try:
+            i = self.names.index(name)
+        except ValueError:
+            return False
+        self.sizes[i] = size
+        self.mtimes[i] = mtime
+        return True
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Markdown outlines for the Document Reader MCP server
+Parses heading structure once per file version and caches the byte range of every section
+"""
+
+import mmap
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+from docreader_encoding import detect_encoding, decode_8bit, FALLBACK_ENCODING, UTF8_PROBE_BYTES
+
+OUTLINE_CACHE_SIZE = 64
+
+# Only lines starting with one of these can open a heading or a code fence, so
+# the parser jumps between them instead of matching at every byte of the file
+CANDIDATE_LINE = re.compile(rb'\n {0,3}[#`~=-]')
+ATX_LINE = re.compile(rb' {0,3}(#{1,6})(?:[ \t]+(.*?))??(?:[ \t]+#+)?[ \t]*\r?\Z', re.S)
+FENCE_LINE = re.compile(rb' {0,3}(`{3,}|~{3,})(.*)', re.S)
+SETEXT_UNDERLINE = re.compile(rb' {0,3}(=+|-{2,})[ \t]*\r?\Z')
+SETEXT_TEXT = re.compile(rb' {0,3}([^ \t\r\n].*?)[ \t]*\r?\Z', re.S)
+
+# Setext text lines that are really list items, quotes or table rows
+NOT_SETEXT_TEXT = re.compile(rb'[>*+|-]|\d+[.)]')
+
+FRONT_MATTER_PATTERN = re.compile(rb'---\r?\n.*?^(?:---|\.\.\.)[ \t]*\r?$\n?', re.M | re.S)
+
+ANCHOR_STRIP = re.compile(r'[^\w\- ]')
+
+
+class Section:
+    """One heading and the byte range it covers"""
+
+    __slots__ = ("level", "title", "anchor", "line", "start", "end", "body_end", "parent")
+
+    def __init__(self, level: int, title: str, line: int, start: int, parent: Optional["Section"]):
+        self.level = level
+        self.title = title
+        self.anchor = ""
+        self.line = line
+        # [start, end) includes subsections; [start, body_end) stops at the next heading
+        self.start = start
+        self.end = start
+        self.body_end = start
+        self.parent = parent
+
+    def path(self) -> List[str]:
+        """Titles from the top-level ancestor down to this section"""
+        titles = []
+        section = self
+        while section is not None:
+            titles.append(section.title)
+            section = section.parent
+        return titles[::-1]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Describe the section for tool responses"""
+        return {
+            "level": self.level,
+            "title": self.title,
+            "anchor": self.anchor,
+            "path": self.path(),
+            "line": self.line,
+            "start": self.start,
+            "end": self.end,
+            "body_end": self.body_end
+        }
+
+
+def make_anchor(title: str) -> str:
+    """GitHub-style anchor for a heading title (without de-duplication)"""
+    return ANCHOR_STRIP.sub('', title.strip().lower()).replace(' ', '-')
+
+
+def _decode_title(raw: bytes, encoding: str) -> str:
+    raw = raw.strip()
+    if encoding == FALLBACK_ENCODING:
+        return decode_8bit(raw)[0]
+    return raw.decode('utf-8', errors='replace')
+
+
+class Outline:
+    """Heading structure of one version of a document"""
+
+    def __init__(self, size: int, encoding: str, sections: List[Section]):
+        self.size = size
+        self.encoding = encoding
+        self.sections = sections
+
+    @classmethod
+    def parse(cls, data, size: int) -> "Outline":
+        """Find every heading outside code fences and front matter in a bytes-like buffer"""
+        encoding = detect_encoding(data[:UTF8_PROBE_BYTES + 1])
+        if encoding not in ('utf-8', 'utf-8-sig', FALLBACK_ENCODING):
+            raise ValueError(f"Outlines need an ASCII-compatible encoding, not {encoding}")
+
+        pos = 3 if encoding == 'utf-8-sig' else 0
+        front_matter = FRONT_MATTER_PATTERN.match(data, pos)
+        if front_matter:
+            pos = front_matter.end()
+
+        sections: List[Section] = []
+        stack: List[Section] = []
+        fence = None
+        # Start of the last heading or fence line, which cannot also be setext heading text
+        last_block = -1
+        line = 1
+        counted = 0
+        starts = [pos] if pos < size else []
+        starts.extend(match.start() + 1 for match in CANDIDATE_LINE.finditer(data, pos))
+        for line_start in starts:
+            line_end = data.find(b'\n', line_start)
+            if line_end < 0:
+                line_end = size
+            text = data[line_start:line_end]
+
+            fence_match = FENCE_LINE.match(text)
+            if fence_match:
+                marker = fence_match.group(1)
+                if fence is None:
+                    fence = marker
+                elif marker[:1] == fence[:1] and len(marker) >= len(fence) and not fence_match.group(2).strip():
+                    fence = None
+                last_block = line_start
+                continue
+            if fence is not None:
+                continue
+
+            atx = ATX_LINE.match(text)
+            if atx:
+                level = len(atx.group(1))
+                raw_title = atx.group(2) or b""
+                start = line_start
+            else:
+                underline = SETEXT_UNDERLINE.match(text)
+                if not underline or line_start <= pos:
+                    continue
+                start = data.rfind(b'\n', pos, line_start - 1) + 1 or pos
+                if start == last_block:
+                    continue
+                setext = SETEXT_TEXT.match(data[start:line_start - 1])
+                if not setext or NOT_SETEXT_TEXT.match(setext.group(1)):
+                    continue
+                level = 1 if underline.group(1)[:1] == b"=" else 2
+                raw_title = setext.group(1)
+            last_block = line_start
+
+            line += data[counted:start].count(b'\n')
+            counted = start
+            while stack and stack[-1].level >= level:
+                stack.pop().end = start
+            if sections:
+                sections[-1].body_end = start
+            section = Section(level, _decode_title(raw_title, encoding), line, start, stack[-1] if stack else None)
+            sections.append(section)
+            stack.append(section)
+
+        for section in stack:
+            section.end = size
+        if sections:
+            sections[-1].body_end = size
+
+        used: Dict[str, int] = {}
+        for section in sections:
+            anchor = make_anchor(section.title)
+            count = used.get(anchor, 0)
+            used[anchor] = count + 1
+            section.anchor = f"{anchor}-{count}" if count else anchor
+        return cls(size, encoding, sections)
+
+    def by_anchor(self, anchor: str) -> Optional[Section]:
+        """Find the section with this anchor (a leading '#' is ignored)"""
+        anchor = anchor.lstrip('#').lower()
+        for section in self.sections:
+            if section.anchor == anchor:
+                return section
+        return None
+
+    def by_path(self, path: List[str]) -> List[Section]:
+        """Find sections whose title is the last path element and whose ancestors contain the rest in order
+
+        Titles compare case-insensitively, and intermediate levels may be skipped,
+        so ["Install", "Linux"] finds "Install > Packages > Linux".
+        """
+        wanted = [title.strip().lower() for title in path if title.strip()]
+        if not wanted:
+            return []
+        matches = []
+        for section in self.sections:
+            if section.title.lower() != wanted[-1]:
+                continue
+            remaining = wanted[:-1]
+            ancestor = section.parent
+            while remaining and ancestor is not None:
+                if ancestor.title.lower() == remaining[-1]:
+                    remaining.pop()
+                ancestor = ancestor.parent
+            if not remaining:
+                matches.append(section)
+        return matches
+
+
+_outlines: "OrderedDict[Tuple[str, int, int], Outline]" = OrderedDict()
+_outlines_lock = threading.Lock()
+_outline_hits = 0
+_outline_misses = 0
+
+
+def get_outline(path: str, stat: os.stat_result) -> Outline:
+    """Return the cached outline for this file version, parsing it on first access"""
+    global _outline_hits, _outline_misses
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    with _outlines_lock:
+        outline = _outlines.get(key)
+        if outline is not None:
+            _outlines.move_to_end(key)
+            _outline_hits += 1
+            return outline
+        _outline_misses += 1
+    if stat.st_size == 0:
+        outline = Outline(0, 'utf-8', [])
+    else:
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            outline = Outline.parse(mm, stat.st_size)
+    with _outlines_lock:
+        _outlines[key] = outline
+        while len(_outlines) > OUTLINE_CACHE_SIZE:
+            _outlines.popitem(last=False)
+    return outline
+
+
+def outline_cache_stats() -> Dict[str, Any]:
+    """Return the number of cached outlines and the cache hit counters"""
+    with _outlines_lock:
+        lookups = _outline_hits + _outline_misses
+        return {
+            "outlines": len(_outlines),
+            "max_outlines": OUTLINE_CACHE_SIZE,
+            "hits": _outline_hits,
+            "misses": _outline_misses,
+            "hit_rate": _outline_hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Ranged reads for the Document Reader MCP server
+Serves byte or line slices of large files through mmap and a cached sparse line index
+"""
+
+import mmap
+import os
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+# Newline counts are recorded at every block boundary, so locating a line
+# scans at most one block after a binary search over the boundaries
+LINE_INDEX_BLOCK_SIZE = 64 * 1024
+LINE_INDEX_CACHE_SIZE = 32
+
+
+class LineIndex:
+    """Sparse line index: cumulative newline counts at fixed byte block boundaries"""
+
+    __slots__ = ("size", "block_size", "counts", "total_lines")
+
+    def __init__(self, size: int, block_size: int, counts: array, total_lines: int):
+        self.size = size
+        self.block_size = block_size
+        # counts[i] is the number of newlines in bytes [0, i * block_size)
+        self.counts = counts
+        self.total_lines = total_lines
+
+    @classmethod
+    def build(cls, mm, size: int, block_size: int = LINE_INDEX_BLOCK_SIZE) -> "LineIndex":
+        """Count newlines block by block; each block is counted at C speed"""
+        counts = array('Q', [0])
+        newlines = 0
+        for start in range(0, size, block_size):
+            newlines += mm[start:start + block_size].count(b'\n')
+            counts.append(newlines)
+        total_lines = newlines + (1 if size and mm[size - 1:size] != b'\n' else 0)
+        return cls(size, block_size, counts, total_lines)
+
+    def line_offset(self, mm, line: int) -> int:
+        """Byte offset where the 0-based line starts (file size if past the end)"""
+        if line <= 0:
+            return 0
+        if line > self.counts[-1]:
+            return self.size
+        # First block boundary that has seen `line` newlines, then step back one block
+        block = bisect_left(self.counts, line) - 1
+        pos = block * self.block_size
+        remaining = line - self.counts[block]
+        while remaining:
+            pos = mm.find(b'\n', pos) + 1
+            remaining -= 1
+        return pos
+
+
+_line_indexes: "OrderedDict[Tuple[str, int, int], LineIndex]" = OrderedDict()
+_line_indexes_lock = threading.Lock()
+
+
+def get_line_index(path: str, stat: os.stat_result, mm) -> LineIndex:
+    """Return the cached line index for this file version, building it on first access"""
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    with _line_indexes_lock:
+        index = _line_indexes.get(key)
+        if index is not None:
+            _line_indexes.move_to_end(key)
+            return index
+    index = LineIndex.build(mm, stat.st_size)
+    with _line_indexes_lock:
+        _line_indexes[key] = index
+        while len(_line_indexes) > LINE_INDEX_CACHE_SIZE:
+            _line_indexes.popitem(last=False)
+    return index
+
+
+def read_range(file_path: str, max_bytes: int, offset: Optional[int] = None, length: Optional[int] = None,
+               start_line: Optional[int] = None, line_count: Optional[int] = None) -> Dict[str, Any]:
+    """Read a byte range (offset/length) or a 1-based line range (start_line/line_count) from a file
+
+    At most max_bytes are returned; a truncated line range ends on a line boundary when possible.
+    """
+    stat = os.stat(file_path)
+    size = stat.st_size
+    result = {"file_size": size, "truncated": False}
+
+    if size == 0:
+        result.update({"data": b"", "start": 0, "end": 0})
+        if start_line is not None:
+            result.update({"first_line": start_line, "last_line": start_line - 1, "total_lines": 0})
+        return result
+
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if start_line is not None:
+            index = get_line_index(file_path, stat, mm)
+            first = start_line - 1
+            start = index.line_offset(mm, first)
+            if line_count is None:
+                end = size
+            else:
+                end = index.line_offset(mm, first + line_count)
+            if end - start > max_bytes:
+                cut = mm.rfind(b'\n', start, start + max_bytes)
+                end = cut + 1 if cut >= 0 else start + max_bytes
+                result["truncated"] = True
+            data = mm[start:end]
+            lines = data.count(b'\n') + (1 if data and not data.endswith(b'\n') else 0)
+            result.update({
+                "first_line": start_line,
+                "last_line": start_line + lines - 1,
+                "total_lines": index.total_lines
+            })
+        else:
+            start = min(offset or 0, size)
+            end = size if length is None else min(size, start + length)
+            if end - start > max_bytes:
+                end = start + max_bytes
+                result["truncated"] = True
+            data = mm[start:end]
+
+    result.update({"data": data, "start": start, "end": end})
+    return result
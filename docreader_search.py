@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Full-text search for the Document Reader MCP server
+In-process inverted index with compact array-backed posting lists and BM25 ranking
+"""
+
+import heapq
+import math
+import os
+import re
+import threading
+import time
+from array import array
+from collections import Counter
+from typing import Dict, Any, Callable, List, Iterable, Optional, Tuple
+
+from docreader_encoding import decode_bytes
+
+TOKEN_PATTERN = re.compile(r"\w{2,64}")
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Compact posting lists once this fraction of indexed documents is stale
+COMPACT_DEAD_RATIO = 0.3
+
+SNIPPET_RADIUS = 80
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class SearchIndex:
+    """Inverted index over the documents below a root directory
+
+    Syncing with the filesystem happens on a background thread, so queries are
+    answered from the index as it stands. read_text(abs_path), if given, supplies
+    the text snippets are cut from, e.g. through a content cache.
+    """
+
+    def __init__(self, root: str, max_doc_bytes: int = 4 * 1024 * 1024, refresh_interval: float = 1.0,
+                 read_text: Callable[[str], Optional[str]] = None):
+        self.root = os.path.abspath(root)
+        self.max_doc_bytes = max_doc_bytes
+        self.refresh_interval = refresh_interval
+        self._snippet_text = read_text or self._read_text
+        # term -> (doc ids, term frequencies); parallel arrays appended in doc id order
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        # doc id -> [native relative path, mtime, size, token count]; None once the doc is stale
+        self._docs: List[Optional[list]] = []
+        self._doc_ids: Dict[str, int] = {}
+        self._live_docs = 0
+        self._total_tokens = 0
+        self._last_refresh = 0.0
+        self._lock = threading.Lock()
+        self._sync_thread: Optional[threading.Thread] = None
+        # Set once the first sync has finished
+        self._ready = threading.Event()
+        self.syncs = 0
+
+    def _read_text(self, abs_path: str) -> Optional[str]:
+        try:
+            with open(abs_path, 'rb') as f:
+                data = f.read(self.max_doc_bytes)
+        except OSError:
+            return None
+        return decode_bytes(data)[0]
+
+    def _add(self, rel_path: str, mtime: float, size: int, counts: Counter):
+        doc_id = len(self._docs)
+        length = sum(counts.values())
+        self._docs.append([rel_path, mtime, size, length])
+        self._doc_ids[rel_path] = doc_id
+        self._live_docs += 1
+        self._total_tokens += length
+        postings = self._postings
+        for term, freq in counts.items():
+            entry = postings.get(term)
+            if entry is None:
+                entry = postings[term] = (array('I'), array('I'))
+            entry[0].append(doc_id)
+            entry[1].append(freq)
+
+    def _remove(self, rel_path: str):
+        doc_id = self._doc_ids.pop(rel_path)
+        self._total_tokens -= self._docs[doc_id][3]
+        self._docs[doc_id] = None
+        self._live_docs -= 1
+
+    def _compact(self):
+        """Drop stale documents from the posting lists and renumber the live ones"""
+        remap = {}
+        docs = []
+        for old_id, doc in enumerate(self._docs):
+            if doc is not None:
+                remap[old_id] = len(docs)
+                docs.append(doc)
+        postings = {}
+        for term, (ids, freqs) in self._postings.items():
+            new_ids = array('I')
+            new_freqs = array('I')
+            for doc_id, freq in zip(ids, freqs):
+                new_id = remap.get(doc_id)
+                if new_id is not None:
+                    new_ids.append(new_id)
+                    new_freqs.append(freq)
+            if new_ids:
+                postings[term] = (new_ids, new_freqs)
+        self._docs = docs
+        self._postings = postings
+        self._doc_ids = {doc[0]: doc_id for doc_id, doc in enumerate(docs)}
+
+    def refresh(self, list_entries: Callable[[], Iterable[Tuple[str, int, float]]], force: bool = False) -> bool:
+        """Start syncing the index in the background; returns False if no sync was due or one is running
+
+        list_entries returns (native relative path, size, mtime) for every document,
+        typically from the document index, and is only called on the sync thread.
+        """
+        with self._lock:
+            if self._sync_thread is not None and self._sync_thread.is_alive():
+                return False
+            if not force and time.monotonic() - self._last_refresh < self.refresh_interval:
+                return False
+            self._last_refresh = time.monotonic()
+            self._sync_thread = threading.Thread(target=self.sync, args=(list_entries,), daemon=True,
+                                                 name="docreader-search-sync")
+            self._sync_thread.start()
+            return True
+
+    def sync(self, list_entries: Callable[[], Iterable[Tuple[str, int, float]]]) -> Dict[str, int]:
+        """Sync the index with list_entries(), reindexing only files whose size or mtime changed
+
+        Files are read and tokenized without the lock, which is only taken to update
+        the postings, so queries keep being answered meanwhile. Only one sync may run at a time.
+        """
+        stats = {"added": 0, "updated": 0, "removed": 0}
+        try:
+            seen = set()
+            for rel_path, size, mtime in list_entries():
+                seen.add(rel_path)
+                # Only the syncing thread changes _doc_ids and _docs, so reading them here is safe
+                doc_id = self._doc_ids.get(rel_path)
+                if doc_id is not None:
+                    doc = self._docs[doc_id]
+                    if doc[1] == mtime and doc[2] == size:
+                        continue
+                text = self._read_text(os.path.join(self.root, rel_path))
+                counts = Counter(tokenize(text)) if text is not None else None
+                with self._lock:
+                    if doc_id is not None:
+                        self._remove(rel_path)
+                    if counts is not None:
+                        self._add(rel_path, mtime, size, counts)
+                stats["updated" if doc_id is not None else "added"] += 1
+            with self._lock:
+                for rel_path in [p for p in self._doc_ids if p not in seen]:
+                    self._remove(rel_path)
+                    stats["removed"] += 1
+                if self._docs and 1 - self._live_docs / len(self._docs) > COMPACT_DEAD_RATIO:
+                    self._compact()
+                self.syncs += 1
+        finally:
+            self._ready.set()
+        return stats
+
+    def wait_ready(self, timeout: float = None) -> bool:
+        """Wait for the first sync to finish; returns False if it is still running after timeout"""
+        return self._ready.wait(timeout)
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Return the top documents for a query ranked by BM25"""
+        terms = set(tokenize(query))
+        with self._lock:
+            if not terms or not self._live_docs:
+                return []
+            docs = self._docs
+            n_docs = self._live_docs
+            avg_length = self._total_tokens / n_docs or 1.0
+            scores: Dict[int, float] = {}
+            for term in terms:
+                entry = self._postings.get(term)
+                if entry is None:
+                    continue
+                ids, freqs = entry
+                idf = math.log(1 + (n_docs - len(ids) + 0.5) / (len(ids) + 0.5))
+                for doc_id, freq in zip(ids, freqs):
+                    doc = docs[doc_id]
+                    if doc is None:
+                        continue
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * doc[3] / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * freq * (BM25_K1 + 1) / (freq + norm)
+            top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            results = [
+                {"relative_path": docs[doc_id][0], "score": score, "size": docs[doc_id][2]}
+                for doc_id, score in top
+            ]
+        for result in results:
+            result["path"] = os.path.join(self.root, result["relative_path"])
+            result["name"] = os.path.basename(result["relative_path"])
+            result["snippet"] = self.snippet(result["path"], terms)
+        return results
+
+    def snippet(self, abs_path: str, terms: Iterable[str]) -> str:
+        """Extract a short window of text around the first query term in a document"""
+        text = self._snippet_text(abs_path)
+        if not text:
+            return ""
+        pattern = re.compile(r"\b(?:" + "|".join(re.escape(t) for t in terms) + r")\b", re.IGNORECASE)
+        match = pattern.search(text)
+        if match is None:
+            return ""
+        start = max(0, match.start() - SNIPPET_RADIUS)
+        end = min(len(text), match.end() + SNIPPET_RADIUS)
+        snippet = " ".join(text[start:end].split())
+        return f"{'...' if start else ''}{snippet}{'...' if end < len(text) else ''}"
+
+    def stats(self) -> Dict[str, Any]:
+        """Return index size and sync counters"""
+        with self._lock:
+            return {
+                "documents": self._live_docs,
+                "stale_documents": len(self._docs) - self._live_docs,
+                "terms": len(self._postings),
+                "postings": sum(len(ids) for ids, _ in self._postings.values()),
+                "syncs": self.syncs,
+                "ready": self._ready.is_set()
+            }
+
+
+_search_indexes: Dict[str, SearchIndex] = {}
+_search_indexes_lock = threading.Lock()
+
+
+def get_search_index(root: str, read_text: Callable[[str], Optional[str]] = None) -> SearchIndex:
+    """Get the shared search index for a root directory, creating it on first use"""
+    key = os.path.normcase(os.path.abspath(root))
+    with _search_indexes_lock:
+        index = _search_indexes.get(key)
+        if index is None:
+            index = SearchIndex(root, read_text=read_text)
+            _search_indexes[key] = index
+        return index
+
+
+def search_index_stats() -> Dict[str, Dict[str, Any]]:
+    """Return the stats of every shared search index, keyed by root directory"""
+    with _search_indexes_lock:
+        indexes = list(_search_indexes.values())
+    return {index.root: index.stats() for index in indexes}
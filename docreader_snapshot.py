@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Binary index snapshots for the Document Reader MCP server
+Writes a sorted document listing as raw columns behind a small JSON header and maps it back in without parsing every entry
+"""
+
+import json
+import mmap
+import struct
+import sys
+from array import array
+from typing import Dict, Any, Callable, Iterator, List, Tuple
+
+from docreader_listing import DocumentListing, PackedNames
+
+SNAPSHOT_MAGIC = b"DRSNAP\x00\x01"
+HEADER_LENGTH = struct.Struct("<Q")
+# Details are stored as one JSON array per block of items, so parsing them in a
+# background thread never holds the GIL long enough to stall a request
+DETAILS_BLOCK = 1024
+
+# Column name -> array typecode, in file order
+COLUMNS = (("dir_index", "I"), ("name_offsets", "q"), ("sizes", "q"), ("mtimes", "d"))
+
+
+def _layout() -> Dict[str, Any]:
+    """Properties of this machine's arrays; a snapshot written elsewhere is rejected"""
+    return {"byteorder": sys.byteorder, "itemsizes": {code: array(code).itemsize for _, code in COLUMNS}}
+
+
+def _pack_strings(strings: List[str]) -> bytes:
+    return "\0".join(strings).encode('utf-8', 'surrogateescape')
+
+
+def _unpack_strings(data: bytes, count: int) -> List[str]:
+    return data.decode('utf-8', 'surrogateescape').split('\0') if count else []
+
+
+def _iter_details(data: bytes) -> Iterator[Any]:
+    for line in data.split(b"\n"):
+        if line:
+            yield from json.loads(line)
+
+
+def write_snapshot(path: str, header: Dict[str, Any], listing: DocumentListing, details: List[Any]):
+    """Write header, a sorted listing and a list of JSON-serializable details to path
+
+    Callers write to a temporary path and rename it. details are only parsed when
+    read_snapshot's caller iterates them.
+    """
+    blob, offsets = PackedNames.pack(listing.names)
+    columns = {
+        "dir_index": listing.dir_index,
+        "name_offsets": offsets,
+        "sizes": listing.sizes,
+        "mtimes": listing.mtimes
+    }
+    sections = {}
+    position = 0
+    payload = []
+    byte_sections = [(name, columns[name].tobytes()) for name, _ in COLUMNS] + [
+        ("names", blob),
+        ("dirs", _pack_strings(listing.dirs)),
+        ("details", b"\n".join(json.dumps(details[i:i + DETAILS_BLOCK], separators=(',', ':')).encode("utf-8")
+                                for i in range(0, len(details), DETAILS_BLOCK)))
+    ]
+    for name, data in byte_sections:
+        sections[name] = [position, len(data)]
+        payload.append(data)
+        position += len(data)
+
+    header = dict(header, layout=_layout(), count=len(listing), dir_count=len(listing.dirs), sections=sections)
+    encoded = json.dumps(header, separators=(',', ':')).encode("utf-8")
+    with open(path, 'wb') as f:
+        f.write(SNAPSHOT_MAGIC)
+        f.write(HEADER_LENGTH.pack(len(encoded)))
+        f.write(encoded)
+        for data in payload:
+            f.write(data)
+
+
+def read_snapshot(path: str) -> Tuple[Dict[str, Any], DocumentListing, Callable[[], Iterator[Any]]]:
+    """Map a snapshot and return (header, listing, a function iterating over its parsed details)
+
+    Raises OSError or ValueError if the snapshot is unusable.
+    """
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start = len(SNAPSHOT_MAGIC) + HEADER_LENGTH.size
+        if mm[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC or len(mm) < start:
+            raise ValueError("Not a document index snapshot")
+        (header_length,) = HEADER_LENGTH.unpack(mm[len(SNAPSHOT_MAGIC):start])
+        header = json.loads(mm[start:start + header_length])
+        if header.get("layout") != _layout():
+            raise ValueError("Snapshot was written with a different array layout")
+        base = start + header_length
+
+        def section(name: str) -> bytes:
+            offset, length = header["sections"][name]
+            if base + offset + length > len(mm):
+                raise ValueError(f"Snapshot is truncated in {name}")
+            return mm[base + offset:base + offset + length]
+
+        # Columns are copied out of the map in one step each; names stay packed until accessed
+        columns = {}
+        for name, code in COLUMNS:
+            columns[name] = array(code)
+            columns[name].frombytes(section(name))
+        names = PackedNames(section("names"), columns["name_offsets"])
+        dirs = _unpack_strings(section("dirs"), header["dir_count"])
+        details = section("details")
+
+    count = header["count"]
+    if not (len(columns["dir_index"]) == len(names) == len(columns["sizes"]) == len(columns["mtimes"]) == count):
+        raise ValueError("Snapshot columns disagree in length")
+    if len(dirs) != header["dir_count"]:
+        raise ValueError("Snapshot directory table is damaged")
+    listing = DocumentListing.from_columns(header["root"], dirs, columns["dir_index"], names,
+                                           columns["sizes"], columns["mtimes"])
+    return header, listing, lambda: _iter_details(details)
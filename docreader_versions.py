@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Document versions for the Document Reader MCP server
+Keeps recently served contents by version token so later reads can send only a line diff
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from typing import Dict, Any, List, Optional, Tuple
+
+VERSION_TOKEN_CHARS = 24
+MAX_VERSIONS_PER_PATH = 8
+PREFIX_BLOCK_CHARS = 64 * 1024
+
+
+def version_token(data: bytes) -> str:
+    """Version token for a file's raw bytes"""
+    return hashlib.sha256(data).hexdigest()[:VERSION_TOKEN_CHARS]
+
+
+class VersionStore:
+    """LRU of served document contents keyed by version token, bounded by total characters"""
+
+    def __init__(self, max_chars: int, per_path: int = MAX_VERSIONS_PER_PATH):
+        self.max_chars = max_chars
+        self.per_path = per_path
+        # token -> (path, content)
+        self._versions: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+        # path -> its tokens in the same LRU order, so the per-path cap never scans other paths
+        self._by_path: "Dict[str, OrderedDict[str, None]]" = {}
+        self._chars = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def put(self, token: str, path: str, content: str):
+        """Remember the content served as token, evicting the oldest versions to stay in budget"""
+        if len(content) > self.max_chars:
+            return
+        with self._lock:
+            if token in self._versions:
+                self._touch(token)
+                return
+            self._versions[token] = (path, content)
+            self._chars += len(content)
+            same_path = self._by_path.setdefault(path, OrderedDict())
+            same_path[token] = None
+            while len(same_path) > self.per_path:
+                self._remove(next(iter(same_path)))
+            while self._chars > self.max_chars:
+                self._remove(next(iter(self._versions)))
+
+    def _touch(self, token: str):
+        self._versions.move_to_end(token)
+        self._by_path[self._versions[token][0]].move_to_end(token)
+
+    def _remove(self, token: str):
+        path, content = self._versions.pop(token)
+        same_path = self._by_path[path]
+        del same_path[token]
+        if not same_path:
+            del self._by_path[path]
+        self._chars -= len(content)
+        self.evictions += 1
+
+    def get(self, token: str, path: str) -> Optional[str]:
+        """Return the content stored for token if it was served for path"""
+        with self._lock:
+            entry = self._versions.get(token)
+            if entry is None or entry[0] != path:
+                self.misses += 1
+                return None
+            self._touch(token)
+            self.hits += 1
+            return entry[1]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return stored versions, their size and lookup counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "versions": len(self._versions),
+                "chars": self._chars,
+                "max_chars": self.max_chars,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+def _hunk_lines(prefix: str, lines: List[str]) -> List[str]:
+    out = []
+    for line in lines:
+        if line.endswith('\n'):
+            out.append(prefix + line)
+        else:
+            out.append(prefix + line + '\n\\ No newline at end of file\n')
+    return out
+
+
+def _common_prefix(a: str, b: str, limit: int) -> int:
+    """Length of the common prefix of a and b, at most limit; compares whole blocks at C speed first"""
+    n = 0
+    block = PREFIX_BLOCK_CHARS
+    while block:
+        while n + block <= limit and a[n:n + block] == b[n:n + block]:
+            n += block
+        block //= 4
+    return n
+
+
+def _common_suffix(a: str, b: str, limit: int) -> int:
+    """Length of the common suffix of a and b, at most limit"""
+    n = 0
+    block = PREFIX_BLOCK_CHARS
+    while block:
+        while n + block <= limit and a[len(a) - n - block:len(a) - n] == b[len(b) - n - block:len(b) - n]:
+            n += block
+        block //= 4
+    return n
+
+
+def line_delta(old: str, new: str) -> Tuple[str, int]:
+    """Return (unified diff without context lines, number of changed lines) turning old into new
+
+    Unchanged leading and trailing text is skipped with block comparisons before
+    anything is split into lines, so a small edit to a big document only splits
+    and diffs the lines around the edit.
+    """
+    limit = min(len(old), len(new))
+    prefix = _common_prefix(old, new, limit)
+    # Back up to the start of the line the first difference is on
+    prefix = old.rfind('\n', 0, prefix) + 1
+    suffix = _common_suffix(old, new, limit - prefix)
+    # Shrink the suffix until it starts at a line start in both texts
+    old_end = len(old) - suffix
+    new_end = len(new) - suffix
+    if suffix and not (old[old_end - 1:old_end] in ('', '\n') and new[new_end - 1:new_end] in ('', '\n')):
+        line_end = old.find('\n', old_end)
+        old_end = len(old) if line_end < 0 else line_end + 1
+    suffix = len(old) - old_end
+    start = old.count('\n', 0, prefix)
+    old_middle = old[prefix:old_end].splitlines(keepends=True)
+    new_middle = new[prefix:len(new) - suffix].splitlines(keepends=True)
+
+    parts = []
+    changed = 0
+    matcher = SequenceMatcher(None, old_middle, new_middle)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            continue
+        # Unified diff convention: an empty range is numbered by the line before it
+        old_from = start + i1 + (1 if i2 > i1 else 0)
+        new_from = start + j1 + (1 if j2 > j1 else 0)
+        parts.append(f"@@ -{old_from},{i2 - i1} +{new_from},{j2 - j1} @@\n")
+        parts.extend(_hunk_lines('-', old_middle[i1:i2]))
+        parts.extend(_hunk_lines('+', new_middle[j1:j2]))
+        changed += max(i2 - i1, j2 - j1)
+    return "".join(parts), changed
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Single-pass directory walker for the Document Reader MCP server
+Visits each directory once with os.scandir and prunes ignored directories
+"""
+
+import os
+import re
+import hashlib
+import fnmatch
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Any, List, Iterable, Iterator, Optional, Tuple, Callable
+
+MAX_PARALLELISM = 64
+
+DEFAULT_IGNORE_NAMES = ('.git', '.hg', '.svn', 'node_modules', '__pycache__', '.venv', 'venv')
+
+# (relative directory, file name, size, mtime)
+DocumentEntry = Tuple[str, str, int, float]
+
+
+def _translate_gitignore_glob(pattern: str) -> str:
+    """Translate a .gitignore glob into a regular expression"""
+    i, n = 0, len(pattern)
+    parts = []
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            if pattern.startswith('**/', i):
+                parts.append('(?:.*/)?')
+                i += 3
+                continue
+            if pattern.startswith('**', i):
+                parts.append('.*')
+                i += 2
+                continue
+            parts.append('[^/]*')
+        elif c == '?':
+            parts.append('[^/]')
+        elif c == '[':
+            end = pattern.find(']', i + 1)
+            if end == -1:
+                parts.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                parts.append('[' + body.replace('\\', '\\\\') + ']')
+                i = end
+        elif c == '\\' and i + 1 < n:
+            i += 1
+            parts.append(re.escape(pattern[i]))
+        else:
+            parts.append(re.escape(c))
+        i += 1
+    return ''.join(parts)
+
+
+class IgnoreRules:
+    """Pruning rules: fixed names plus patterns collected from .gitignore files"""
+
+    def __init__(self, names: Iterable[str] = DEFAULT_IGNORE_NAMES, use_gitignore: bool = True,
+                 include_hidden: bool = False):
+        names = list(names)
+        self.names = frozenset(name for name in names if not any(c in name for c in '*?['))
+        self.name_globs = tuple(name for name in names if name not in self.names)
+        self.use_gitignore = use_gitignore
+        self.include_hidden = include_hidden
+        # (base relative directory, compiled regex, negated, directory only, match full path)
+        self._patterns: Tuple[Tuple[str, Any, bool, bool, bool], ...] = ()
+        config = f"{sorted(names)}|{use_gitignore}|{include_hidden}"
+        self.key = hashlib.sha1(config.encode("utf-8")).hexdigest()[:16]
+
+    @classmethod
+    def from_env(cls) -> "IgnoreRules":
+        """Build rules from DOCREADER_IGNORE, DOCREADER_USE_GITIGNORE and DOCREADER_INCLUDE_HIDDEN"""
+        names = os.environ.get("DOCREADER_IGNORE")
+        names = [n.strip() for n in names.split(',') if n.strip()] if names is not None else DEFAULT_IGNORE_NAMES
+        use_gitignore = os.environ.get("DOCREADER_USE_GITIGNORE", "1").lower() not in ("0", "false", "no", "off")
+        include_hidden = os.environ.get("DOCREADER_INCLUDE_HIDDEN", "0").lower() in ("1", "true", "yes", "on")
+        return cls(names, use_gitignore, include_hidden)
+
+    def child(self, rel_dir: str, gitignore_lines: Optional[List[str]]) -> "IgnoreRules":
+        """Return the rules in effect inside rel_dir after applying its .gitignore lines"""
+        if not gitignore_lines or not self.use_gitignore:
+            return self
+        compiled = []
+        for line in gitignore_lines:
+            line = line.rstrip('\n').rstrip('\r')
+            if not line.endswith('\\ '):
+                line = line.rstrip(' ')
+            if not line or line.startswith('#'):
+                continue
+            negated = line.startswith('!')
+            if negated:
+                line = line[1:]
+            elif line.startswith('\\'):
+                line = line[1:]
+            dir_only = line.endswith('/')
+            line = line.rstrip('/')
+            if not line:
+                continue
+            anchored = '/' in line
+            line = line.lstrip('/')
+            regex = re.compile(_translate_gitignore_glob(line) + r'\Z')
+            compiled.append((rel_dir, regex, negated, dir_only, anchored))
+        if not compiled:
+            return self
+        rules = object.__new__(IgnoreRules)
+        rules.__dict__.update(self.__dict__)
+        rules._patterns = self._patterns + tuple(compiled)
+        digest = hashlib.sha1(f"{self.key}|{rel_dir}|".encode("utf-8"))
+        digest.update('\n'.join(gitignore_lines).encode("utf-8"))
+        rules.key = digest.hexdigest()[:16]
+        return rules
+
+    def is_ignored(self, rel_dir: str, name: str, is_dir: bool) -> bool:
+        """Check whether an entry named name inside rel_dir should be skipped"""
+        if not self.include_hidden and name.startswith('.'):
+            return True
+        if name in self.names:
+            return True
+        for glob in self.name_globs:
+            if fnmatch.fnmatchcase(name, glob):
+                return True
+        if not self._patterns:
+            return False
+        rel_path = f"{rel_dir}/{name}" if rel_dir else name
+        ignored = False
+        for base, regex, negated, dir_only, anchored in self._patterns:
+            if dir_only and not is_dir:
+                continue
+            if negated != ignored:
+                # Only a pattern that can flip the current state needs evaluating
+                continue
+            if anchored:
+                if base:
+                    if not rel_path.startswith(base + '/'):
+                        continue
+                    target = rel_path[len(base) + 1:]
+                else:
+                    target = rel_path
+            else:
+                target = name
+            if regex.match(target):
+                ignored = not negated
+        return ignored
+
+
+def _read_gitignore(path: str) -> Optional[List[str]]:
+    """Read the lines of a .gitignore file, or None if it cannot be read"""
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            return f.read().splitlines()
+    except OSError:
+        return None
+
+
+def scan_directory(abs_dir: str, rel_dir: str, ext_set: frozenset,
+                   rules: IgnoreRules) -> Tuple[List[list], List[str], Optional[List[str]], IgnoreRules]:
+    """Scan one directory, returning (files, subdirs, gitignore lines, rules for its children)"""
+    with os.scandir(abs_dir) as it:
+        entries = list(it)
+
+    gitignore = None
+    if rules.use_gitignore:
+        for entry in entries:
+            if entry.name == '.gitignore':
+                gitignore = _read_gitignore(entry.path)
+                break
+        rules = rules.child(rel_dir, gitignore)
+
+    files = []
+    subdirs = []
+    for entry in entries:
+        name = entry.name
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                if not rules.is_ignored(rel_dir, name, True):
+                    subdirs.append(name)
+                continue
+            dot = name.rfind('.')
+            if dot <= 0 or name[dot:].lower() not in ext_set:
+                continue
+            if rules.is_ignored(rel_dir, name, False) or not entry.is_file():
+                continue
+            stat = entry.stat()
+            files.append([name, stat.st_size, stat.st_mtime])
+        except OSError:
+            continue
+    return files, subdirs, gitignore, rules
+
+
+def traverse(roots: List[Any], visit: Callable[[Any], Tuple[Any, List[Any]]],
+             parallelism: int = 1) -> Iterator[Any]:
+    """Apply visit to every node of a tree, yielding its results
+
+    visit(node) returns (result, child nodes). With parallelism > 1 the visits
+    run on a bounded thread pool and results are yielded in completion order.
+    """
+    parallelism = max(1, min(int(parallelism or 1), MAX_PARALLELISM))
+    if parallelism == 1:
+        stack = list(reversed(roots))
+        while stack:
+            result, children = visit(stack.pop())
+            yield result
+            stack.extend(reversed(children))
+        return
+
+    pool = ThreadPoolExecutor(max_workers=parallelism, thread_name_prefix="docreader-walk")
+    try:
+        pending = {pool.submit(visit, node) for node in roots}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                result, children = future.result()
+                pending.update(pool.submit(visit, child) for child in children)
+                yield result
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def walk_documents(root: str, extensions: Iterable[str], recursive: bool = True,
+                   rules: IgnoreRules = None, parallelism: int = 1) -> Iterator[DocumentEntry]:
+    """Yield (relative dir, name, size, mtime) for every supported document below root"""
+    root = os.path.abspath(root)
+    ext_set = frozenset(ext.lower() for ext in extensions)
+    if rules is None:
+        rules = IgnoreRules.from_env()
+
+    def visit(node):
+        rel_dir, parent_rules = node
+        abs_dir = os.path.join(root, rel_dir) if rel_dir else root
+        try:
+            files, subdirs, _, dir_rules = scan_directory(abs_dir, rel_dir, ext_set, parent_rules)
+        except OSError:
+            return (rel_dir, []), []
+        children = []
+        if recursive:
+            children = [(f"{rel_dir}/{subdir}" if rel_dir else subdir, dir_rules) for subdir in subdirs]
+        return (rel_dir, files), children
+
+    for rel_dir, files in traverse([("", rules)], visit, parallelism):
+        for name, size, mtime in files:
+            yield rel_dir, name, size, mtime
+
+
+def entry_relative_path(rel_dir: str, name: str) -> str:
+    """Convert a walker entry into a native relative path"""
+    if not rel_dir:
+        return name
+    if os.sep == '/':
+        return f"{rel_dir}/{name}"
+    return os.path.join(*rel_dir.split('/'), name)
+
+
+def document_sort_key(document: Dict[str, Any]) -> Tuple[str, str]:
+    """Sort documents by name, using the relative path to order same-named files"""
+    return document["name"].lower(), document["relative_path"]
+
+
+def entry_sort_key(entry: DocumentEntry) -> Tuple[str, str]:
+    """Same ordering as document_sort_key, computed from a walker entry"""
+    rel_dir, name = entry[0], entry[1]
+    return name.lower(), entry_relative_path(rel_dir, name)
+
+
+def make_document_record(root: str, rel_dir: str, name: str, size: int, mtime: float) -> Dict[str, Any]:
+    """Build the document dict returned by find_documents"""
+    rel_path = entry_relative_path(rel_dir, name)
+    dot = name.rfind('.')
+    return {
+        "path": os.path.join(root, rel_path),
+        "name": name,
+        "extension": name[dot:] if dot > 0 else "",
+        "size": size,
+        "modified": mtime,
+        "relative_path": rel_path
+    }
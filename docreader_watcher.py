@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+"""
+Filesystem watcher for the Document Reader MCP server
+Pushes create/modify/delete/rename events into the document index so listings never rewalk the tree
+"""
+
+import abc
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Dict, Any, Callable, List, Optional, Set, Tuple
+
+from docreader_index import DocumentIndex
+
+# inotify(7) event bits
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+              | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR | IN_DONT_FOLLOW)
+ENTRY_CHANGED = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO
+EVENT_HEADER = struct.Struct("iIII")
+READ_SIZE = 64 * 1024
+
+DEFAULT_POLL_INTERVAL = 5.0
+
+
+def get_watch_mode() -> Optional[str]:
+    """Get the watcher to use from DOCREADER_WATCH: None (off, the default), "inotify" or "poll"
+
+    "1"/"on"/"auto" picks inotify where the platform has it and polling elsewhere.
+    """
+    value = os.environ.get("DOCREADER_WATCH", "0").lower()
+    if value in ("0", "false", "no", "off", ""):
+        return None
+    if value in ("poll", "polling"):
+        return "poll"
+    return "inotify" if inotify_available() else "poll"
+
+
+def get_poll_interval() -> float:
+    """Get the seconds between polling passes (DOCREADER_WATCH_POLL_INTERVAL, default 5)"""
+    try:
+        return max(0.1, float(os.environ.get("DOCREADER_WATCH_POLL_INTERVAL", DEFAULT_POLL_INTERVAL)))
+    except ValueError:
+        return DEFAULT_POLL_INTERVAL
+
+
+_libc = None
+
+
+def _load_libc():
+    global _libc
+    if _libc is None:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        _libc = libc
+    return _libc
+
+
+def inotify_available() -> bool:
+    """Check whether inotify can be used on this platform"""
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        return hasattr(_load_libc(), "inotify_init1")
+    except OSError:
+        return False
+
+
+class DirectoryWatcher(abc.ABC):
+    """Keeps a DocumentIndex current in the background
+
+    on_file_change(abs_path) is called for every document reported as changed, so
+    per-file caches can drop it. sync() brings the index up to date with everything
+    reported so far and is cheap enough to call before every listing. The watcher
+    reports in-place edits itself, so the index skips its own background restat.
+    """
+
+    mode = "none"
+
+    def __init__(self, index: DocumentIndex, on_file_change: Callable[[str], None] = None):
+        self.index = index
+        index.watched = True
+        self._on_file_change = on_file_change
+        self._ext_set = frozenset(index.extensions)
+        self._sync_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = threading.Event()
+        self.events = 0
+        self.syncs = 0
+        self.rescans = 0
+        self.directories_rescanned = 0
+        self.files_updated = 0
+
+    def _is_document(self, name: str) -> bool:
+        dot = name.rfind('.')
+        return dot > 0 and name[dot:].lower() in self._ext_set
+
+    def _file_changed(self, rel_dir: str, name: str):
+        if self._on_file_change is not None:
+            self._on_file_change(os.path.join(self.index.root, rel_dir, name))
+
+    def _start_thread(self, target: Callable[[], None]):
+        self._thread = threading.Thread(target=target, daemon=True, name=f"docreader-{self.mode}-watcher")
+        self._thread.start()
+
+    @abc.abstractmethod
+    def start(self, parallelism: int = 1):
+        """Bring the index up to date and start watching"""
+
+    @abc.abstractmethod
+    def sync(self):
+        """Apply every change reported so far to the index"""
+
+    def close(self):
+        """Stop watching and write pending index changes to disk"""
+        self._closed.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        self.index.watched = False
+        self.index.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return event and rescan counters"""
+        return {
+            "mode": self.mode,
+            "events": self.events,
+            "syncs": self.syncs,
+            "full_rescans": self.rescans,
+            "directories_rescanned": self.directories_rescanned,
+            "files_updated": self.files_updated
+        }
+
+
+class InotifyWatcher(DirectoryWatcher):
+    """Watcher driven by Linux inotify, with one watch per indexed directory
+
+    Events only name the directories and files that changed, so each sync rescans
+    just those directories (or stats just those files). When the kernel event queue
+    overflows, or the watch limit is reached, changes may have been missed and the
+    index falls back to a full rescan.
+    """
+
+    mode = "inotify"
+
+    def __init__(self, index: DocumentIndex, on_file_change: Callable[[str], None] = None):
+        super().__init__(index, on_file_change)
+        self._libc = _load_libc()
+        self._fd = -1
+        self._wd_dirs: Dict[int, str] = {}
+        self._dir_wds: Dict[str, int] = {}
+        # Set when a directory could not be watched; every sync then refreshes by mtime
+        self.degraded = False
+        self.overflows = 0
+
+    def start(self, parallelism: int = 1):
+        """Bring the index up to date and add a watch for every indexed directory"""
+        fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._fd = fd
+        self.index.refresh(parallelism=parallelism)
+        for rel_dir in self.index.directories():
+            self._watch(rel_dir)
+        # Catch entries created or deleted while the watches were being added
+        self.index.refresh()
+        for rel_dir in self.index.directories():
+            self._watch(rel_dir)
+        self._start_thread(self._run)
+
+    def _watch(self, rel_dir: str):
+        if rel_dir in self._dir_wds:
+            return
+        path = os.path.join(self.index.root, rel_dir) if rel_dir else self.index.root
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                self.degraded = True
+            # ENOENT/ENOTDIR: gone again already; the parent's rescan drops it
+            return
+        self._wd_dirs[wd] = rel_dir
+        self._dir_wds[rel_dir] = wd
+
+    def _unwatch(self, rel_dir: str):
+        wd = self._dir_wds.pop(rel_dir, None)
+        if wd is not None:
+            self._wd_dirs.pop(wd, None)
+            self._libc.inotify_rm_watch(self._fd, wd)
+
+    def _read_events(self) -> List[Tuple[int, int, str]]:
+        """Drain the kernel queue without blocking, returning (wd, mask, name) events"""
+        events = []
+        while True:
+            try:
+                data = os.read(self._fd, READ_SIZE)
+            except BlockingIOError:
+                return events
+            except OSError:
+                return events
+            if not data:
+                return events
+            offset = 0
+            while offset + EVENT_HEADER.size <= len(data):
+                wd, mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                offset += length
+                events.append((wd, mask, name))
+
+    def sync(self):
+        """Apply every event queued by the kernel so far"""
+        with self._sync_lock:
+            if self._fd < 0:
+                return
+            events = self._read_events()
+            self.syncs += 1
+            self.events += len(events)
+            dirs: Set[str] = set()
+            files: Set[Tuple[str, str]] = set()
+            overflow = False
+            for wd, mask, name in events:
+                if mask & IN_Q_OVERFLOW:
+                    overflow = True
+                    continue
+                rel_dir = self._wd_dirs.get(wd)
+                if rel_dir is None:
+                    continue
+                if mask & IN_IGNORED:
+                    # The directory is gone, or its watch was removed below
+                    del self._wd_dirs[wd]
+                    if self._dir_wds.get(rel_dir) == wd:
+                        del self._dir_wds[rel_dir]
+                    continue
+                if mask & (IN_DELETE_SELF | IN_MOVE_SELF) or not name:
+                    dirs.add(rel_dir)
+                elif mask & IN_ISDIR or name == ".gitignore":
+                    dirs.add(rel_dir)
+                elif self._is_document(name):
+                    if mask & ENTRY_CHANGED:
+                        dirs.add(rel_dir)
+                    else:
+                        files.add((rel_dir, name))
+                    self._file_changed(rel_dir, name)
+
+            if overflow or self.degraded:
+                self._rescan(full=overflow)
+            elif dirs or files:
+                self._apply(dirs, files)
+
+    def _apply(self, dirs: Set[str], files: Set[Tuple[str, str]]):
+        changes = self.index.apply_changes(dirs, files)
+        self.files_updated += len(files)
+        self.directories_rescanned += len(changes["rescanned"])
+        while changes["added"] or changes["removed"]:
+            for rel_dir in changes["removed"]:
+                self._unwatch(rel_dir)
+            added = [rel_dir for rel_dir in changes["added"] if rel_dir not in self._dir_wds]
+            for rel_dir in added:
+                self._watch(rel_dir)
+            # Entries created between the scan and the new watch were not reported: scan once more
+            changes = self.index.apply_changes(added) if added else {"added": [], "removed": []}
+            self.directories_rescanned += len(changes.get("rescanned", ()))
+
+    def _rescan(self, full: bool):
+        """Fall back to rescanning the tree when events may have been lost"""
+        if full:
+            self.overflows += 1
+            self.rescans += 1
+        self.index.refresh(force=True, rescan=full)
+        indexed = set(self.index.directories())
+        for rel_dir in [d for d in self._dir_wds if d not in indexed]:
+            self._unwatch(rel_dir)
+        self.degraded = False
+        for rel_dir in indexed:
+            self._watch(rel_dir)
+
+    def _run(self):
+        while not self._closed.is_set():
+            try:
+                readable, _, _ = select.select([self._fd], [], [], 1.0)
+            except (OSError, ValueError):
+                return
+            if readable:
+                try:
+                    self.sync()
+                except Exception:
+                    # Keep watching; the next event or listing retries
+                    time.sleep(0.1)
+
+    def close(self):
+        """Stop watching and release the inotify descriptor"""
+        super().close()
+        with self._sync_lock:
+            if self._fd >= 0:
+                os.close(self._fd)
+                self._fd = -1
+                self._wd_dirs.clear()
+                self._dir_wds.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return event counters, watch count and overflow count"""
+        stats = super().stats()
+        stats.update({"watches": len(self._dir_wds), "overflows": self.overflows, "degraded": self.degraded})
+        return stats
+
+
+class PollingWatcher(DirectoryWatcher):
+    """Fallback watcher for platforms without inotify
+
+    Listings still check directory mtimes, which catches files being created,
+    deleted and renamed; a background pass every interval seconds stats every
+    indexed file to catch in-place edits, which leave the directory mtime alone.
+    """
+
+    mode = "poll"
+
+    def __init__(self, index: DocumentIndex, on_file_change: Callable[[str], None] = None,
+                 interval: float = DEFAULT_POLL_INTERVAL):
+        super().__init__(index, on_file_change)
+        self.interval = interval
+
+    def start(self, parallelism: int = 1):
+        """Bring the index up to date and start the polling thread"""
+        self.index.refresh(parallelism=parallelism)
+        self._start_thread(self._run)
+
+    def sync(self):
+        """Refresh directories whose mtime changed"""
+        with self._sync_lock:
+            self.syncs += 1
+            stats = self.index.refresh()
+            self.directories_rescanned += stats["rescanned"]
+
+    def poll(self):
+        """Stat every indexed file and apply the ones that changed"""
+        changed = []
+        for rel_dir, name, size, mtime in self.index.iter_entries():
+            try:
+                stat = os.stat(os.path.join(self.index.root, rel_dir, name))
+            except OSError:
+                changed.append((rel_dir, name))
+                continue
+            if stat.st_size != size or stat.st_mtime != mtime:
+                changed.append((rel_dir, name))
+        with self._sync_lock:
+            self.rescans += 1
+            stats = self.index.refresh(force=True)
+            self.directories_rescanned += stats["rescanned"]
+            if changed:
+                self.events += len(changed)
+                changes = self.index.apply_changes(files=changed)
+                self.files_updated += len(changed)
+                self.directories_rescanned += len(changes["rescanned"])
+        for rel_dir, name in changed:
+            self._file_changed(rel_dir, name)
+
+    def _run(self):
+        while not self._closed.wait(self.interval):
+            try:
+                self.poll()
+            except Exception:
+                pass
+
+
+_watchers: Dict[str, DirectoryWatcher] = {}
+# Roots whose watcher is being started -> set once it is registered (or failed)
+_starting: Dict[str, threading.Event] = {}
+_watchers_lock = threading.Lock()
+
+
+def _start_watcher(index: DocumentIndex, mode: str, on_file_change: Callable[[str], None],
+                   parallelism: int) -> DirectoryWatcher:
+    if mode == "inotify":
+        watcher = InotifyWatcher(index, on_file_change)
+        try:
+            watcher.start(parallelism)
+            return watcher
+        except OSError:
+            watcher.close()
+    watcher = PollingWatcher(index, on_file_change, get_poll_interval())
+    watcher.start(parallelism)
+    return watcher
+
+
+def get_watcher(index: DocumentIndex, on_file_change: Callable[[str], None] = None,
+                parallelism: int = 1) -> Optional[DirectoryWatcher]:
+    """Get the watcher for an index, starting it on first use; None when watching is disabled
+
+    Starting runs a full refresh, so it happens outside the module lock: only
+    callers for the same root wait for it.
+    """
+    mode = get_watch_mode()
+    if mode is None:
+        return None
+    while True:
+        with _watchers_lock:
+            watcher = _watchers.get(index.root)
+            if watcher is not None:
+                return watcher
+            started = _starting.get(index.root)
+            if started is None:
+                started = _starting[index.root] = threading.Event()
+                break
+        started.wait()
+
+    try:
+        watcher = _start_watcher(index, mode, on_file_change, parallelism)
+        with _watchers_lock:
+            _watchers[index.root] = watcher
+        return watcher
+    finally:
+        with _watchers_lock:
+            del _starting[index.root]
+        started.set()
+
+
+def watcher_stats() -> Dict[str, Dict[str, Any]]:
+    """Return the stats of every running watcher, keyed by root directory"""
+    with _watchers_lock:
+        watchers = list(_watchers.items())
+    return {root: watcher.stats() for root, watcher in watchers}
+
+
+def close_watchers():
+    """Stop every watcher, writing pending index changes to disk"""
+    with _watchers_lock:
+        watchers = list(_watchers.values())
+        _watchers.clear()
+    for watcher in watchers:
+        watcher.close()
@@ -4,24 +4,100 @@ Document Reader MCP Server for Windsurf IDE
 Reads .md and .txt files from specified directories
 """
 
+import atexit
 import json
 import sys
 import os
+import base64
 import glob
+import codecs
+import heapq
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Iterator, Optional, Tuple
 import mimetypes
 
-def log_message(message: str, level: str = "INFO"):
-    """Log messages to stderr for debugging"""
-    print(f"[{level}] {message}", file=sys.stderr)
+from docreader_cache import ContentCache, get_cache_limit
+from docreader_chunks import get_chunks, chunk_cache, DEFAULT_MAX_TOKENS, DEFAULT_OVERLAP_TOKENS, MIN_MAX_TOKENS
+from docreader_encoding import decode_bytes, decode_8bit
+from docreader_hashing import content_hash, hash_cache_stats, HASH_ALGORITHM
+from docreader_index import DocumentIndex, get_document_index, index_enabled, index_stats, flush_indexes
+from docreader_listing import DocumentListing
+from docreader_outline import get_outline, outline_cache_stats
+from docreader_ranged import read_range
+from docreader_search import get_search_index, search_index_stats
+from docreader_watcher import get_watcher, get_watch_mode, watcher_stats, close_watchers
+from docreader_versions import VersionStore, version_token, line_delta
+from docreader_walker import (
+    DocumentEntry, walk_documents, entry_sort_key, entry_relative_path
+)
+from mcp_server_core import MCPServer, InvalidParams, RPCError, log_message
+
+# How long the query that starts a new search index waits for it before answering from what is indexed so far
+SEARCH_BUILD_WAIT = 0.5
+
+# Batch tools fan per-file work out over their own pool so they never wait on request workers
+BATCH_WORKERS = 8
+MAX_BATCH_FILES = 5000
+_batch_executor = None
+_batch_executor_lock = threading.Lock()
+
+# Decoded file contents, validated by (mtime, size); size with DOCREADER_CONTENT_CACHE_MB
+content_cache = ContentCache(get_cache_limit("DOCREADER_CONTENT_CACHE_MB", 64))
+# Recently served contents by version token, for read_document_delta
+version_store = VersionStore(get_cache_limit("DOCREADER_VERSION_STORE_MB", 32))
+# Largest document get_document_info will hash on request; size with DOCREADER_HASH_MAX_MB
+MAX_HASH_BYTES = get_cache_limit("DOCREADER_HASH_MAX_MB", 16)
 
 def get_supported_extensions() -> List[str]:
     """Get list of supported file extensions"""
     return ['.md', '.txt', '.markdown', '.text']
 
-def find_documents(directory: str = None, recursive: bool = True) -> List[Dict[str, Any]]:
-    """Find all supported documents in a directory"""
+def sync_index(index: DocumentIndex, parallelism: int = 1):
+    """Bring a document index up to date"""
+    watcher = get_watcher(index, content_cache.invalidate, parallelism)
+    if watcher is None:
+        index.refresh(parallelism=parallelism)
+    else:
+        # Changes arrive as events, so only the directories they name are rescanned
+        watcher.sync()
+
+def open_index(directory: str, parallelism: int = 1) -> DocumentIndex:
+    """Get the up-to-date index for a directory, or its snapshot while that is revalidated in the background"""
+    index = get_document_index(directory, get_supported_extensions())
+    index.warm_start(lambda: sync_index(index, parallelism))
+    if not index.stale:
+        sync_index(index, parallelism)
+    return index
+
+def warm_start(directory: str):
+    """Load a directory's index snapshot so its first listing is served immediately"""
+    index = get_document_index(directory, get_supported_extensions())
+    if not index.warm_start(lambda: sync_index(index)) and get_watch_mode() is not None:
+        # No snapshot yet: index and watch the directory up front so the first listing is already warm
+        threading.Thread(target=sync_index, args=(index,), daemon=True, name="docreader-watch-warmup").start()
+
+def iter_documents(directory: str, recursive: bool = True, parallelism: int = 1) -> Iterator[DocumentEntry]:
+    """Yield (relative dir, name, size, mtime) for supported documents, unsorted"""
+    if recursive and index_enabled():
+        return open_index(directory, parallelism).iter_entries()
+    
+    return walk_documents(directory, get_supported_extensions(), recursive, parallelism=parallelism)
+
+def sorted_documents(root: str, recursive: bool = True, parallelism: int = 1) -> DocumentListing:
+    """Return the documents below root as a sorted listing, which callers must not modify"""
+    if recursive and index_enabled():
+        # Cached by the index until something changes
+        return open_index(root, parallelism).listing()
+    
+    listing = DocumentListing(root, walk_documents(root, get_supported_extensions(), recursive,
+                                                   parallelism=parallelism))
+    listing.sort()
+    return listing
+
+def find_documents(directory: str = None, recursive: bool = True, parallelism: int = 1) -> List[Dict[str, Any]]:
+    """Find all supported documents in a directory, optionally scanning directories in parallel"""
     try:
         if directory is None:
             directory = os.getcwd()
@@ -29,98 +105,214 @@ def find_documents(directory: str = None, recursive: bool = True) -> List[Dict[s
         if not os.path.exists(directory):
             return []
         
-        documents = []
-        supported_extensions = get_supported_extensions()
-        
-        if recursive:
-            pattern = "**/*"
-        else:
-            pattern = "*"
-        
-        for ext in supported_extensions:
-            search_pattern = os.path.join(directory, pattern + ext)
-            for file_path in glob.glob(search_pattern, recursive=recursive):
-                if os.path.isfile(file_path):
-                    try:
-                        stat = os.stat(file_path)
-                        documents.append({
-                            "path": os.path.abspath(file_path),
-                            "name": os.path.basename(file_path),
-                            "extension": os.path.splitext(file_path)[1],
-                            "size": stat.st_size,
-                            "modified": stat.st_mtime,
-                            "relative_path": os.path.relpath(file_path, directory)
-                        })
-                    except OSError:
-                        continue
-        
-        # Sort by name
-        documents.sort(key=lambda x: x['name'].lower())
-        return documents
+        return sorted_documents(os.path.abspath(directory), recursive, parallelism).to_dicts()
         
     except Exception as e:
         log_message(f"Error finding documents: {e}", "ERROR")
         return []
 
-def read_document(file_path: str, max_size: int = 1024 * 1024) -> Dict[str, Any]:
-    """Read content from a document file"""
+def encode_cursor(sort_key: Tuple[str, str]) -> str:
+    """Encode the sort key of the last returned document as an opaque cursor"""
+    raw = json.dumps(list(sort_key), separators=(',', ':')).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """Decode a cursor produced by encode_cursor, raising ValueError if it is malformed"""
     try:
-        if not os.path.exists(file_path):
-            return {
-                "success": False,
-                "error": "File not found",
-                "message": f"File does not exist: {file_path}"
-            }
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        name, rel_path = json.loads(raw.decode("utf-8"))
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    if not isinstance(name, str) or not isinstance(rel_path, str):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return name, rel_path
+
+def list_documents_page(directory: str = None, recursive: bool = True, parallelism: int = 1,
+                        limit: int = None, cursor: str = None) -> Dict[str, Any]:
+    """Return one sorted page of documents, keeping only the page in memory"""
+    try:
+        if directory is None:
+            directory = os.getcwd()
         
-        # Check file size
-        file_size = os.path.getsize(file_path)
-        if file_size > max_size:
-            return {
-                "success": False,
-                "error": "File too large",
-                "message": f"File size ({file_size} bytes) exceeds maximum ({max_size} bytes)"
-            }
+        try:
+            after = decode_cursor(cursor) if cursor else None
+        except ValueError as e:
+            return {"success": False, "error": "Invalid cursor", "message": str(e)}
         
-        # Check if it's a supported file type
-        supported_extensions = get_supported_extensions()
-        file_ext = os.path.splitext(file_path)[1].lower()
-        if file_ext not in supported_extensions:
-            return {
-                "success": False,
-                "error": "Unsupported file type",
-                "message": f"File extension '{file_ext}' is not supported. Supported: {', '.join(supported_extensions)}"
-            }
+        if not os.path.exists(directory):
+            return {"success": True, "documents": DocumentListing(directory), "total": 0, "next_cursor": None}
+        
+        root = os.path.abspath(directory)
+        if recursive and index_enabled():
+            # The index keeps a sorted listing, so a page is a binary search and a slice
+            listing = sorted_documents(root, recursive, parallelism)
+            total = len(listing)
+            start = 0 if after is None else listing.position_after(after)
+            stop = total if limit is None else min(start + limit, total)
+            if start > 0 or stop < total:
+                listing = DocumentListing(root, listing.entries(start, stop))
+            next_cursor = None
+            if start < stop < total:
+                next_cursor = encode_cursor(entry_sort_key(next(listing.entries(len(listing) - 1))))
+            return {"success": True, "documents": listing, "total": total, "next_cursor": next_cursor}
+        
+        total = 0
+        if limit is None:
+            # Collect the whole listing in columns and sort it once
+            listing = DocumentListing(root)
+            for entry in iter_documents(root, recursive, parallelism):
+                total += 1
+                if after is None or entry_sort_key(entry) > after:
+                    listing.append(*entry)
+            listing.sort()
+            return {"success": True, "documents": listing, "total": total, "next_cursor": None}
         
-        # Try to read the file with different encodings
-        encodings = ['utf-8', 'utf-8-sig', 'latin-1', 'cp1252']
-        content = None
-        encoding_used = None
+        matched = 0
+        page = []
+        for entry in iter_documents(root, recursive, parallelism):
+            total += 1
+            item = (entry_sort_key(entry), entry)
+            if after is not None and item[0] <= after:
+                continue
+            matched += 1
+            page.append(item)
+            # Trim to the smallest `limit` keys periodically so memory stays bounded by the page size
+            if len(page) >= 2 * limit:
+                page = heapq.nsmallest(limit, page)
+        page = heapq.nsmallest(limit, page)
+        
+        listing = DocumentListing(root, (entry for _, entry in page))
+        next_cursor = encode_cursor(page[-1][0]) if page and matched > len(page) else None
+        return {"success": True, "documents": listing, "total": total, "next_cursor": next_cursor}
         
-        for encoding in encodings:
+    except Exception as e:
+        log_message(f"Error listing documents: {e}", "ERROR")
+        return {"success": False, "error": str(e), "message": f"Error listing documents: {str(e)}"}
+
+def decode_range(data: bytes) -> Tuple[str, str]:
+    """Decode a slice of a file, tolerating a UTF-8 sequence split at either edge of the slice"""
+    if data.startswith(codecs.BOM_UTF8):
+        return decode_range(data[len(codecs.BOM_UTF8):])[0], 'utf-8-sig'
+    try:
+        return data.decode('utf-8'), 'utf-8'
+    except UnicodeDecodeError as e:
+        if e.start >= len(data) - 3 or e.end <= 3:
             try:
-                with open(file_path, 'r', encoding=encoding) as f:
-                    content = f.read()
-                    encoding_used = encoding
-                    break
+                return data[:e.start].decode('utf-8') + data[e.start:].decode('utf-8', errors='replace'), 'utf-8'
             except UnicodeDecodeError:
-                continue
+                pass
+    return decode_8bit(data)
+
+def read_document_range(file_path: str, max_size: int = 1024 * 1024, offset: int = None, length: int = None,
+                        start_line: int = None, line_count: int = None) -> Dict[str, Any]:
+    """Read a byte or line range of a document without loading the whole file"""
+    result = read_range(file_path, max_size, offset, length, start_line, line_count)
+    server.stats.add_bytes_read(len(result["data"]))
+    content, encoding_used = decode_range(result["data"])
+    file_name = os.path.basename(file_path)
+    
+    if start_line is not None:
+        range_text = f"lines {result['first_line']}-{result['last_line']} of {result['total_lines']}"
+    else:
+        range_text = f"bytes {result['start']}-{result['end']} of {result['file_size']}"
+    
+    return {
+        "success": True,
+        "content": content,
+        "file_path": os.path.abspath(file_path),
+        "file_name": file_name,
+        "file_size": result["file_size"],
+        "encoding": encoding_used,
+        "lines": result.get("total_lines"),
+        "range": range_text,
+        "truncated": result["truncated"],
+        "message": f"Successfully read {range_text} of {file_name}{' (truncated)' if result['truncated'] else ''}"
+    }
+
+def stat_document(file_path: str) -> Tuple[Any, Dict[str, Any]]:
+    """Stat a document, returning (stat, None) or (None, error result) if it is missing or unsupported"""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None, {
+            "success": False,
+            "error": "File not found",
+            "message": f"File does not exist: {file_path}"
+        }
+    
+    # Check if it's a supported file type
+    supported_extensions = get_supported_extensions()
+    file_ext = os.path.splitext(file_path)[1].lower()
+    if file_ext not in supported_extensions:
+        return None, {
+            "success": False,
+            "error": "Unsupported file type",
+            "message": f"File extension '{file_ext}' is not supported. Supported: {', '.join(supported_extensions)}"
+        }
+    return stat, None
+
+def load_document(abs_path: str, stat: os.stat_result) -> Tuple[str, str, int, str]:
+    """Return (content, encoding, line count, version token) for a document, through the content cache"""
+    cached = content_cache.get(abs_path, stat)
+    if cached is not None:
+        return cached
+    # Read the bytes once, then decode from memory with the detected encoding
+    with open(abs_path, 'rb') as f:
+        data = f.read()
+    server.stats.add_bytes_read(len(data))
+    version = version_token(data)
+    content, encoding_used = decode_bytes(data)
+    # Match the universal newline translation of text-mode reads
+    if '\r' in content:
+        content = content.replace('\r\n', '\n').replace('\r', '\n')
+    loaded = (content, encoding_used, len(content.splitlines()), version)
+    content_cache.put(abs_path, stat, loaded, stat.st_size)
+    return loaded
+
+def cached_document_text(abs_path: str) -> Optional[str]:
+    """Decoded text of a document through the content cache, or None if it cannot be read"""
+    try:
+        return load_document(abs_path, os.stat(abs_path))[0]
+    except OSError:
+        return None
+
+def read_document(file_path: str, max_size: int = 1024 * 1024, offset: int = None, length: int = None,
+                  start_line: int = None, line_count: int = None) -> Dict[str, Any]:
+    """Read content from a document file, or only a byte/line range of it"""
+    try:
+        # A single stat both checks existence and validates the content cache
+        stat, error = stat_document(file_path)
+        if error:
+            return error
         
-        if content is None:
+        if any(arg is not None for arg in (offset, length, start_line, line_count)):
+            if start_line is None and line_count is not None:
+                start_line = 1
+            return read_document_range(file_path, max_size, offset, length, start_line, line_count)
+        
+        # Check file size
+        file_size = stat.st_size
+        if file_size > max_size:
             return {
                 "success": False,
-                "error": "Encoding error",
-                "message": "Could not decode file with any supported encoding"
+                "error": "File too large",
+                "message": f"File size ({file_size} bytes) exceeds maximum ({max_size} bytes); use offset/length or start_line/line_count to read a range"
             }
         
+        abs_path = os.path.abspath(file_path)
+        content, encoding_used, line_total, version = load_document(abs_path, stat)
+        version_store.put(version, abs_path, content)
+        
         return {
             "success": True,
             "content": content,
-            "file_path": os.path.abspath(file_path),
+            "file_path": abs_path,
             "file_name": os.path.basename(file_path),
             "file_size": file_size,
             "encoding": encoding_used,
-            "lines": len(content.splitlines()),
-            "message": f"Successfully read {os.path.basename(file_path)} ({file_size} bytes, {len(content.splitlines())} lines)"
+            "lines": line_total,
+            "version": version,
+            "message": f"Successfully read {os.path.basename(file_path)} ({file_size} bytes, {line_total} lines)"
         }
         
     except Exception as e:
@@ -130,8 +322,12 @@ def read_document(file_path: str, max_size: int = 1024 * 1024) -> Dict[str, Any]
             "message": f"Error reading file: {str(e)}"
         }
 
-def get_document_info(file_path: str) -> Dict[str, Any]:
-    """Get information about a document without reading its content"""
+def get_document_info(file_path: str, include_hash: bool = False) -> Dict[str, Any]:
+    """Get information about a document without reading its content
+
+    With include_hash, supported documents up to MAX_HASH_BYTES are read once to
+    hash them; "hash_skipped" says why any other file was not.
+    """
     try:
         if not os.path.exists(file_path):
             return {
@@ -142,6 +338,17 @@ def get_document_info(file_path: str) -> Dict[str, Any]:
         
         stat = os.stat(file_path)
         file_ext = os.path.splitext(file_path)[1].lower()
+        is_supported = file_ext in get_supported_extensions()
+        
+        digest = None
+        hash_skipped = None
+        if include_hash:
+            if not os.path.isfile(file_path) or not is_supported:
+                hash_skipped = "not a supported document"
+            elif stat.st_size > MAX_HASH_BYTES:
+                hash_skipped = f"larger than the {MAX_HASH_BYTES // (1024 * 1024)}MB hash limit"
+            else:
+                digest = content_hash(file_path, stat)
         
         return {
             "success": True,
@@ -150,7 +357,9 @@ def get_document_info(file_path: str) -> Dict[str, Any]:
             "extension": file_ext,
             "size": stat.st_size,
             "modified": stat.st_mtime,
-            "is_supported": file_ext in get_supported_extensions(),
+            "is_supported": is_supported,
+            "hash": digest,
+            "hash_skipped": hash_skipped,
             "message": f"File info for {os.path.basename(file_path)}"
         }
         
@@ -161,291 +370,1046 @@ def get_document_info(file_path: str) -> Dict[str, Any]:
             "message": f"Error getting file info: {str(e)}"
         }
 
-def handle_mcp_request(request: Dict[str, Any]) -> Dict[str, Any]:
-    """Handle MCP protocol requests"""
+def get_document_outline(file_path: str, max_level: int = 6) -> Dict[str, Any]:
+    """Get the heading outline of a document, parsed once per file version"""
+    try:
+        stat, error = stat_document(file_path)
+        if error:
+            return error
+        
+        outline = get_outline(file_path, stat)
+        sections = [section.to_dict() for section in outline.sections if section.level <= max_level]
+        return {
+            "success": True,
+            "file_path": os.path.abspath(file_path),
+            "file_name": os.path.basename(file_path),
+            "file_size": stat.st_size,
+            "sections": sections,
+            "message": f"Found {len(sections)} sections in {os.path.basename(file_path)}"
+        }
+        
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "message": f"Error reading outline: {str(e)}"
+        }
+
+def read_document_section(file_path: str, heading: str = None, anchor: str = None,
+                          include_subsections: bool = True, max_size: int = 1024 * 1024) -> Dict[str, Any]:
+    """Read one section of a document, seeking straight to its bytes via the cached outline"""
     try:
-        method = request.get("method")
-        params = request.get("params", {})
-        request_id = request.get("id")
+        stat, error = stat_document(file_path)
+        if error:
+            return error
         
-        if method == "initialize":
+        outline = get_outline(file_path, stat)
+        if anchor:
+            section = outline.by_anchor(anchor)
+            matches = [section] if section else []
+            wanted = f"#{anchor.lstrip('#')}"
+        else:
+            matches = outline.by_path(heading.split(">"))
+            wanted = f"'{heading}'"
+        if not matches:
+            return {
+                "success": False,
+                "error": "Section not found",
+                "message": f"No section {wanted} in {os.path.basename(file_path)}; use get_document_outline to list sections"
+            }
+        if len(matches) > 1:
+            anchors = ", ".join(f"#{section.anchor}" for section in matches)
             return {
-                "jsonrpc": "2.0",
-                "id": request_id,
-                "result": {
-                    "protocolVersion": "2024-11-05",
-                    "capabilities": {
-                        "tools": {}
-                    },
-                    "serverInfo": {
-                        "name": "document-reader",
-                        "version": "1.0.0"
-                    }
-                }
+                "success": False,
+                "error": "Ambiguous section",
+                "message": f"{len(matches)} sections match {wanted}; pass a longer heading path or one of the anchors: {anchors}"
             }
         
-        elif method == "tools/list":
+        section = matches[0]
+        start = section.start
+        end = section.end if include_subsections else section.body_end
+        truncated = end - start > max_size
+        with open(file_path, 'rb') as f:
+            f.seek(start)
+            data = f.read(min(end - start, max_size))
+        if truncated:
+            # End on a line boundary when the cut falls inside the section
+            cut = data.rfind(b'\n')
+            if cut >= 0:
+                data = data[:cut + 1]
+        server.stats.add_bytes_read(len(data))
+        content, encoding_used = decode_range(data)
+        if '\r' in content:
+            content = content.replace('\r\n', '\n').replace('\r', '\n')
+        
+        range_text = f"bytes {start}-{start + len(data)} of {stat.st_size}"
+        return {
+            "success": True,
+            "content": content,
+            "file_path": os.path.abspath(file_path),
+            "file_name": os.path.basename(file_path),
+            "file_size": stat.st_size,
+            "section": section.to_dict(),
+            "encoding": encoding_used,
+            "range": range_text,
+            "truncated": truncated,
+            "message": f"Successfully read section '{section.title}' ({range_text}){' (truncated)' if truncated else ''}"
+        }
+        
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "message": f"Error reading section: {str(e)}"
+        }
+
+def chunk_document(file_path: str, max_tokens: int = DEFAULT_MAX_TOKENS,
+                   overlap_tokens: int = DEFAULT_OVERLAP_TOKENS) -> Dict[str, Any]:
+    """Split a document into overlapping chunks, cached per file version and chunk size"""
+    try:
+        stat, error = stat_document(file_path)
+        if error:
+            return {**error, "file_path": os.path.abspath(file_path)}
+        
+        chunks, cached = get_chunks(file_path, stat, max_tokens, overlap_tokens)
+        if not cached:
+            server.stats.add_bytes_read(stat.st_size)
+        return {
+            "success": True,
+            "chunks": chunks,
+            "file_path": os.path.abspath(file_path),
+            "file_name": os.path.basename(file_path),
+            "file_size": stat.st_size,
+            "cached": cached,
+            "message": f"Split {os.path.basename(file_path)} into {len(chunks)} chunks"
+        }
+        
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "file_path": os.path.abspath(file_path),
+            "message": f"Error chunking file: {str(e)}"
+        }
+
+def chunk_documents_page(file_paths: List[str], max_tokens: int = DEFAULT_MAX_TOKENS,
+                         overlap_tokens: int = DEFAULT_OVERLAP_TOKENS, limit: int = 50,
+                         cursor: str = None) -> Dict[str, Any]:
+    """Return up to limit chunks from a list of documents, resuming after cursor
+
+    Documents are chunked in order and only as far as the page needs, so every
+    page costs about the same however large the corpus is.
+    """
+    file_index, chunk_index = 0, 0
+    if cursor:
+        try:
+            cursor_path, cursor_chunk = decode_cursor(cursor)
+            keys = [os.path.normcase(os.path.abspath(path)) for path in file_paths]
+            file_index = keys.index(cursor_path)
+            # int() would also take "-1", " 2" or "1_0"
+            if not (cursor_chunk.isascii() and cursor_chunk.isdigit()):
+                raise ValueError(cursor_chunk)
+            chunk_index = int(cursor_chunk)
+        except ValueError:
+            return {"success": False, "error": "Invalid cursor", "message": f"Invalid cursor: {cursor}"}
+    
+    documents = []
+    remaining = limit
+    next_cursor = None
+    for i in range(file_index, len(file_paths)):
+        if remaining == 0:
+            next_cursor = encode_cursor((os.path.normcase(os.path.abspath(file_paths[i])), str(chunk_index)))
+            break
+        result = chunk_document(file_paths[i], max_tokens, overlap_tokens)
+        if result["success"]:
+            chunks = result["chunks"]
+            result["total_chunks"] = len(chunks)
+            result["chunks"] = chunks[chunk_index:chunk_index + remaining]
+            remaining -= len(result["chunks"])
+            if chunk_index + len(result["chunks"]) < len(chunks):
+                next_cursor = encode_cursor((os.path.normcase(os.path.abspath(file_paths[i])),
+                                             str(chunk_index + len(result["chunks"]))))
+                documents.append(result)
+                break
+        documents.append(result)
+        chunk_index = 0
+    
+    returned = sum(len(doc["chunks"]) for doc in documents if doc["success"])
+    return {
+        "success": True,
+        "documents": documents,
+        "chunks": returned,
+        "next_cursor": next_cursor,
+        "message": f"Returned {returned} chunks from {len(documents)} documents"
+    }
+
+def read_document_delta(file_path: str, since: str, max_size: int = 1024 * 1024) -> Dict[str, Any]:
+    """Read a document as a line diff against a version the client already has
+
+    Falls back to the full content when the base version is no longer stored or
+    the diff would not be smaller than the document.
+    """
+    result = read_document(file_path, max_size)
+    if not result["success"]:
+        return result
+    
+    version = result["version"]
+    if since == version:
+        result.update({"delta": "unchanged", "content": "", "message": f"{result['file_name']} is unchanged since version {since}"})
+        return result
+    
+    base = version_store.get(since, result["file_path"])
+    if base is None:
+        result.update({"delta": "full", "message": f"Version {since} of {result['file_name']} is not available; returning the full content"})
+        return result
+    
+    diff, changed = line_delta(base, result["content"])
+    if len(diff) >= len(result["content"]):
+        result.update({"delta": "full", "message": f"{result['file_name']} changed too much since version {since} for a diff; returning the full content"})
+        return result
+    
+    result.update({
+        "delta": "diff",
+        "content": diff,
+        "changed_lines": changed,
+        "message": f"{changed} lines of {result['file_name']} changed since version {since}"
+    })
+    return result
+
+def get_batch_executor() -> ThreadPoolExecutor:
+    """Get the thread pool that runs the per-file work of batch tools"""
+    global _batch_executor
+    with _batch_executor_lock:
+        if _batch_executor is None:
+            _batch_executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix="docreader-batch")
+        return _batch_executor
+
+def resolve_batch_paths(file_paths: List[str] = None, pattern: str = None, directory: str = None) -> List[str]:
+    """Combine explicit paths with the files matched by a glob pattern, dropping duplicates"""
+    paths = list(file_paths or [])
+    if pattern:
+        base = directory or os.getcwd()
+        matches = sorted(glob.glob(os.path.join(base, pattern), recursive=True))
+        paths.extend(path for path in matches if os.path.isfile(path))
+    seen = set()
+    unique = []
+    for path in paths:
+        key = os.path.normcase(os.path.abspath(path))
+        if key not in seen:
+            seen.add(key)
+            unique.append(path)
+    return unique[:MAX_BATCH_FILES]
+
+def get_documents_info(file_paths: List[str], include_hash: bool = False) -> List[Dict[str, Any]]:
+    """Get information about many documents in parallel, in input order"""
+    return list(get_batch_executor().map(lambda path: get_document_info(path, include_hash), file_paths))
+
+def find_duplicate_documents(directory: str = None, recursive: bool = True, min_size: int = 1) -> Dict[str, Any]:
+    """Group identical documents by content hash
+
+    Files are bucketed by their current size first (stat'ed here rather than taken
+    from a possibly stale index), so only files sharing a size with another file
+    are hashed, and those are hashed in parallel.
+    """
+    try:
+        if directory is None:
+            directory = os.getcwd()
+        
+        if not os.path.exists(directory):
             return {
-                "jsonrpc": "2.0",
-                "id": request_id,
-                "result": {
-                    "tools": [
-                        {
-                            "name": "read_document",
-                            "description": "Read content from a .md or .txt file",
-                            "inputSchema": {
-                                "type": "object",
-                                "properties": {
-                                    "file_path": {
-                                        "type": "string",
-                                        "description": "Path to the document file to read"
-                                    },
-                                    "max_size": {
-                                        "type": "integer",
-                                        "description": "Maximum file size in bytes (default: 1MB)",
-                                        "default": 1048576
-                                    }
-                                },
-                                "required": ["file_path"]
-                            }
-                        },
-                        {
-                            "name": "list_documents",
-                            "description": "List all .md and .txt files in a directory",
-                            "inputSchema": {
-                                "type": "object",
-                                "properties": {
-                                    "directory": {
-                                        "type": "string",
-                                        "description": "Directory to search (default: current directory)"
-                                    },
-                                    "recursive": {
-                                        "type": "boolean",
-                                        "description": "Search subdirectories recursively (default: true)",
-                                        "default": True
-                                    }
-                                },
-                                "required": []
-                            }
-                        },
-                        {
-                            "name": "get_document_info",
-                            "description": "Get information about a document file without reading its content",
-                            "inputSchema": {
-                                "type": "object",
-                                "properties": {
-                                    "file_path": {
-                                        "type": "string",
-                                        "description": "Path to the document file"
-                                    }
-                                },
-                                "required": ["file_path"]
-                            }
-                        },
-                        {
-                            "name": "get_supported_extensions",
-                            "description": "Get list of supported file extensions",
-                            "inputSchema": {
-                                "type": "object",
-                                "properties": {},
-                                "required": []
-                            }
-                        }
-                    ]
-                }
+                "success": False,
+                "error": "Directory not found",
+                "message": f"Directory does not exist: {directory}"
             }
         
-        elif method == "tools/call":
-            tool_name = params.get("name")
-            arguments = params.get("arguments", {})
-            
-            if tool_name == "read_document":
-                file_path = arguments.get("file_path", "")
-                max_size = arguments.get("max_size", 1024 * 1024)
-                
-                if not file_path:
-                    return {
-                        "jsonrpc": "2.0",
-                        "id": request_id,
-                        "error": {
-                            "code": -32602,
-                            "message": "file_path parameter is required"
-                        }
-                    }
-                
-                result = read_document(file_path, max_size)
-                
-                if result["success"]:
-                    content_text = f"File: {result['file_name']}\n"
-                    content_text += f"Path: {result['file_path']}\n"
-                    content_text += f"Size: {result['file_size']} bytes\n"
-                    content_text += f"Lines: {result['lines']}\n"
-                    content_text += f"Encoding: {result['encoding']}\n"
-                    content_text += f"\n--- Content ---\n{result['content']}"
-                else:
-                    content_text = f"Error: {result['message']}"
-                
-                return {
-                    "jsonrpc": "2.0",
-                    "id": request_id,
-                    "result": {
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": content_text
-                            }
-                        ]
-                    }
-                }
-            
-            elif tool_name == "list_documents":
-                directory = arguments.get("directory")
-                recursive = arguments.get("recursive", True)
-                
-                documents = find_documents(directory, recursive)
-                
-                if documents:
-                    doc_list = f"Found {len(documents)} documents:\n\n"
-                    for doc in documents:
-                        doc_list += f"• {doc['name']} ({doc['extension']})\n"
-                        doc_list += f"  Path: {doc['relative_path']}\n"
-                        doc_list += f"  Size: {doc['size']} bytes\n\n"
-                else:
-                    search_dir = directory or os.getcwd()
-                    doc_list = f"No supported documents found in: {search_dir}\n"
-                    doc_list += f"Supported extensions: {', '.join(get_supported_extensions())}"
-                
-                return {
-                    "jsonrpc": "2.0",
-                    "id": request_id,
-                    "result": {
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": doc_list
-                            }
-                        ]
-                    }
-                }
-            
-            elif tool_name == "get_document_info":
-                file_path = arguments.get("file_path", "")
-                
-                if not file_path:
-                    return {
-                        "jsonrpc": "2.0",
-                        "id": request_id,
-                        "error": {
-                            "code": -32602,
-                            "message": "file_path parameter is required"
-                        }
-                    }
-                
-                result = get_document_info(file_path)
-                
-                if result["success"]:
-                    info_text = f"File Information:\n"
-                    info_text += f"Name: {result['name']}\n"
-                    info_text += f"Path: {result['path']}\n"
-                    info_text += f"Extension: {result['extension']}\n"
-                    info_text += f"Size: {result['size']} bytes\n"
-                    info_text += f"Modified: {result['modified']}\n"
-                    info_text += f"Supported: {'Yes' if result['is_supported'] else 'No'}"
-                else:
-                    info_text = f"Error: {result['message']}"
-                
-                return {
-                    "jsonrpc": "2.0",
-                    "id": request_id,
-                    "result": {
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": info_text
-                            }
-                        ]
-                    }
-                }
-            
-            elif tool_name == "get_supported_extensions":
-                extensions = get_supported_extensions()
-                ext_text = f"Supported file extensions:\n"
-                ext_text += "\n".join([f"• {ext}" for ext in extensions])
-                
-                return {
-                    "jsonrpc": "2.0",
-                    "id": request_id,
-                    "result": {
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": ext_text
-                            }
-                        ]
-                    }
-                }
-            
-            else:
-                return {
-                    "jsonrpc": "2.0",
-                    "id": request_id,
-                    "error": {
-                        "code": -32601,
-                        "message": f"Unknown tool: {tool_name}"
-                    }
-                }
+        root = os.path.abspath(directory)
+        by_size: Dict[int, List[Tuple[str, os.stat_result]]] = {}
+        scanned = 0
+        for rel_dir, name, _, _ in iter_documents(root, recursive):
+            rel_path = entry_relative_path(rel_dir, name)
+            try:
+                stat = os.stat(os.path.join(root, rel_path))
+            except OSError:
+                # Deleted since it was indexed
+                continue
+            scanned += 1
+            if stat.st_size >= min_size:
+                by_size.setdefault(stat.st_size, []).append((rel_path, stat))
+        
+        candidates = [candidate for group in by_size.values() if len(group) > 1 for candidate in group]
         
+        def hash_candidate(candidate: Tuple[str, os.stat_result]):
+            try:
+                return content_hash(os.path.join(root, candidate[0]), candidate[1])
+            except OSError:
+                return None
+        
+        # Same hash implies same size, but keying on both keeps a file that changed mid-scan apart
+        by_hash: Dict[Tuple[str, int], List[str]] = {}
+        for (rel_path, stat), digest in zip(candidates, get_batch_executor().map(hash_candidate, candidates)):
+            if digest is not None:
+                by_hash.setdefault((digest, stat.st_size), []).append(rel_path)
+        
+        groups = [
+            {"hash": digest, "size": size, "paths": sorted(paths)}
+            for (digest, size), paths in by_hash.items() if len(paths) > 1
+        ]
+        # Largest savings first
+        groups.sort(key=lambda group: (-group["size"] * (len(group["paths"]) - 1), group["paths"][0]))
+        
+        wasted = sum(group["size"] * (len(group["paths"]) - 1) for group in groups)
+        return {
+            "success": True,
+            "directory": root,
+            "groups": groups,
+            "documents": scanned,
+            "hashed": len(candidates),
+            "wasted_bytes": wasted,
+            "message": f"Found {len(groups)} groups of identical documents among {scanned} documents ({len(candidates)} hashed)"
+        }
+        
+    except Exception as e:
+        log_message(f"Error finding duplicate documents: {e}", "ERROR")
+        return {
+            "success": False,
+            "error": str(e),
+            "message": f"Error finding duplicate documents: {str(e)}"
+        }
+
+def read_documents(file_paths: List[str], max_total_size: int = 10 * 1024 * 1024) -> Dict[str, Any]:
+    """Read many documents in parallel within an aggregate byte budget
+
+    Files are admitted in input order while their combined size fits the budget;
+    the rest are reported as skipped rather than read.
+    """
+    infos = get_documents_info(file_paths)
+    budget = max_total_size
+    admitted = []
+    results: List[Dict[str, Any]] = [None] * len(file_paths)
+    for i, info in enumerate(infos):
+        if not info["success"]:
+            results[i] = info
+        elif info["size"] > budget:
+            results[i] = {
+                "success": False,
+                "error": "Budget exceeded",
+                "file_path": info["path"],
+                "message": f"Skipped {info['name']} ({info['size']} bytes): only {budget} bytes of the {max_total_size} byte budget remain"
+            }
         else:
+            budget -= info["size"]
+            admitted.append(i)
+    
+    # Each admitted file fits the remaining budget, so its size when listed is its limit
+    limits = {i: infos[i]["size"] for i in admitted}
+    
+    def read(i: int) -> Dict[str, Any]:
+        result = read_document(file_paths[i], limits[i])
+        if result.get("error") == "File too large":
+            # It grew since it was listed: return its start, truncated to its share of the budget
+            result = read_document(file_paths[i], limits[i], offset=0)
+        return result
+    
+    for i, result in zip(admitted, get_batch_executor().map(read, admitted)):
+        results[i] = result
+    
+    bytes_read = sum(min(results[i]["file_size"], limits[i]) for i in admitted if results[i]["success"])
+    return {
+        "success": True,
+        "results": results,
+        "read": sum(1 for r in results if r["success"]),
+        "bytes_read": bytes_read,
+        "message": f"Read {sum(1 for r in results if r['success'])} of {len(results)} documents ({bytes_read} of {max_total_size} byte budget)"
+    }
+
+def format_read_result(result: Dict[str, Any]) -> str:
+    """Format a read_document result as tool output text"""
+    if not result["success"]:
+        return f"Error: {result['message']}"
+    content_text = f"File: {result['file_name']}\n"
+    content_text += f"Path: {result['file_path']}\n"
+    content_text += f"Size: {result['file_size']} bytes\n"
+    if result.get("range"):
+        content_text += f"Range: {result['range']}{' (truncated to max_size)' if result['truncated'] else ''}\n"
+    if result['lines'] is not None:
+        content_text += f"Lines: {result['lines']}\n"
+    content_text += f"Encoding: {result['encoding']}\n"
+    if result.get("version"):
+        content_text += f"Version: {result['version']}\n"
+    content_text += f"\n--- Content ---\n{result['content']}"
+    return content_text
+
+def format_info_result(result: Dict[str, Any]) -> str:
+    """Format a get_document_info result as tool output text"""
+    if not result["success"]:
+        return f"Error: {result['message']}"
+    info_text = f"File Information:\n"
+    info_text += f"Name: {result['name']}\n"
+    info_text += f"Path: {result['path']}\n"
+    info_text += f"Extension: {result['extension']}\n"
+    info_text += f"Size: {result['size']} bytes\n"
+    info_text += f"Modified: {result['modified']}\n"
+    info_text += f"Supported: {'Yes' if result['is_supported'] else 'No'}"
+    if result.get("hash"):
+        info_text += f"\n{HASH_ALGORITHM.upper()}: {result['hash']}"
+    elif result.get("hash_skipped"):
+        info_text += f"\n{HASH_ALGORITHM.upper()}: not computed ({result['hash_skipped']})"
+    return info_text
+
+def search_documents(query: str, directory: str = None, limit: int = 10) -> Dict[str, Any]:
+    """Search document contents with a ranked full-text index"""
+    try:
+        if directory is None:
+            directory = os.getcwd()
+        
+        if not os.path.exists(directory):
             return {
-                "jsonrpc": "2.0",
-                "id": request_id,
-                "error": {
-                    "code": -32601,
-                    "message": f"Unknown method: {method}"
-                }
+                "success": False,
+                "error": "Directory not found",
+                "message": f"Directory does not exist: {directory}"
             }
-    
+        
+        root = os.path.abspath(directory)
+        index = get_search_index(root, cached_document_text)
+        # Sizes and mtimes come from the document index, which restats files itself;
+        # the sync runs in the background and queries use the index as it stands
+        started = index.refresh(lambda: ((entry_relative_path(rel_dir, name), size, mtime)
+                                         for rel_dir, name, size, mtime in iter_documents(root)))
+        # Only the query that started a build waits for it; later ones answer at once
+        complete = index.wait_ready(SEARCH_BUILD_WAIT if started else 0)
+        results = index.search(query, limit)
+        
+        message = f"Found {len(results)} matching documents for '{query}'"
+        if not complete:
+            message += " (the search index is still being built, so results may be incomplete)"
+        return {
+            "success": True,
+            "query": query,
+            "results": results,
+            "complete": complete,
+            "message": message
+        }
+        
     except Exception as e:
-        log_message(f"Error handling request: {e}", "ERROR")
+        log_message(f"Error searching documents: {e}", "ERROR")
         return {
-            "jsonrpc": "2.0",
-            "id": request.get("id"),
-            "error": {
-                "code": -32603,
-                "message": f"Internal error: {str(e)}"
-            }
+            "success": False,
+            "error": str(e),
+            "message": f"Error searching documents: {str(e)}"
         }
 
+def get_max_concurrency() -> int:
+    """Get the number of requests handled concurrently (DOCREADER_MAX_CONCURRENCY, default 8)"""
+    try:
+        return max(1, int(os.environ.get("DOCREADER_MAX_CONCURRENCY", "8")))
+    except ValueError:
+        return 8
+
+server = MCPServer("document-reader", "1.0.0", max_concurrency=get_max_concurrency())
+server.stats.add_provider("content_cache", content_cache.stats)
+server.stats.add_provider("document_indexes", index_stats)
+server.stats.add_provider("search_indexes", search_index_stats)
+server.stats.add_provider("watchers", watcher_stats)
+server.stats.add_provider("outlines", outline_cache_stats)
+server.stats.add_provider("chunk_cache", chunk_cache.stats)
+server.stats.add_provider("content_hashes", hash_cache_stats)
+server.stats.add_provider("versions", version_store.stats)
+
+def require_int(arguments: Dict[str, Any], name: str, default: Any = None, minimum: int = 0, message: str = None) -> Any:
+    """Get an optional integer argument, raising InvalidParams if it is not an integer >= minimum"""
+    value = arguments.get(name, default)
+    if value is not None and (not isinstance(value, int) or isinstance(value, bool) or value < minimum):
+        raise InvalidParams(message or f"{name} must be an integer >= {minimum}")
+    return value
+
+def require_bool(arguments: Dict[str, Any], name: str, default: bool = False) -> bool:
+    """Get an optional boolean argument, raising InvalidParams if it is not a JSON boolean"""
+    value = arguments.get(name)
+    if value is None:
+        return default
+    if not isinstance(value, bool):
+        raise InvalidParams(f"{name} must be true or false")
+    return value
+
+@server.tool("read_document", "Read content from a .md or .txt file", {
+    "type": "object",
+    "properties": {
+        "file_path": {
+            "type": "string",
+            "description": "Path to the document file to read"
+        },
+        "max_size": {
+            "type": "integer",
+            "description": "Maximum file size in bytes, or maximum bytes returned for a range read (default: 1MB)",
+            "default": 1048576
+        },
+        "offset": {
+            "type": "integer",
+            "description": "Byte offset to start reading from (range read)",
+            "minimum": 0
+        },
+        "length": {
+            "type": "integer",
+            "description": "Number of bytes to read from offset (range read)",
+            "minimum": 0
+        },
+        "start_line": {
+            "type": "integer",
+            "description": "1-based line to start reading from (range read)",
+            "minimum": 1
+        },
+        "line_count": {
+            "type": "integer",
+            "description": "Number of lines to read from start_line (range read)",
+            "minimum": 0
+        }
+    },
+    "required": ["file_path"]
+})
+def handle_read_document(arguments: Dict[str, Any]) -> str:
+    file_path = arguments.get("file_path", "")
+    max_size = arguments.get("max_size", 1024 * 1024)
+    
+    if not file_path:
+        raise InvalidParams("file_path parameter is required")
+    
+    range_args = {
+        name: require_int(arguments, name, minimum=1 if name == "start_line" else 0)
+        for name in ("offset", "length", "start_line", "line_count")
+    }
+    uses_bytes = range_args["offset"] is not None or range_args["length"] is not None
+    uses_lines = range_args["start_line"] is not None or range_args["line_count"] is not None
+    if uses_bytes and uses_lines:
+        raise InvalidParams("Use either offset/length or start_line/line_count, not both")
+    
+    return format_read_result(read_document(file_path, max_size, **range_args))
+
+@server.tool("read_document_delta", "Read only what changed in a document since a version returned by an earlier read", {
+    "type": "object",
+    "properties": {
+        "file_path": {
+            "type": "string",
+            "description": "Path to the document file"
+        },
+        "since": {
+            "type": "string",
+            "description": "Version token from the 'Version:' line of a previous read_document or read_document_delta"
+        },
+        "max_size": {
+            "type": "integer",
+            "description": "Maximum file size in bytes (default: 1MB)",
+            "default": 1048576
+        }
+    },
+    "required": ["file_path", "since"]
+})
+def handle_read_document_delta(arguments: Dict[str, Any]) -> str:
+    file_path = arguments.get("file_path", "")
+    since = arguments.get("since", "")
+    max_size = arguments.get("max_size", 1024 * 1024)
+    
+    if not file_path:
+        raise InvalidParams("file_path parameter is required")
+    if not since or not isinstance(since, str):
+        raise InvalidParams("since parameter is required")
+    
+    result = read_document_delta(file_path, since, max_size)
+    if not result["success"]:
+        return f"Error: {result['message']}"
+    if result["delta"] == "full":
+        return f"{result['message']}\n\n{format_read_result(result)}"
+    content_text = f"File: {result['file_name']}\n"
+    content_text += f"Path: {result['file_path']}\n"
+    content_text += f"Size: {result['file_size']} bytes\n"
+    content_text += f"Lines: {result['lines']}\n"
+    content_text += f"Version: {result['version']}\n"
+    if result["delta"] == "unchanged":
+        content_text += f"\nUnchanged since version {since}"
+    else:
+        content_text += f"Base version: {since}\n"
+        content_text += f"\n--- Diff ({result['changed_lines']} lines changed) ---\n{result['content']}"
+    return content_text
+
+@server.tool("list_documents", "List all .md and .txt files in a directory", {
+    "type": "object",
+    "properties": {
+        "directory": {
+            "type": "string",
+            "description": "Directory to search (default: current directory)"
+        },
+        "recursive": {
+            "type": "boolean",
+            "description": "Search subdirectories recursively (default: true)",
+            "default": True
+        },
+        "parallelism": {
+            "type": "integer",
+            "description": "Number of directories to scan concurrently, useful on network filesystems (default: 1)",
+            "default": 1,
+            "minimum": 1,
+            "maximum": 64
+        },
+        "limit": {
+            "type": "integer",
+            "description": "Maximum number of documents to return in this page (default: all)",
+            "minimum": 1
+        },
+        "cursor": {
+            "type": "string",
+            "description": "Cursor from a previous page's 'Next cursor' line to continue listing"
+        }
+    },
+    "required": []
+})
+def handle_list_documents(arguments: Dict[str, Any]) -> str:
+    directory = arguments.get("directory")
+    recursive = arguments.get("recursive", True)
+    parallelism = require_int(arguments, "parallelism", 1, 1, "parallelism must be a positive integer")
+    limit = require_int(arguments, "limit", None, 1, "limit must be a positive integer")
+    cursor = arguments.get("cursor")
+    
+    result = list_documents_page(directory, recursive, parallelism, limit, cursor)
+    
+    if not result["success"]:
+        raise RPCError(-32602 if result["error"] == "Invalid cursor" else -32603, result["message"])
+    
+    documents = result["documents"]
+    if documents:
+        if limit is None and not cursor:
+            parts = [f"Found {result['total']} documents:\n\n"]
+        else:
+            parts = [f"Showing {len(documents)} of {result['total']} documents:\n\n"]
+        for doc in documents.records():
+            parts.append(
+                f"• {doc.name} ({doc.extension})\n"
+                f"  Path: {doc.relative_path}\n"
+                f"  Size: {doc.size} bytes\n\n"
+            )
+        if result["next_cursor"]:
+            parts.append(f"Next cursor: {result['next_cursor']}\n")
+        return "".join(parts)
+    if cursor:
+        return f"No more documents ({result['total']} total)"
+    search_dir = directory or os.getcwd()
+    doc_list = f"No supported documents found in: {search_dir}\n"
+    doc_list += f"Supported extensions: {', '.join(get_supported_extensions())}"
+    return doc_list
+
+HASH_PROPERTY = {
+    "type": "boolean",
+    "description": "Also read supported documents to include the SHA-256 of their content, cached until the "
+                   "file's size or mtime changes (default: false)",
+    "default": False
+}
+
+@server.tool("get_document_info", "Get information about a document file without reading its content", {
+    "type": "object",
+    "properties": {
+        "file_path": {
+            "type": "string",
+            "description": "Path to the document file"
+        },
+        "include_hash": HASH_PROPERTY
+    },
+    "required": ["file_path"]
+})
+def handle_get_document_info(arguments: Dict[str, Any]) -> str:
+    file_path = arguments.get("file_path", "")
+    include_hash = require_bool(arguments, "include_hash")
+    
+    if not file_path:
+        raise InvalidParams("file_path parameter is required")
+    
+    return format_info_result(get_document_info(file_path, include_hash))
+
+@server.tool("get_supported_extensions", "Get list of supported file extensions", {
+    "type": "object",
+    "properties": {},
+    "required": []
+})
+def handle_get_supported_extensions(arguments: Dict[str, Any]) -> str:
+    extensions = get_supported_extensions()
+    ext_text = f"Supported file extensions:\n"
+    ext_text += "\n".join([f"• {ext}" for ext in extensions])
+    return ext_text
+
+BATCH_PATH_PROPERTIES = {
+    "file_paths": {
+        "type": "array",
+        "items": {"type": "string"},
+        "description": "Paths of the document files"
+    },
+    "pattern": {
+        "type": "string",
+        "description": "Glob pattern (e.g. 'docs/**/*.md') matched relative to directory, in addition to file_paths"
+    },
+    "directory": {
+        "type": "string",
+        "description": "Base directory for pattern (default: current directory)"
+    }
+}
+
+def batch_paths(arguments: Dict[str, Any]) -> List[str]:
+    """Validate the file_paths/pattern/directory arguments of a batch tool and resolve them"""
+    file_paths = arguments.get("file_paths") or []
+    pattern = arguments.get("pattern")
+    
+    if not isinstance(file_paths, list) or not all(isinstance(p, str) and p for p in file_paths):
+        raise InvalidParams("file_paths must be a list of paths")
+    
+    if not file_paths and not pattern:
+        raise InvalidParams("file_paths or pattern parameter is required")
+    
+    return resolve_batch_paths(file_paths, pattern, arguments.get("directory"))
+
+@server.tool("read_documents", "Read many .md or .txt files in one call, within a total size budget", {
+    "type": "object",
+    "properties": {
+        **BATCH_PATH_PROPERTIES,
+        "max_total_size": {
+            "type": "integer",
+            "description": "Maximum combined size in bytes of the files read (default: 10MB)",
+            "default": 10485760
+        }
+    },
+    "required": []
+})
+def handle_read_documents(arguments: Dict[str, Any]) -> str:
+    max_total_size = require_int(arguments, "max_total_size", 10 * 1024 * 1024, 0,
+                                 "max_total_size must be a non-negative integer")
+    paths = batch_paths(arguments)
+    
+    result = read_documents(paths, max_total_size)
+    sections = [f"{result['message']}\n"]
+    for path, file_result in zip(paths, result["results"]):
+        sections.append(f"\n=== {path} ===\n{format_read_result(file_result)}\n")
+    return "".join(sections)
+
+@server.tool("get_documents_info", "Get information about many document files in one call without reading their content", {
+    "type": "object",
+    "properties": {
+        **BATCH_PATH_PROPERTIES,
+        "include_hash": HASH_PROPERTY
+    },
+    "required": []
+})
+def handle_get_documents_info(arguments: Dict[str, Any]) -> str:
+    paths = batch_paths(arguments)
+    include_hash = require_bool(arguments, "include_hash")
+    
+    results = get_documents_info(paths, include_hash)
+    sections = [f"Information for {len(results)} documents\n"]
+    for path, file_result in zip(paths, results):
+        sections.append(f"\n=== {path} ===\n{format_info_result(file_result)}\n")
+    return "".join(sections)
+
+@server.tool("find_duplicate_documents", "Find .md and .txt files with identical content in a directory", {
+    "type": "object",
+    "properties": {
+        "directory": {
+            "type": "string",
+            "description": "Directory to search (default: current directory)"
+        },
+        "recursive": {
+            "type": "boolean",
+            "description": "Search subdirectories recursively (default: true)",
+            "default": True
+        },
+        "min_size": {
+            "type": "integer",
+            "description": "Ignore files smaller than this many bytes (default: 1, skipping empty files)",
+            "default": 1,
+            "minimum": 0
+        },
+        "limit": {
+            "type": "integer",
+            "description": "Maximum number of duplicate groups to list, largest savings first (default: 50)",
+            "default": 50,
+            "minimum": 1
+        }
+    },
+    "required": []
+})
+def handle_find_duplicate_documents(arguments: Dict[str, Any]) -> str:
+    directory = arguments.get("directory")
+    recursive = arguments.get("recursive", True)
+    min_size = require_int(arguments, "min_size", 1, 0, "min_size must be a non-negative integer")
+    limit = require_int(arguments, "limit", 50, 1, "limit must be a positive integer")
+    
+    result = find_duplicate_documents(directory, recursive, min_size)
+    if not result["success"]:
+        return f"Error: {result['message']}"
+    
+    groups = result["groups"]
+    if not groups:
+        return f"No duplicate documents among {result['documents']} documents in {result['directory']}"
+    parts = [f"{result['message']}; {result['wasted_bytes']} bytes in redundant copies:\n\n"]
+    for number, group in enumerate(groups[:limit], 1):
+        parts.append(f"{number}. {len(group['paths'])} copies of {group['size']} bytes ({HASH_ALGORITHM} {group['hash'][:16]})\n")
+        for path in group["paths"]:
+            parts.append(f"   {path}\n")
+        parts.append("\n")
+    if len(groups) > limit:
+        parts.append(f"... {len(groups) - limit} more groups not shown\n")
+    return "".join(parts)
+
+@server.tool("search_documents", "Search the contents of all .md and .txt files in a directory, ranked by relevance", {
+    "type": "object",
+    "properties": {
+        "query": {
+            "type": "string",
+            "description": "Words to search for"
+        },
+        "directory": {
+            "type": "string",
+            "description": "Directory to search (default: current directory)"
+        },
+        "limit": {
+            "type": "integer",
+            "description": "Maximum number of results (default: 10)",
+            "default": 10,
+            "minimum": 1
+        }
+    },
+    "required": ["query"]
+})
+def handle_search_documents(arguments: Dict[str, Any]) -> str:
+    query = arguments.get("query", "")
+    directory = arguments.get("directory")
+    
+    if not query:
+        raise InvalidParams("query parameter is required")
+    
+    limit = require_int(arguments, "limit", 10, 1, "limit must be a positive integer")
+    
+    result = search_documents(query, directory, limit)
+    
+    if result["success"] and result["results"]:
+        parts = [f"{result['message']}:\n\n"]
+        for rank, match in enumerate(result["results"], 1):
+            parts.append(
+                f"{rank}. {match['name']} (score {match['score']:.2f})\n"
+                f"   Path: {match['relative_path']}\n"
+            )
+            if match["snippet"]:
+                parts.append(f"   {match['snippet']}\n")
+            parts.append("\n")
+        return "".join(parts)
+    if result["success"]:
+        if not result["complete"]:
+            return f"No documents match '{query}' yet; the search index is still being built"
+        return f"No documents match '{query}'"
+    return f"Error: {result['message']}"
+
+@server.tool("get_document_outline", "List the markdown headings of a document with their anchors and byte ranges", {
+    "type": "object",
+    "properties": {
+        "file_path": {
+            "type": "string",
+            "description": "Path to the document file"
+        },
+        "max_level": {
+            "type": "integer",
+            "description": "Deepest heading level to list (default: 6)",
+            "default": 6,
+            "minimum": 1,
+            "maximum": 6
+        }
+    },
+    "required": ["file_path"]
+})
+def handle_get_document_outline(arguments: Dict[str, Any]) -> str:
+    file_path = arguments.get("file_path", "")
+    
+    if not file_path:
+        raise InvalidParams("file_path parameter is required")
+    
+    max_level = require_int(arguments, "max_level", 6, 1, "max_level must be an integer from 1 to 6")
+    
+    result = get_document_outline(file_path, max_level)
+    if not result["success"]:
+        return f"Error: {result['message']}"
+    parts = [
+        f"File: {result['file_name']}\n",
+        f"Path: {result['file_path']}\n",
+        f"Size: {result['file_size']} bytes\n",
+        f"Sections: {len(result['sections'])}\n\n"
+    ]
+    for section in result["sections"]:
+        parts.append(
+            f"{'  ' * (section['level'] - 1)}{'#' * section['level']} {section['title']} "
+            f"(#{section['anchor']}, line {section['line']}, bytes {section['start']}-{section['end']})\n"
+        )
+    if not result["sections"]:
+        parts.append("No headings found\n")
+    return "".join(parts)
+
+@server.tool("read_document_section", "Read one section of a markdown document by heading path or anchor", {
+    "type": "object",
+    "properties": {
+        "file_path": {
+            "type": "string",
+            "description": "Path to the document file"
+        },
+        "heading": {
+            "type": "string",
+            "description": "Heading path separated by '>', e.g. 'Installation > Linux'; levels in between may be left out"
+        },
+        "anchor": {
+            "type": "string",
+            "description": "Section anchor as listed by get_document_outline, e.g. 'linux' or '#linux'"
+        },
+        "include_subsections": {
+            "type": "boolean",
+            "description": "Include the section's subsections (default: true)",
+            "default": True
+        },
+        "max_size": {
+            "type": "integer",
+            "description": "Maximum bytes returned (default: 1MB)",
+            "default": 1048576
+        }
+    },
+    "required": ["file_path"]
+})
+def handle_read_document_section(arguments: Dict[str, Any]) -> str:
+    file_path = arguments.get("file_path", "")
+    heading = arguments.get("heading")
+    anchor = arguments.get("anchor")
+    include_subsections = arguments.get("include_subsections", True)
+    
+    if not file_path:
+        raise InvalidParams("file_path parameter is required")
+    if not heading and not anchor:
+        raise InvalidParams("Either heading or anchor is required")
+    if heading and anchor:
+        raise InvalidParams("Use either heading or anchor, not both")
+    
+    max_size = require_int(arguments, "max_size", 1024 * 1024, 1, "max_size must be a positive integer")
+    
+    result = read_document_section(file_path, heading, anchor, include_subsections, max_size)
+    if not result["success"]:
+        return f"Error: {result['message']}"
+    section = result["section"]
+    content_text = f"File: {result['file_name']}\n"
+    content_text += f"Path: {result['file_path']}\n"
+    content_text += f"Section: {' > '.join(section['path'])} (#{section['anchor']}, line {section['line']})\n"
+    content_text += f"Range: {result['range']}{' (truncated to max_size)' if result['truncated'] else ''}\n"
+    content_text += f"Encoding: {result['encoding']}\n"
+    content_text += f"\n--- Content ---\n{result['content']}"
+    return content_text
+
+CHUNK_PROPERTIES = {
+    "max_tokens": {
+        "type": "integer",
+        "description": f"Maximum chunk size in tokens, estimated as 4 bytes each (default: {DEFAULT_MAX_TOKENS})",
+        "default": DEFAULT_MAX_TOKENS,
+        "minimum": MIN_MAX_TOKENS
+    },
+    "overlap_tokens": {
+        "type": "integer",
+        "description": f"Tokens repeated from the end of the previous chunk, less than half of max_tokens; chunks starting at a heading have none (default: {DEFAULT_OVERLAP_TOKENS})",
+        "default": DEFAULT_OVERLAP_TOKENS,
+        "minimum": 0
+    },
+    "limit": {
+        "type": "integer",
+        "description": "Maximum number of chunks to return in this page (default: 50)",
+        "default": 50,
+        "minimum": 1
+    },
+    "cursor": {
+        "type": "string",
+        "description": "Cursor from a previous page's 'Next cursor' line to continue"
+    }
+}
+
+def chunk_arguments(arguments: Dict[str, Any]) -> Tuple[int, int, int, Any]:
+    """Validate the max_tokens/overlap_tokens/limit/cursor arguments of the chunking tools"""
+    max_tokens = require_int(arguments, "max_tokens", DEFAULT_MAX_TOKENS, MIN_MAX_TOKENS)
+    overlap_tokens = require_int(arguments, "overlap_tokens", min(DEFAULT_OVERLAP_TOKENS, max_tokens // 4), 0)
+    if overlap_tokens * 2 >= max_tokens:
+        raise InvalidParams("overlap_tokens must be less than half of max_tokens")
+    limit = require_int(arguments, "limit", 50, 1, "limit must be a positive integer")
+    return max_tokens, overlap_tokens, limit, arguments.get("cursor")
+
+def format_chunk_page(result: Dict[str, Any], max_tokens: int, overlap_tokens: int) -> str:
+    """Format a chunk_documents_page result as tool output text"""
+    parts = [f"{result['message']} (max_tokens {max_tokens}, overlap_tokens {overlap_tokens})\n"]
+    for doc in result["documents"]:
+        if not doc["success"]:
+            parts.append(f"\n=== {doc.get('file_path', '')} ===\nError: {doc['message']}\n")
+            continue
+        parts.append(f"\n=== {doc['file_path']} ({doc['file_size']} bytes, {doc['total_chunks']} chunks) ===\n")
+        for chunk in doc["chunks"]:
+            section = f", section: {' > '.join(chunk.section)}" if chunk.section else ""
+            parts.append(
+                f"\n--- Chunk {chunk.index + 1}/{doc['total_chunks']} id={chunk.id} "
+                f"bytes {chunk.start}-{chunk.end}{section} ---\n{chunk.text}"
+            )
+            if not chunk.text.endswith("\n"):
+                parts.append("\n")
+    if result["next_cursor"]:
+        parts.append(f"\nNext cursor: {result['next_cursor']}\n")
+    return "".join(parts)
+
+@server.tool("chunk_document", "Split a document into size-bounded, overlapping chunks for retrieval, with stable ids and byte offsets", {
+    "type": "object",
+    "properties": {
+        "file_path": {
+            "type": "string",
+            "description": "Path to the document file"
+        },
+        **CHUNK_PROPERTIES
+    },
+    "required": ["file_path"]
+})
+def handle_chunk_document(arguments: Dict[str, Any]) -> str:
+    file_path = arguments.get("file_path", "")
+    
+    if not file_path:
+        raise InvalidParams("file_path parameter is required")
+    
+    max_tokens, overlap_tokens, limit, cursor = chunk_arguments(arguments)
+    result = chunk_documents_page([file_path], max_tokens, overlap_tokens, limit, cursor)
+    if not result["success"]:
+        raise InvalidParams(result["message"])
+    if not result["documents"][0]["success"]:
+        return f"Error: {result['documents'][0]['message']}"
+    return format_chunk_page(result, max_tokens, overlap_tokens)
+
+@server.tool("chunk_documents", "Split many documents into chunks for retrieval, paginated across files", {
+    "type": "object",
+    "properties": {
+        **BATCH_PATH_PROPERTIES,
+        **CHUNK_PROPERTIES
+    },
+    "required": []
+})
+def handle_chunk_documents(arguments: Dict[str, Any]) -> str:
+    paths = batch_paths(arguments)
+    max_tokens, overlap_tokens, limit, cursor = chunk_arguments(arguments)
+    
+    result = chunk_documents_page(paths, max_tokens, overlap_tokens, limit, cursor)
+    if not result["success"]:
+        raise InvalidParams(result["message"])
+    return format_chunk_page(result, max_tokens, overlap_tokens)
+
+def handle_mcp_request(request: Dict[str, Any]) -> Dict[str, Any]:
+    """Handle MCP protocol requests"""
+    return server.handle_request(request)
+
 def main():
     """Main MCP server loop"""
     log_message("Starting Document Reader MCP Server", "INFO")
     
+    atexit.register(flush_indexes)
+    atexit.register(close_watchers)
+    if index_enabled():
+        warm_start(os.getcwd())
+    
     try:
-        for line in sys.stdin:
-            line = line.strip()
-            if not line:
-                continue
-            
-            try:
-                request = json.loads(line)
-                response = handle_mcp_request(request)
-                print(json.dumps(response))
-                sys.stdout.flush()
-            except json.JSONDecodeError as e:
-                log_message(f"Invalid JSON: {e}", "ERROR")
-                error_response = {
-                    "jsonrpc": "2.0",
-                    "id": None,
-                    "error": {
-                        "code": -32700,
-                        "message": "Parse error"
-                    }
-                }
-                print(json.dumps(error_response))
-                sys.stdout.flush()
-    
-    except KeyboardInterrupt:
-        log_message("Server stopped by user", "INFO")
+        server.serve()
     except Exception as e:
         log_message(f"Server error: {e}", "ERROR")
         sys.exit(1)
@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+"""
+Shared stdio core for the MCP servers
+Registry-based JSON-RPC dispatch, pre-serialized static responses and buffered binary stdio
+"""
+
+import bisect
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, List, Optional, BinaryIO
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+PROTOCOL_VERSION = "2024-11-05"
+
+
+def log_message(message: str, level: str = "INFO"):
+    """Log messages to stderr for debugging"""
+    print(f"[{level}] {message}", file=sys.stderr)
+
+
+# Escaping everything outside ASCII keeps lone surrogates, which is how os functions
+# return undecodable filenames, serializable as \udcxx instead of failing the response
+_encoder = json.JSONEncoder(ensure_ascii=True, separators=(",", ":"))
+
+
+def _escaped_dumps(obj: Any) -> bytes:
+    return _encoder.encode(obj).encode("ascii")
+
+
+if orjson is not None:
+    def dumps(obj: Any) -> bytes:
+        """Serialize to compact JSON bytes"""
+        try:
+            return orjson.dumps(obj)
+        except orjson.JSONEncodeError:
+            # orjson rejects lone surrogates; this is rare enough to take the slow path
+            return _escaped_dumps(obj)
+
+    def loads(data: Any) -> Any:
+        """Parse JSON, accepting surrogate escapes (e.g. a filename echoed back) that orjson rejects"""
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            return json.loads(data)
+else:
+    dumps = _escaped_dumps
+    loads = json.loads
+
+
+class RPCError(Exception):
+    """A JSON-RPC error to return to the client"""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class InvalidParams(RPCError):
+    """Bad tool arguments (-32602)"""
+
+    def __init__(self, message: str):
+        super().__init__(-32602, message)
+
+
+# Upper bounds of the latency histogram buckets in milliseconds; slower calls land in a final overflow bucket
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+_LATENCY_BOUNDS_S = tuple(ms / 1000 for ms in LATENCY_BUCKETS_MS)
+
+
+class LatencyHistogram:
+    """Call, error and byte counters with a fixed-bucket latency histogram"""
+
+    __slots__ = ("calls", "errors", "bytes_returned", "total_seconds", "buckets")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.bytes_returned = 0
+        self.total_seconds = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def record(self, seconds: float, error: bool, size: int):
+        self.calls += 1
+        self.errors += error
+        self.bytes_returned += size
+        self.total_seconds += seconds
+        self.buckets[bisect.bisect_left(_LATENCY_BOUNDS_S, seconds)] += 1
+
+    def quantile_ms(self, fraction: float) -> Optional[float]:
+        """Upper bound of the bucket holding the given quantile (None if it is the overflow bucket)"""
+        target = fraction * self.calls
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= target:
+                return LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else None
+        return None
+
+    def to_dict(self) -> Dict[str, Any]:
+        labels = [f"<={ms}ms" for ms in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "bytes_returned": self.bytes_returned,
+            "mean_ms": self.total_seconds / self.calls * 1000 if self.calls else 0.0,
+            "p50_ms": self.quantile_ms(0.50),
+            "p95_ms": self.quantile_ms(0.95),
+            "p99_ms": self.quantile_ms(0.99),
+            "histogram": {label: count for label, count in zip(labels, self.buckets) if count}
+        }
+
+
+class ServerStats:
+    """Per-method and per-tool request statistics plus stats from registered providers"""
+
+    def __init__(self):
+        self.started = time.time()
+        self.bytes_read = 0
+        self._methods: Dict[str, LatencyHistogram] = {}
+        self._tools: Dict[str, LatencyHistogram] = {}
+        self._providers: Dict[str, Callable[[], Any]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, method: Any, tool: Any, seconds: float, error: bool, size: int):
+        """Count one handled request"""
+        # Malformed requests can carry any JSON value as the method or tool name
+        if not isinstance(method, str):
+            method = str(method)
+        if tool is not None and not isinstance(tool, str):
+            tool = str(tool)
+        with self._lock:
+            histogram = self._methods.get(method)
+            if histogram is None:
+                histogram = self._methods[method] = LatencyHistogram()
+            histogram.record(seconds, error, size)
+            if tool is not None:
+                histogram = self._tools.get(tool)
+                if histogram is None:
+                    histogram = self._tools[tool] = LatencyHistogram()
+                histogram.record(seconds, error, size)
+
+    def add_bytes_read(self, size: int):
+        """Count bytes a handler read from disk or another source"""
+        with self._lock:
+            self.bytes_read += size
+
+    def add_provider(self, name: str, provider: Callable[[], Any]):
+        """Include provider() (e.g. a cache's stats) under name in every snapshot"""
+        self._providers[name] = provider
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return all counters as a JSON-serializable dict"""
+        with self._lock:
+            snapshot = {
+                "uptime_seconds": time.time() - self.started,
+                "bytes_read": self.bytes_read,
+                "methods": {name: histogram.to_dict() for name, histogram in self._methods.items()},
+                "tools": {name: histogram.to_dict() for name, histogram in self._tools.items()}
+            }
+        for name, provider in self._providers.items():
+            try:
+                snapshot[name] = provider()
+            except Exception as e:
+                snapshot[name] = {"error": str(e)}
+        return snapshot
+
+
+def get_stats_interval() -> float:
+    """Seconds between periodic stats dumps (MCP_STATS_INTERVAL, default 0 = off)"""
+    try:
+        return max(0.0, float(os.environ.get("MCP_STATS_INTERVAL", "0")))
+    except ValueError:
+        return 0.0
+
+
+def error_response(request_id: Any, code: int, message: str) -> bytes:
+    """Serialize a JSON-RPC error response"""
+    return dumps({"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}})
+
+
+class MCPServer:
+    """An MCP server speaking newline-delimited JSON-RPC over stdio
+
+    Tools are registered with the tool() decorator; a handler takes the arguments
+    dict and returns the response text (or a full result dict) and raises
+    InvalidParams/RPCError for errors. Responses to initialize and tools/list never
+    change, so they are serialized once and spliced into each reply.
+    """
+
+    def __init__(self, name: str, version: str = "1.0.0", max_concurrency: int = 1):
+        self.name = name
+        self.version = version
+        self.max_concurrency = max(1, max_concurrency)
+        self._tools: Dict[str, Callable[[Dict[str, Any]], Any]] = {}
+        self._tool_specs: List[Dict[str, Any]] = []
+        self._methods: Dict[str, Callable[[Dict[str, Any]], Any]] = {"tools/call": self._call_tool}
+        self._static: Dict[str, bytes] = {}
+        self.stats = ServerStats()
+        self._methods["server/stats"] = lambda params: self.stats.snapshot()
+        self.static_method("initialize", {
+            "protocolVersion": PROTOCOL_VERSION,
+            "capabilities": {
+                "tools": {}
+            },
+            "serverInfo": {
+                "name": name,
+                "version": version
+            }
+        })
+        self.static_method("ping", {})
+
+    def tool(self, name: str, description: str, input_schema: Dict[str, Any]):
+        """Decorator registering a tool handler under a name with its schema"""
+        def register(handler: Callable[[Dict[str, Any]], Any]):
+            self._tools[name] = handler
+            self._tool_specs.append({"name": name, "description": description, "inputSchema": input_schema})
+            self.static_method("tools/list", {"tools": self._tool_specs})
+            return handler
+        return register
+
+    def method(self, name: str):
+        """Decorator registering a handler for another JSON-RPC method; it takes params and returns the result"""
+        def register(handler: Callable[[Dict[str, Any]], Any]):
+            self._methods[name] = handler
+            self._static.pop(name, None)
+            return handler
+        return register
+
+    def static_method(self, name: str, result: Any):
+        """Register a method whose result is always the same; it is serialized once"""
+        self._static[name] = dumps(result)
+
+    def _call_tool(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        tool_name = params.get("name")
+        handler = self._tools.get(tool_name)
+        if handler is None:
+            raise RPCError(-32601, f"Unknown tool: {tool_name}")
+        arguments = params.get("arguments")
+        if arguments is None:
+            arguments = {}
+        elif not isinstance(arguments, dict):
+            raise InvalidParams("Tool arguments must be an object")
+        result = handler(arguments)
+        if isinstance(result, str):
+            result = {"content": [{"type": "text", "text": result}]}
+        return result
+
+    def respond(self, request: Any) -> Optional[bytes]:
+        """Handle one decoded request, returning the serialized response (None for notifications)"""
+        if not isinstance(request, dict):
+            return error_response(None, -32600, "Invalid Request")
+        start = time.perf_counter()
+        request_id = request.get("id")
+        method = request.get("method")
+        params = request.get("params") or {}
+        tool = params.get("name") if method == "tools/call" and isinstance(params, dict) else None
+        try:
+            body = self._static.get(method)
+            if body is None:
+                handler = self._methods.get(method)
+                if handler is None:
+                    raise RPCError(-32601, f"Unknown method: {method}")
+                # Handlers take params as a dict; anything else is the client's error, not ours
+                if not isinstance(params, dict):
+                    raise InvalidParams("params must be an object")
+                body = dumps(handler(params))
+            response = b'{"jsonrpc":"2.0","id":' + dumps(request_id) + b',"result":' + body + b'}'
+            error = False
+        except RPCError as e:
+            response = error_response(request_id, e.code, e.message)
+            error = True
+        except Exception as e:
+            log_message(f"Error handling request: {e}", "ERROR")
+            response = error_response(request_id, -32603, f"Internal error: {str(e)}")
+            error = True
+        self.stats.record(method, tool, time.perf_counter() - start, error, len(response))
+        if "id" not in request:
+            return None
+        return response
+
+    def handle_request(self, request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Handle one request in-process and return the decoded response"""
+        response = self.respond(request)
+        return None if response is None else loads(response)
+
+    def serve(self, stdin: BinaryIO = None, stdout: BinaryIO = None):
+        """Read requests from stdin until EOF, writing responses to stdout
+
+        With max_concurrency > 1 requests run on a thread pool and responses are
+        written as they complete. A writer thread batches whatever responses are
+        ready into one write and flush.
+        """
+        stdin = stdin or sys.stdin.buffer
+        stdout = stdout or sys.stdout.buffer
+        output: "queue.Queue[Optional[bytes]]" = queue.Queue()
+
+        def write_output():
+            while True:
+                chunk = output.get()
+                chunks = []
+                while chunk is not None:
+                    chunks.append(chunk)
+                    try:
+                        chunk = output.get_nowait()
+                    except queue.Empty:
+                        break
+                if chunks:
+                    try:
+                        stdout.write(b"".join(chunks))
+                        stdout.flush()
+                    except (OSError, ValueError) as e:
+                        log_message(f"Error writing response: {e}", "ERROR")
+                if chunk is None:
+                    return
+
+        writer = threading.Thread(target=write_output, daemon=True, name=f"{self.name}-writer")
+        writer.start()
+
+        stopped = threading.Event()
+        interval = get_stats_interval()
+        if interval:
+            threading.Thread(target=self._dump_stats, args=(interval, stopped), daemon=True,
+                             name=f"{self.name}-stats").start()
+
+        def emit(response: Optional[bytes]):
+            if response is not None:
+                output.put(response + b"\n")
+
+        executor = None
+        # Bound the requests read ahead of the workers so a flood of input cannot grow memory
+        pending = threading.BoundedSemaphore(self.max_concurrency * 4)
+        if self.max_concurrency > 1:
+            executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix=f"{self.name}-request")
+
+        def process(request: Dict[str, Any]):
+            try:
+                emit(self.respond(request))
+            finally:
+                pending.release()
+
+        def submit_batch(requests: List[Any]):
+            # Elements run independently; whichever finishes last writes the whole array
+            responses: List[Optional[bytes]] = [None] * len(requests)
+            remaining = [len(requests)]
+            batch_lock = threading.Lock()
+
+            def process_element(index: int, request: Any):
+                try:
+                    responses[index] = self.respond(request)
+                    with batch_lock:
+                        remaining[0] -= 1
+                        done = remaining[0] == 0
+                    if done:
+                        parts = [response for response in responses if response is not None]
+                        if parts:
+                            emit(b"[" + b",".join(parts) + b"]")
+                finally:
+                    pending.release()
+
+            for index, request in enumerate(requests):
+                pending.acquire()
+                if executor is None:
+                    process_element(index, request)
+                else:
+                    executor.submit(process_element, index, request)
+
+        try:
+            for line in stdin:
+                line = line.strip()
+                if not line:
+                    continue
+
+                try:
+                    request = loads(line)
+                except ValueError as e:
+                    log_message(f"Invalid JSON: {e}", "ERROR")
+                    emit(error_response(None, -32700, "Parse error"))
+                    continue
+
+                if isinstance(request, list) and request:
+                    submit_batch(request)
+                    continue
+
+                if not isinstance(request, dict):
+                    emit(error_response(None, -32600, "Invalid Request"))
+                    continue
+
+                pending.acquire()
+                if executor is None:
+                    process(request)
+                else:
+                    executor.submit(process, request)
+
+        except KeyboardInterrupt:
+            log_message("Server stopped by user", "INFO")
+        finally:
+            # Let in-flight requests finish writing their responses before exiting
+            if executor is not None:
+                executor.shutdown(wait=True)
+            output.put(None)
+            writer.join()
+            stopped.set()
+
+    def _dump_stats(self, interval: float, stopped: threading.Event):
+        """Write a stats snapshot every interval seconds as one JSON line
+
+        Lines go to the file named by MCP_STATS_FILE if set, otherwise to stderr prefixed with [STATS].
+        """
+        path = os.environ.get("MCP_STATS_FILE")
+        while not stopped.wait(interval):
+            line = json.dumps({"server": self.name, "time": time.time(), **self.stats.snapshot()})
+            try:
+                if path:
+                    with open(path, "a", encoding="utf-8") as f:
+                        f.write(line + "\n")
+                else:
+                    log_message(line, "STATS")
+            except OSError as e:
+                log_message(f"Error writing stats: {e}", "ERROR")
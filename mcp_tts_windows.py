@@ -4,99 +4,218 @@ Free Windows TTS MCP Server for Windsurf IDE
 Uses Windows built-in SAPI text-to-speech (completely free, no API keys needed)
 """
 
-import json
+import atexit
+import os
 import sys
-import subprocess
 import platform
-from typing import Dict, Any, List
+import re
+import threading
+from typing import Dict, Any, List, Optional
 
-def log_message(message: str, level: str = "INFO"):
-    """Log messages to stderr for debugging"""
-    print(f"[{level}] {message}", file=sys.stderr)
+from mcp_server_core import MCPServer, InvalidParams, log_message
+from tts_cache import AudioCache, audio_key, get_audio_cache_dir, get_audio_cache_limit, wav_duration
+from tts_host import SynthesizerHost, HostError
+from tts_jobs import SpeechQueue, SpeechJob
+from tts_voices import VoiceCatalog
+
+DEFAULT_VOICE = "Microsoft Zira Desktop"
+
+# Text is spoken sentence by sentence; segments longer than this are split at clause or word boundaries
+MAX_SEGMENT_CHARS = 300
+
+# Each segment gets its own timeout, generous enough for the slowest speech rate
+SEGMENT_TIMEOUT_BASE = 10.0
+SEGMENT_TIMEOUT_PER_CHAR = 0.25
+
+SENTENCE_BREAK = re.compile(r"(?<=[.!?;:])\s+|\n\s*\n|\n(?=\s*[-*•\d])")
+CLAUSE_BREAK = re.compile(r"(?<=[,)])\s+")
+WORD_BREAK = re.compile(r"\s+")
+
+# One resident synthesizer process shared by every request
+synth_host = SynthesizerHost()
+
+# Rendered WAV files for phrases spoken with cache enabled
+audio_cache = AudioCache(get_audio_cache_dir(), get_audio_cache_limit())
+
+def fetch_voices() -> List[Dict[str, str]]:
+    """Ask the synthesizer host for the installed voices"""
+    response = synth_host.request("voices", timeout=10)
+    if not response.get("ok"):
+        raise HostError(f"Listing voices failed: {response.get('error')}")
+    return [
+        {
+            "name": str(voice.get("name", "")).strip(),
+            "culture": str(voice.get("culture", "")).strip(),
+            "gender": str(voice.get("gender", "")).strip()
+        }
+        for voice in response.get("voices") or []
+    ]
+
+def get_voice_cache_ttl() -> float:
+    """Seconds the voice list is trusted before a background refresh (TTS_VOICE_CACHE_TTL)"""
+    try:
+        return float(os.environ.get("TTS_VOICE_CACHE_TTL", 300))
+    except ValueError:
+        return 300.0
+
+# The host is busy while it speaks, so voice lookups are answered from memory
+voice_catalog = VoiceCatalog(fetch_voices, ttl=get_voice_cache_ttl())
 
 def get_windows_voices() -> List[Dict[str, str]]:
     """Get available Windows TTS voices"""
-    try:
-        # PowerShell command to get available voices
-        cmd = [
-            "powershell", "-Command",
-            "Add-Type -AssemblyName System.Speech; "
-            "(New-Object System.Speech.Synthesis.SpeechSynthesizer).GetInstalledVoices() | "
-            "ForEach-Object { $_.VoiceInfo.Name + '|' + $_.VoiceInfo.Culture + '|' + $_.VoiceInfo.Gender }"
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-        voices = []
+    voices = voice_catalog.voices()
+    
+    # Fallback to default if no voices found
+    if not voices:
+        log_message("No voices available from the synthesizer", "ERROR")
+        return [{"name": "Default", "culture": "en-US", "gender": "NotSet"}]
+    
+    return voices
+
+def resolve_voice(voice: str = None) -> Optional[str]:
+    """Resolve a requested voice to an installed voice name, or None if it is not installed
+
+    Never waits for the catalog: fetching it queues behind speech on the synthesizer
+    host, so until the first load finishes names are passed through unchanged.
+    """
+    if voice and voice != "Default":
+        return voice_catalog.resolve(voice, wait=False)
+    # Default to Microsoft Zira Desktop (female voice), else the first installed voice
+    default = voice_catalog.resolve(DEFAULT_VOICE, wait=False)
+    if default is None:
+        default = voice_catalog.voices(wait=False)[0]["name"]
+    return default
+
+def unknown_voice_message(voice: str) -> str:
+    """Describe a voice that is not installed, listing the ones that are"""
+    names = ", ".join(v["name"] for v in voice_catalog.voices(wait=False))
+    return f"Unknown voice: {voice}. Available voices: {names}"
+
+def split_long(segment: str, pattern, max_chars: int) -> List[str]:
+    """Greedily pack the pieces of a segment split by pattern into chunks of at most max_chars"""
+    chunks = []
+    current = ""
+    for piece in pattern.split(segment):
+        if current and len(current) + 1 + len(piece) > max_chars:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f"{current} {piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+def segment_text(text: str, max_chars: int = MAX_SEGMENT_CHARS) -> List[str]:
+    """Split text into sentence-sized segments of at most max_chars (single words excepted)"""
+    segments = []
+    for sentence in SENTENCE_BREAK.split(text):
+        sentence = " ".join(sentence.split())
+        if not sentence:
+            continue
+        if len(sentence) <= max_chars:
+            segments.append(sentence)
+            continue
+        for clause in split_long(sentence, CLAUSE_BREAK, max_chars):
+            if len(clause) <= max_chars:
+                segments.append(clause)
+            else:
+                segments.extend(split_long(clause, WORD_BREAK, max_chars))
+    return segments
+
+def segment_timeout(item: Dict[str, Any]) -> float:
+    """Timeout for speaking one segment"""
+    return SEGMENT_TIMEOUT_BASE + SEGMENT_TIMEOUT_PER_CHAR * len(item["text"])
+
+def speak_cached(text: str, voice: str, rate: int, proceed=None) -> Dict[str, Any]:
+    """Play text from the rendered-audio cache, rendering it to WAV first on a miss
+
+    Nothing more is sent to the host once proceed() returns False.
+    """
+    key = audio_key(text, voice, rate)
+    path = audio_cache.lookup(key)
+    if path is None:
+        failure = {}
         
-        if result.returncode == 0:
-            for line in result.stdout.strip().split('\n'):
-                if '|' in line:
-                    parts = line.split('|')
-                    if len(parts) >= 3:
-                        voices.append({
-                            "name": parts[0].strip(),
-                            "culture": parts[1].strip(),
-                            "gender": parts[2].strip()
-                        })
+        def render(temp_path: str):
+            response = synth_host.request(
+                "render", timeout=segment_timeout({"text": text}), proceed=proceed,
+                text=text, voice=voice, rate=rate, path=temp_path
+            )
+            if not response.get("ok"):
+                failure.update(response)
+                raise HostError(f"Render failed: {response.get('error')}")
         
-        # Fallback to default if no voices found
-        if not voices:
-            voices = [{"name": "Default", "culture": "en-US", "gender": "NotSet"}]
-            
-        return voices
-    except Exception as e:
-        log_message(f"Error getting voices: {e}", "ERROR")
-        return [{"name": "Default", "culture": "en-US", "gender": "NotSet"}]
+        try:
+            path = audio_cache.store(key, render)
+        except HostError:
+            if failure:
+                return failure
+            raise
+    duration = wav_duration(path)
+    return synth_host.request("play", timeout=SEGMENT_TIMEOUT_BASE + duration, proceed=proceed,
+                              path=path, duration=duration)
 
-def speak_text_windows(text: str, voice: str = None, rate: int = 3) -> Dict[str, Any]:
-    """Use Windows SAPI to speak text"""
+def speak_text_windows(text: str, voice: str = None, rate: int = 3, cancelled=None, cache: bool = False) -> Dict[str, Any]:
+    """Use Windows SAPI to speak text through the resident synthesizer host
+
+    The text is spoken as a pipeline of sentence segments: the next segment is already
+    queued in the host while the current one plays, so the first audio starts after one
+    sentence regardless of length and each segment has its own timeout. With cache set,
+    the whole text is rendered to a WAV file once and replayed from the audio cache.
+    """
     try:
-        # Escape text for PowerShell
-        escaped_text = text.replace("'", "''").replace('"', '""')
+        # Names are checked against the voice catalog so a bad voice fails before synthesis
+        selected_voice = resolve_voice(voice)
+        if selected_voice is None:
+            return {
+                "success": False,
+                "error": unknown_voice_message(voice),
+                "message": "Failed to speak text"
+            }
         
-        # Build PowerShell command
-        ps_command = [
-            "Add-Type -AssemblyName System.Speech;",
-            "$synth = New-Object System.Speech.Synthesis.SpeechSynthesizer;"
-        ]
+        # The host's synthesizer is reused, so voice and rate (-10 to 10, 0 = normal) are set every time
+        clamped_rate = max(-10, min(10, rate))
+        items = [{"text": segment, "voice": selected_voice, "rate": clamped_rate} for segment in segment_text(text)]
+        if not items:
+            return {
+                "success": False,
+                "error": "Nothing to speak",
+                "message": "Text contains no speakable content"
+            }
         
-        # Set voice if specified, default to female voice
-        if voice and voice != "Default":
-            ps_command.append(f"$synth.SelectVoice('{voice}');")
+        proceed = (lambda: not cancelled()) if cancelled else None
+        if cache:
+            responses = [speak_cached(" ".join(item["text"] for item in items), selected_voice, clamped_rate, proceed)]
         else:
-            # Default to Microsoft Zira Desktop (female voice)
-            ps_command.append("$synth.SelectVoice('Microsoft Zira Desktop');")
-        
-        # Set rate if specified (-10 to 10, where 0 is normal)
-        if rate != 0:
-            ps_command.append(f"$synth.Rate = {max(-10, min(10, rate))};")
-        
-        # Speak the text
-        ps_command.append(f"$synth.Speak('{escaped_text}');")
-        
-        # Execute PowerShell command
-        cmd = ["powershell", "-Command", " ".join(ps_command)]
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=45)
+            responses = synth_host.pipeline("speak", items, segment_timeout, proceed=proceed)
+        response = responses[-1]
         
-        if result.returncode == 0:
+        if response.get("ok"):
             return {
                 "success": True,
                 "message": f"Speaking: {text[:50]}{'...' if len(text) > 50 else ''}",
-                "voice": voice or "Microsoft Zira Desktop",
-                "rate": rate
+                "voice": selected_voice,
+                "rate": rate,
+                "segments": len(responses)
             }
         else:
             return {
                 "success": False,
-                "error": f"TTS failed: {result.stderr}",
+                "error": f"TTS failed: {response.get('error')}",
                 "message": "Failed to speak text"
             }
             
-    except subprocess.TimeoutExpired:
+    except HostError as e:
+        if "timed out" in str(e):
+            return {
+                "success": False,
+                "error": "TTS timeout",
+                "message": "Speech synthesis timed out"
+            }
         return {
             "success": False,
-            "error": "TTS timeout",
-            "message": "Speech synthesis timed out"
+            "error": str(e),
+            "message": "TTS error occurred"
         }
     except Exception as e:
         return {
@@ -105,193 +224,195 @@ def speak_text_windows(text: str, voice: str = None, rate: int = 3) -> Dict[str,
             "message": "TTS error occurred"
         }
 
-def handle_mcp_request(request: Dict[str, Any]) -> Dict[str, Any]:
-    """Handle MCP protocol requests"""
-    try:
-        method = request.get("method")
-        params = request.get("params", {})
-        request_id = request.get("id")
-        
-        if method == "initialize":
-            return {
-                "jsonrpc": "2.0",
-                "id": request_id,
-                "result": {
-                    "protocolVersion": "2024-11-05",
-                    "capabilities": {
-                        "tools": {}
-                    },
-                    "serverInfo": {
-                        "name": "windows-tts",
-                        "version": "1.0.0"
-                    }
-                }
-            }
-        
-        elif method == "tools/list":
-            return {
-                "jsonrpc": "2.0",
-                "id": request_id,
-                "result": {
-                    "tools": [
-                        {
-                            "name": "windows_tts",
-                            "description": "Convert text to speech using Windows built-in TTS (completely free)",
-                            "inputSchema": {
-                                "type": "object",
-                                "properties": {
-                                    "text": {
-                                        "type": "string",
-                                        "description": "Text to convert to speech"
-                                    },
-                                    "voice": {
-                                        "type": "string",
-                                        "description": "Voice name (optional, use list_voices to see available)",
-                                        "default": "Default"
-                                    },
-                                    "rate": {
-                                        "type": "integer",
-                                        "description": "Speech rate (-10 to 10, 0 = normal speed)",
-                                        "default": 0,
-                                        "minimum": -10,
-                                        "maximum": 10
-                                    }
-                                },
-                                "required": ["text"]
-                            }
-                        },
-                        {
-                            "name": "list_voices",
-                            "description": "List available Windows TTS voices",
-                            "inputSchema": {
-                                "type": "object",
-                                "properties": {},
-                                "additionalProperties": False
-                            }
-                        }
-                    ]
-                }
-            }
-        
-        elif method == "tools/call":
-            tool_name = params.get("name")
-            arguments = params.get("arguments", {})
-            
-            if tool_name == "windows_tts":
-                text = arguments.get("text", "")
-                voice = arguments.get("voice")
-                rate = arguments.get("rate", 0)
-                
-                if not text:
-                    return {
-                        "jsonrpc": "2.0",
-                        "id": request_id,
-                        "error": {
-                            "code": -32602,
-                            "message": "Text parameter is required"
-                        }
-                    }
-                
-                result = speak_text_windows(text, voice, rate)
-                
-                return {
-                    "jsonrpc": "2.0",
-                    "id": request_id,
-                    "result": {
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": result["message"]
-                            }
-                        ]
-                    }
-                }
-            
-            elif tool_name == "list_voices":
-                voices = get_windows_voices()
-                voice_list = "\n".join([
-                    f"• {voice['name']} ({voice['culture']}, {voice['gender']})"
-                    for voice in voices
-                ])
-                
-                return {
-                    "jsonrpc": "2.0",
-                    "id": request_id,
-                    "result": {
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": f"Available Windows TTS Voices:\n{voice_list}"
-                            }
-                        ]
-                    }
-                }
-            
-            else:
-                return {
-                    "jsonrpc": "2.0",
-                    "id": request_id,
-                    "error": {
-                        "code": -32601,
-                        "message": f"Unknown tool: {tool_name}"
-                    }
-                }
-        
-        else:
-            return {
-                "jsonrpc": "2.0",
-                "id": request_id,
-                "error": {
-                    "code": -32601,
-                    "message": f"Unknown method: {method}"
-                }
-            }
+def speak_job(job: SpeechJob) -> Dict[str, Any]:
+    """Speak a queued job; called from the speech worker thread"""
+    return speak_text_windows(job.text, job.voice, job.rate, cancelled=lambda: job.cancel_requested, cache=job.cache)
+
+# Speech runs on a background worker so requests are answered while audio plays.
+# Interrupting tells the host to cancel what it is speaking; the process stays up.
+speech_queue = SpeechQueue(speak_job, synth_host.interrupt)
+
+def format_job(job: Dict[str, Any]) -> str:
+    """Format a job description as one line"""
+    line = f"Job {job['id']}: {job['status']} - \"{job['text']}\""
+    if job["error"]:
+        line += f" ({job['error']})"
+    return line
+
+def format_speech_status(job_id: int = None) -> str:
+    """Describe one job, or the current job and the queue"""
+    if job_id is not None:
+        job = speech_queue.get(job_id)
+        return format_job(job.to_dict()) if job else f"Unknown speech job: {job_id}"
+    snapshot = speech_queue.snapshot()
+    lines = [f"Speaking: {format_job(snapshot['current']) if snapshot['current'] else 'nothing'}",
+             f"Queued: {len(snapshot['queued'])} job(s)"]
+    lines.extend(f"  {format_job(job)}" for job in snapshot["queued"])
+    if snapshot["recent"]:
+        lines.append("Recent:")
+        lines.extend(f"  {format_job(job)}" for job in snapshot["recent"])
+    cache_stats = audio_cache.stats()
+    if cache_stats["hits"] or cache_stats["misses"] or cache_stats["entries"]:
+        lines.append(
+            f"Audio cache: {cache_stats['entries']} phrase(s), {cache_stats['bytes'] / (1024 * 1024):.1f} MB, "
+            f"{cache_stats['hits']} hit(s), {cache_stats['misses']} miss(es), hit rate {cache_stats['hit_rate']:.0%}"
+        )
+    return "\n".join(lines)
+
+# Requests are handled one at a time, in order, so speech is queued in the order it was asked for;
+# every handler returns without waiting on the synthesizer
+server = MCPServer("windows-tts", "1.0.0")
+server.stats.add_provider("speech_queue", speech_queue.stats)
+server.stats.add_provider("synthesizer_host", synth_host.stats)
+server.stats.add_provider("voice_catalog", voice_catalog.stats)
+server.stats.add_provider("audio_cache", audio_cache.stats)
+
+def job_id_argument(arguments: Dict[str, Any], required: bool = False) -> Optional[int]:
+    """Get the job_id argument, raising InvalidParams if it is missing or not an integer"""
+    job_id = arguments.get("job_id")
+    if job_id is None:
+        if required:
+            raise InvalidParams("job_id parameter is required")
+        return None
+    if not isinstance(job_id, int) or isinstance(job_id, bool):
+        raise InvalidParams("job_id must be an integer")
+    return job_id
+
+@server.tool("windows_tts", "Convert text to speech using Windows built-in TTS (completely free)", {
+    "type": "object",
+    "properties": {
+        "text": {
+            "type": "string",
+            "description": "Text to convert to speech"
+        },
+        "voice": {
+            "type": "string",
+            "description": "Voice name (optional, use list_voices to see available)",
+            "default": "Default"
+        },
+        "rate": {
+            "type": "integer",
+            "description": "Speech rate (-10 to 10, 0 = normal speed)",
+            "default": 0,
+            "minimum": -10,
+            "maximum": 10
+        },
+        "cache": {
+            "type": "boolean",
+            "description": "Render to audio once and replay it next time; for phrases spoken often",
+            "default": False
+        },
+        "interrupt": {
+            "type": "boolean",
+            "description": "Stop current speech and drop queued speech before speaking this",
+            "default": False
+        }
+    },
+    "required": ["text"]
+})
+def handle_windows_tts(arguments: Dict[str, Any]) -> str:
+    text = arguments.get("text", "")
+    voice = arguments.get("voice")
+    rate = arguments.get("rate", 0)
     
-    except Exception as e:
-        log_message(f"Error handling request: {e}", "ERROR")
-        return {
-            "jsonrpc": "2.0",
-            "id": request.get("id"),
-            "error": {
-                "code": -32603,
-                "message": f"Internal error: {str(e)}"
-            }
+    if not text:
+        raise InvalidParams("Text parameter is required")
+    if not isinstance(rate, int) or isinstance(rate, bool) or not -10 <= rate <= 10:
+        raise InvalidParams("rate must be an integer from -10 to 10")
+    
+    if arguments.get("interrupt"):
+        speech_queue.flush()
+    
+    selected_voice = resolve_voice(voice)
+    if selected_voice is None:
+        return f"Error: {unknown_voice_message(voice)}"
+    
+    try:
+        job = speech_queue.submit(text, selected_voice, rate, cache=bool(arguments.get("cache")))
+    except OverflowError as e:
+        return f"Error: {e}"
+    return f"Queued speech job {job.id}: {text[:50]}{'...' if len(text) > 50 else ''}"
+
+@server.tool("get_speech_status", "Get the status of a speech job, or of the whole speech queue", {
+    "type": "object",
+    "properties": {
+        "job_id": {
+            "type": "integer",
+            "description": "Job id returned by windows_tts (optional)"
         }
+    }
+})
+def handle_get_speech_status(arguments: Dict[str, Any]) -> str:
+    return format_speech_status(job_id_argument(arguments))
+
+@server.tool("cancel_speech", "Cancel a queued speech job or stop it while it is being spoken", {
+    "type": "object",
+    "properties": {
+        "job_id": {
+            "type": "integer",
+            "description": "Job id returned by windows_tts"
+        }
+    },
+    "required": ["job_id"]
+})
+def handle_cancel_speech(arguments: Dict[str, Any]) -> str:
+    job_id = job_id_argument(arguments, required=True)
+    if speech_queue.cancel(job_id):
+        return f"Cancelled speech job {job_id}"
+    return f"Speech job {job_id} is not queued or speaking"
+
+@server.tool("flush_speech", "Stop current speech and drop every queued speech job", {
+    "type": "object",
+    "properties": {},
+    "additionalProperties": False
+})
+def handle_flush_speech(arguments: Dict[str, Any]) -> str:
+    cancelled = speech_queue.flush()
+    return f"Stopped speech and cancelled {cancelled} job(s)"
+
+@server.tool("list_voices", "List available Windows TTS voices", {
+    "type": "object",
+    "properties": {},
+    "additionalProperties": False
+})
+def handle_list_voices(arguments: Dict[str, Any]) -> str:
+    voices = get_windows_voices()
+    voice_list = "\n".join([
+        f"• {voice['name']} ({voice['culture']}, {voice['gender']})"
+        for voice in voices
+    ])
+    return f"Available Windows TTS Voices:\n{voice_list}"
+
+def handle_mcp_request(request: Dict[str, Any]) -> Dict[str, Any]:
+    """Handle MCP protocol requests"""
+    return server.handle_request(request)
 
 def main():
     """Main MCP server loop"""
-    if platform.system() != "Windows":
+    # TTS_HOST_COMMAND substitutes the synthesizer host, which also allows running off Windows
+    if platform.system() != "Windows" and not os.environ.get("TTS_HOST_COMMAND"):
         log_message("This MCP server only works on Windows", "ERROR")
         sys.exit(1)
     
     log_message("Starting Windows TTS MCP Server", "INFO")
     
-    try:
-        for line in sys.stdin:
-            line = line.strip()
-            if not line:
-                continue
-            
-            try:
-                request = json.loads(line)
-                response = handle_mcp_request(request)
-                print(json.dumps(response))
-                sys.stdout.flush()
-            except json.JSONDecodeError as e:
-                log_message(f"Invalid JSON: {e}", "ERROR")
-                error_response = {
-                    "jsonrpc": "2.0",
-                    "id": None,
-                    "error": {
-                        "code": -32700,
-                        "message": "Parse error"
-                    }
-                }
-                print(json.dumps(error_response))
-                sys.stdout.flush()
+    # Start the synthesizer host and load the voice list and audio cache in the
+    # background so neither the first utterance nor the first list_voices pays for it
+    def warm_up():
+        audio_cache.load()
+        try:
+            synth_host.start()
+            voice_catalog.load()
+        except HostError as e:
+            log_message(f"Synthesizer host failed to start: {e}", "ERROR")
     
-    except KeyboardInterrupt:
-        log_message("Server stopped by user", "INFO")
+    threading.Thread(target=warm_up, daemon=True, name="tts-host-warmup").start()
+    # atexit runs handlers last-in first-out: stop the speech worker before closing the host
+    atexit.register(synth_host.close)
+    atexit.register(speech_queue.close)
+    
+    try:
+        server.serve()
     except Exception as e:
         log_message(f"Server error: {e}", "ERROR")
         sys.exit(1)
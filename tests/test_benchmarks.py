@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Tests for the trace-replay benchmark
+Replays short synthetic and recorded traces against both servers, the TTS one through tools/fake_tts_host.py
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_SERVERS = os.path.join(REPO_ROOT, "benchmarks", "bench_servers.py")
+sys.path.insert(0, os.path.join(REPO_ROOT, "benchmarks"))
+
+from bench_servers import build_corpus
+
+
+def bench(*args: str) -> str:
+    completed = subprocess.run([sys.executable, BENCH_SERVERS, *args], capture_output=True, text=True, timeout=60)
+    assert completed.returncode == 0, completed.stderr
+    return completed.stdout
+
+
+def test_docreader_trace_is_recorded_and_replayed(tmp_path):
+    docs = tmp_path / "docs"
+    build_corpus(str(docs), 30, 500)
+    trace, results = tmp_path / "trace.jsonl", tmp_path / "results.json"
+    bench("docreader", "--root", str(docs), "--requests", "40", "--window", "4",
+          "--save-trace", str(trace), "--output", str(results))
+    run = json.loads(results.read_text())
+    assert (run["results"]["requests"], run["results"]["errors"]) == (40, 0)
+    assert set(run["results"]["by_operation"]) == {"read_document", "get_document_info", "list_documents"}
+    assert len(trace.read_text().splitlines()) == 40
+
+    output = bench("docreader", "--root", str(docs), "--trace", str(trace), "--compare", str(results))
+    assert "40 requests" in output and "0 errors" in output
+    assert "%)" in output
+
+
+def test_tts_trace_runs_against_the_fake_host(tmp_path):
+    results = tmp_path / "results.json"
+    bench("tts", "--requests", "30", "--output", str(results))
+    run = json.loads(results.read_text())
+    assert (run["results"]["requests"], run["results"]["errors"]) == (30, 0)
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Tests for the document version store
+Checks the per-path cap and the character budget evict in least recently used order
+"""
+
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from docreader_versions import VersionStore
+
+
+def test_per_path_cap_evicts_least_recently_used():
+    store = VersionStore(max_chars=1000, per_path=2)
+    store.put("a1", "a.md", "one")
+    store.put("b1", "b.md", "other file")
+    store.put("a2", "a.md", "two")
+    assert store.get("a1", "a.md") == "one"
+    store.put("a3", "a.md", "three")
+
+    assert store.get("a2", "a.md") is None
+    assert store.get("a1", "a.md") == "one"
+    assert store.get("a3", "a.md") == "three"
+    # Other paths do not count against a.md's cap
+    assert store.get("b1", "b.md") == "other file"
+    assert store.stats()["versions"] == 3
+
+
+def test_budget_evicts_across_paths():
+    store = VersionStore(max_chars=10, per_path=8)
+    store.put("a1", "a.md", "aaaa")
+    store.put("b1", "b.md", "bbbb")
+    store.put("c1", "c.md", "cccc")
+    assert store.get("a1", "a.md") is None
+    assert store.stats()["chars"] == 8
+
+    # An evicted path's slots are released, so it can fill its cap again
+    for i in range(8):
+        store.put(f"a{i + 2}", "a.md", "a")
+    assert store.get("a9", "a.md") == "a"
+    assert store.get("b1", "b.md") is None
+
+
+def test_token_is_bound_to_its_path():
+    store = VersionStore(max_chars=100)
+    store.put("t", "a.md", "content")
+    store.put("t", "a.md", "content")
+    assert store.get("t", "b.md") is None
+    assert store.get("t", "a.md") == "content"
+    assert store.stats()["chars"] == len("content")
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Tests for the document index watchers
+Feeds real filesystem changes through sync()/poll() without the background threads, so every delta is applied deterministically
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import docreader_watcher
+from docreader_index import DocumentIndex
+from docreader_watcher import IN_Q_OVERFLOW, InotifyWatcher, PollingWatcher, get_watcher, inotify_available
+
+needs_inotify = pytest.mark.skipif(not inotify_available(), reason="inotify is Linux only")
+
+
+def indexed(index: DocumentIndex) -> dict:
+    return {os.path.join(rel_dir, name): size for rel_dir, name, size, _mtime in index.iter_entries()}
+
+
+@pytest.fixture
+def docs(tmp_path):
+    root = tmp_path / "docs"
+    (root / "sub").mkdir(parents=True)
+    (root / "a.md").write_text("one\n")
+    (root / "sub" / "b.md").write_text("two\n")
+    return root
+
+
+@pytest.fixture
+def index(docs, tmp_path):
+    return DocumentIndex(str(docs), [".md"], cache_dir=str(tmp_path / "cache"), refresh_interval=0)
+
+
+def start(watcher, changed: list):
+    # Changes are applied by calling sync()/poll() directly instead of from the thread
+    watcher._start_thread = lambda target: None
+    watcher._on_file_change = changed.append
+    watcher.start()
+    return watcher
+
+
+@needs_inotify
+def test_inotify_applies_deltas(docs, index):
+    changed = []
+    watcher = start(InotifyWatcher(index), changed)
+    try:
+        assert indexed(index) == {"a.md": 4, os.path.join("sub", "b.md"): 4}
+        assert watcher.stats()["watches"] == 2
+        # The watcher reports in-place edits, so listings do not start a restat
+        assert index._restat_thread is None
+
+        (docs / "c.md").write_text("created\n")
+        (docs / "a.md").write_text("modified in place\n")
+        watcher.sync()
+        assert indexed(index) == {"a.md": 18, "c.md": 8, os.path.join("sub", "b.md"): 4}
+        assert str(docs / "a.md") in changed
+
+        (docs / "c.md").unlink()
+        os.rename(docs / "sub" / "b.md", docs / "sub" / "renamed.md")
+        watcher.sync()
+        assert indexed(index) == {"a.md": 18, os.path.join("sub", "renamed.md"): 4}
+
+        # A renamed directory is rescanned and watched under its new name
+        os.rename(docs / "sub", docs / "moved")
+        watcher.sync()
+        assert indexed(index) == {"a.md": 18, os.path.join("moved", "renamed.md"): 4}
+        (docs / "moved" / "new.md").write_text("x\n")
+        watcher.sync()
+        assert os.path.join("moved", "new.md") in indexed(index)
+        assert watcher.stats()["watches"] == 2
+    finally:
+        watcher.close()
+    assert not index.watched
+
+
+@needs_inotify
+def test_inotify_overflow_rescans_everything(docs, index):
+    watcher = start(InotifyWatcher(index), [])
+    try:
+        (docs / "sub" / "lost.md").write_text("missed event\n")
+        (docs / "a.md").unlink()
+        # The kernel dropped these events and queued an overflow instead
+        watcher._read_events()
+        watcher._read_events = lambda: [(-1, IN_Q_OVERFLOW, "")]
+        watcher.sync()
+        assert indexed(index) == {os.path.join("sub", "b.md"): 4, os.path.join("sub", "lost.md"): 13}
+        assert watcher.stats()["overflows"] == 1
+        assert watcher.stats()["full_rescans"] == 1
+    finally:
+        watcher.close()
+
+
+def test_polling_applies_deltas(docs, index):
+    changed = []
+    watcher = start(PollingWatcher(index, interval=3600), changed)
+    try:
+        (docs / "sub" / "c.md").write_text("created\n")
+        (docs / "a.md").unlink()
+        # Old enough that its mtime is trusted and the directory is reused from now on
+        os.utime(docs / "sub", (1e9, 1e9))
+        watcher.sync()
+        assert indexed(index) == {os.path.join("sub", "b.md"): 4, os.path.join("sub", "c.md"): 8}
+
+        # Rewriting a file in place is only seen by the polling pass
+        (docs / "sub" / "b.md").write_text("longer now\n")
+        watcher.sync()
+        assert indexed(index)[os.path.join("sub", "b.md")] == 4
+        assert index._restat_thread is None
+        watcher.poll()
+        assert indexed(index)[os.path.join("sub", "b.md")] == 11
+        assert changed == [str(docs / "sub" / "b.md")]
+        assert watcher.stats()["files_updated"] == 1
+    finally:
+        watcher.close()
+
+
+def test_starting_one_root_does_not_block_others(monkeypatch, tmp_path):
+    monkeypatch.setenv("DOCREADER_WATCH", "poll")
+    release = threading.Event()
+    started = []
+
+    def start_watcher(index, mode, on_file_change, parallelism):
+        started.append(index.root)
+        if index.root.endswith("slow"):
+            release.wait(5)
+        return PollingWatcher(index, on_file_change, interval=3600)
+
+    monkeypatch.setattr(docreader_watcher, "_start_watcher", start_watcher)
+    slow = DocumentIndex(str(tmp_path / "slow"), [".md"], cache_dir=str(tmp_path / "cache"))
+    fast = DocumentIndex(str(tmp_path / "fast"), [".md"], cache_dir=str(tmp_path / "cache"))
+    results = {}
+    threads = [threading.Thread(target=lambda i=i: results.setdefault(i, get_watcher(slow))) for i in range(2)]
+    try:
+        for thread in threads:
+            thread.start()
+        while not started:
+            time.sleep(0.01)
+        # The slow root is still starting, yet another root's lookup goes through
+        assert get_watcher(fast).index is fast
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        # Callers for the same root waited for the one start instead of starting their own
+        assert results[0] is results[1]
+        assert started.count(slow.root) == 1
+    finally:
+        release.set()
+        docreader_watcher.close_watchers()
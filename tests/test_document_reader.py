@@ -0,0 +1,788 @@
+#!/usr/bin/env python3
+"""
+Tests for the Document Reader MCP server
+Drives the tools through the same JSON-RPC entry points a client uses
+"""
+
+import codecs
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import mcp_document_reader
+from mcp_server_core import dumps, loads
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(monkeypatch, tmp_path):
+    monkeypatch.setenv("DOCREADER_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("DOCREADER_WATCH", "0")
+    # Every listing refreshes, so tests see their own changes
+    monkeypatch.setenv("DOCREADER_REFRESH_INTERVAL", "0")
+
+
+def call_tool(name: str, arguments: dict) -> dict:
+    return mcp_document_reader.handle_mcp_request(
+        {"jsonrpc": "2.0", "id": 1, "method": "tools/call", "params": {"name": name, "arguments": arguments}}
+    )
+
+
+@pytest.fixture
+def undecodable_tree(tmp_path):
+    """A directory holding a document whose name is not valid UTF-8 (Latin-1 "café.md")"""
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    with open(os.path.join(os.fsencode(docs), b"caf\xe9.md"), "wb") as f:
+        f.write(b"# Menu\n")
+    (docs / "plain.md").write_text("plain\n")
+    return str(docs)
+
+
+def test_surrogate_strings_round_trip():
+    value = {"name": "caf\udce9.md", "text": "naïve"}
+    encoded = dumps(value)
+    encoded.decode("utf-8")
+    assert loads(encoded) == value
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Windows filenames are always valid Unicode")
+@pytest.mark.parametrize("index", ["1", "0"])
+def test_list_documents_with_undecodable_filename(monkeypatch, undecodable_tree, index):
+    monkeypatch.setenv("DOCREADER_INDEX", index)
+    response = call_tool("list_documents", {"directory": undecodable_tree})
+    assert "error" not in response
+    text = response["result"]["content"][0]["text"]
+    assert "Found 2 documents" in text
+    assert "caf\udce9.md" in text
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Windows filenames are always valid Unicode")
+def test_undecodable_path_echoed_back_over_stdio(undecodable_tree):
+    # A client sends the name back as it was listed, with the surrogate escaped
+    request = {"jsonrpc": "2.0", "id": 7, "method": "tools/call",
+               "params": {"name": "read_document",
+                          "arguments": {"file_path": os.path.join(undecodable_tree, "caf\udce9.md")}}}
+    stdin = io.BytesIO(json.dumps(request).encode("ascii") + b"\n")
+    stdout = io.BytesIO()
+    mcp_document_reader.server.serve(stdin, stdout)
+    response = json.loads(stdout.getvalue())
+    assert response["id"] == 7
+    assert "# Menu" in response["result"]["content"][0]["text"]
+
+
+def test_document_info_does_not_read_content_by_default(tmp_path, monkeypatch):
+    path = tmp_path / "notes.md"
+    path.write_text("hello\n")
+    text = call_tool("get_document_info", {"file_path": str(path)})["result"]["content"][0]["text"]
+    assert "SHA256" not in text
+
+    text = call_tool("get_document_info", {"file_path": str(path), "include_hash": True})["result"]["content"][0]["text"]
+    assert "SHA256: 5891b5b522d5df086d0ff0b110fbd9d21bb4fc7163af34d08286a2e846f6be03" in text
+
+    monkeypatch.setattr(mcp_document_reader, "MAX_HASH_BYTES", 3)
+    text = call_tool("get_document_info", {"file_path": str(path), "include_hash": True})["result"]["content"][0]["text"]
+    assert "SHA256: not computed" in text
+
+
+def test_duplicates_use_current_sizes(tmp_path, monkeypatch):
+    (tmp_path / "a.md").write_text("same\n")
+    (tmp_path / "b.md").write_text("different\n")
+    listed = list(mcp_document_reader.iter_documents(str(tmp_path)))
+
+    # b.md is edited in place while the index (e.g. a snapshot still being revalidated) has its old size
+    (tmp_path / "b.md").write_text("same\n")
+    monkeypatch.setattr(mcp_document_reader, "iter_documents", lambda directory, recursive=True: iter(listed))
+    groups = mcp_document_reader.find_duplicate_documents(str(tmp_path))["groups"]
+    assert [group["paths"] for group in groups] == [["a.md", "b.md"]]
+
+
+def test_in_place_edit_is_picked_up_by_background_restat(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "notes.md").write_text("one\n")
+    # Old enough that its mtime is trusted and the directory is reused rather than rescanned
+    os.utime(docs, (1e9, 1e9))
+    assert "Size: 4 bytes" in call_tool("list_documents", {"directory": str(docs)})["result"]["content"][0]["text"]
+
+    # Rewriting a file keeps its directory's mtime, so only the restat notices
+    (docs / "notes.md").write_text("a longer line\n")
+    call_tool("list_documents", {"directory": str(docs)})
+    index = mcp_document_reader.get_document_index(str(docs), mcp_document_reader.get_supported_extensions())
+    index._restat_thread.join(5)
+    text = call_tool("list_documents", {"directory": str(docs)})["result"]["content"][0]["text"]
+    assert "Size: 14 bytes" in text
+
+
+def test_search_syncs_in_the_background(tmp_path):
+    docs = tmp_path / "docs"
+    (docs / "sub").mkdir(parents=True)
+    (docs / "sub" / "alpha.md").write_text("The alpha release notes\n")
+    (docs / "beta.md").write_text("Nothing to see here\n")
+
+    result = mcp_document_reader.search_documents("alpha", str(docs))
+    assert result["complete"]
+    assert [match["relative_path"] for match in result["results"]] == [os.path.join("sub", "alpha.md")]
+    assert "alpha release" in result["results"][0]["snippet"]
+
+    (docs / "gamma.md").write_text("alpha again\n")
+    index = mcp_document_reader.get_search_index(str(docs))
+    index.refresh_interval = 0
+    mcp_document_reader.search_documents("alpha", str(docs))
+    index._sync_thread.join(5)
+    result = mcp_document_reader.search_documents("alpha", str(docs))
+    assert sorted(match["name"] for match in result["results"]) == ["alpha.md", "gamma.md"]
+
+
+def listed_paths(response: dict) -> list:
+    text = response["result"]["content"][0]["text"]
+    return [line.split("Path: ", 1)[1] for line in text.splitlines() if line.startswith("  Path: ")]
+
+
+@pytest.fixture
+def ignore_tree(tmp_path):
+    docs = tmp_path / "docs"
+    for rel_path in ["a.md", "notes.txt", "skip.log", "node_modules/pkg/readme.md", ".hidden/h.md",
+                     "build/out.md", "sub/x.draft.md", "sub/keep.draft.md", "sub/local.md", "local.md"]:
+        path = docs / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("text\n")
+    (docs / ".gitignore").write_text("# generated\nbuild/\n*.draft.md\n!keep.draft.md\n")
+    # Nested rules only apply below their own directory
+    (docs / "sub" / ".gitignore").write_text("local.md\n")
+    return docs
+
+
+@pytest.mark.parametrize("index", ["1", "0"])
+def test_walker_applies_ignore_rules(monkeypatch, ignore_tree, index):
+    monkeypatch.setenv("DOCREADER_INDEX", index)
+    paths = listed_paths(call_tool("list_documents", {"directory": str(ignore_tree)}))
+    assert sorted(paths) == sorted(["a.md", "local.md", "notes.txt", os.path.join("sub", "keep.draft.md")])
+
+
+def test_walker_ignore_settings(monkeypatch, ignore_tree):
+    monkeypatch.setenv("DOCREADER_IGNORE", "build")
+    monkeypatch.setenv("DOCREADER_USE_GITIGNORE", "0")
+    monkeypatch.setenv("DOCREADER_INCLUDE_HIDDEN", "1")
+    paths = listed_paths(call_tool("list_documents", {"directory": str(ignore_tree)}))
+    assert os.path.join("node_modules", "pkg", "readme.md") in paths
+    assert os.path.join(".hidden", "h.md") in paths
+    assert os.path.join("sub", "x.draft.md") in paths
+    assert os.path.join("build", "out.md") not in paths
+    assert "skip.log" not in paths
+
+
+def test_walker_lists_top_level_only_when_not_recursive(ignore_tree):
+    paths = listed_paths(call_tool("list_documents", {"directory": str(ignore_tree), "recursive": False}))
+    assert sorted(paths) == ["a.md", "local.md", "notes.txt"]
+
+
+@pytest.fixture
+def deep_tree(tmp_path):
+    docs = tmp_path / "deep"
+    for i in range(6):
+        for j in range(5):
+            branch = docs / f"d{i}" / f"e{j}"
+            branch.mkdir(parents=True)
+            for k in range(3):
+                (branch / f"f{k}.md").write_text("x" * (i + j + k) + "\n")
+        # Rules from a .gitignore apply on whichever worker scans below it
+        (docs / f"d{i}" / ".gitignore").write_text("f0.md\n")
+    return docs
+
+
+@pytest.mark.parametrize("index", ["1", "0"])
+def test_parallel_listing_matches_serial(monkeypatch, tmp_path, deep_tree, index):
+    monkeypatch.setenv("DOCREADER_INDEX", index)
+    # A copy, so the parallel listing is not served from the index the serial one built
+    copy = shutil.copytree(deep_tree, tmp_path / "copy")
+    serial = call_tool("list_documents", {"directory": str(deep_tree), "parallelism": 1})
+    parallel = call_tool("list_documents", {"directory": str(copy), "parallelism": 8})
+    assert len(listed_paths(serial)) == 6 * 5 * 2
+    assert parallel == serial
+
+
+def test_parallel_traverse_visits_every_node_once():
+    from docreader_walker import traverse
+
+    def visit(node):
+        return node, [node * 2 + 1, node * 2 + 2] if node < 500 else []
+
+    serial = list(traverse([0], visit, 1))
+    parallel = list(traverse([0], visit, 16))
+    assert sorted(parallel) == sorted(serial) == list(range(1001))
+
+
+def next_cursor(response: dict) -> str:
+    text = response["result"]["content"][0]["text"]
+    for line in text.splitlines():
+        if line.startswith("Next cursor: "):
+            return line[len("Next cursor: "):]
+    return None
+
+
+@pytest.mark.parametrize("index", ["1", "0"])
+def test_cursor_pages_cover_the_listing_in_order(monkeypatch, deep_tree, index):
+    monkeypatch.setenv("DOCREADER_INDEX", index)
+    full = listed_paths(call_tool("list_documents", {"directory": str(deep_tree)}))
+    pages = []
+    cursor = None
+    while True:
+        arguments = {"directory": str(deep_tree), "limit": 7}
+        if cursor:
+            arguments["cursor"] = cursor
+        response = call_tool("list_documents", arguments)
+        pages.append(listed_paths(response))
+        cursor = next_cursor(response)
+        if cursor is None:
+            break
+    assert [len(page) for page in pages] == [7] * 8 + [4]
+    assert [path for page in pages for path in page] == full
+
+
+@pytest.mark.parametrize("index", ["1", "0"])
+def test_cursor_survives_deleted_anchor(monkeypatch, deep_tree, index):
+    monkeypatch.setenv("DOCREADER_INDEX", index)
+    first = call_tool("list_documents", {"directory": str(deep_tree), "limit": 5})
+    anchor = listed_paths(first)[-1]
+    os.remove(deep_tree / anchor)
+    second = call_tool("list_documents", {"directory": str(deep_tree), "limit": 5, "cursor": next_cursor(first)})
+    # The page resumes right after where the vanished document sorted
+    full = listed_paths(call_tool("list_documents", {"directory": str(deep_tree)}))
+    assert listed_paths(second) == full[4:9]
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor!", "W10", "WzEsMl0", "eyJhIjoxfQ"])
+def test_tampered_cursor_is_rejected(deep_tree, cursor):
+    response = call_tool("list_documents", {"directory": str(deep_tree), "limit": 5, "cursor": cursor})
+    assert response["error"]["code"] == -32602
+    assert "Invalid cursor" in response["error"]["message"]
+
+
+def content_of(response: dict) -> str:
+    return response["result"]["content"][0]["text"].split("\n--- Content ---\n", 1)[1]
+
+
+def test_line_range_read(tmp_path):
+    path = tmp_path / "long.txt"
+    path.write_text("".join(f"line {i}\n" for i in range(1, 1001)))
+    response = call_tool("read_document", {"file_path": str(path), "start_line": 500, "line_count": 3})
+    assert "Range: lines 500-502 of 1000" in response["result"]["content"][0]["text"]
+    assert content_of(response) == "line 500\nline 501\nline 502\n"
+
+    # A range cut short by max_size still ends on a line boundary
+    response = call_tool("read_document", {"file_path": str(path), "start_line": 10, "max_size": 25})
+    assert "(truncated to max_size)" in response["result"]["content"][0]["text"]
+    assert content_of(response) == "line 10\nline 11\nline 12\n"
+
+
+def test_byte_range_read_tolerates_split_characters(tmp_path):
+    path = tmp_path / "accents.md"
+    path.write_bytes("héllo wörld".encode("utf-8"))
+    response = call_tool("read_document", {"file_path": str(path), "offset": 2, "length": 7})
+    assert "Range: bytes 2-9 of 13" in response["result"]["content"][0]["text"]
+    # The range starts inside "é" and ends inside "ö"
+    assert content_of(response) == "�llo w�"
+
+    response = call_tool("read_document", {"file_path": str(path), "offset": 1, "start_line": 1})
+    assert response["error"]["code"] == -32602
+
+
+def test_line_index_offsets_match_a_linear_scan():
+    from docreader_ranged import LineIndex
+
+    data = b"".join(b"x" * (i % 7) + b"\n" for i in range(200)) + b"tail"
+    index = LineIndex.build(data, len(data), block_size=16)
+    expected = [0] + [i + 1 for i, byte in enumerate(data) if byte == ord("\n")]
+    assert [index.line_offset(data, line) for line in range(len(expected))] == expected
+    assert index.line_offset(data, len(expected) + 5) == len(data)
+    assert index.total_lines == 201
+
+
+def test_content_cache_hits_and_mtime_invalidation(tmp_path):
+    cache = mcp_document_reader.content_cache
+    path = tmp_path / "cached.md"
+    path.write_text("first\n")
+    os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+    before = cache.stats()
+    assert content_of(call_tool("read_document", {"file_path": str(path)})) == "first\n"
+    assert content_of(call_tool("read_document", {"file_path": str(path)})) == "first\n"
+    assert cache.stats()["hits"] == before["hits"] + 1
+
+    # Same size, new mtime: the cached text must not be served
+    path.write_text("again\n")
+    os.utime(path, ns=(2_000_000_000, 2_000_000_000))
+    assert content_of(call_tool("read_document", {"file_path": str(path)})) == "again\n"
+    assert cache.stats()["invalidations"] == before["invalidations"] + 1
+
+
+def test_content_cache_evicts_least_recently_used(tmp_path):
+    from docreader_cache import ContentCache
+
+    cache = ContentCache(max_bytes=10)
+    stats = {}
+    for name in "abc":
+        (tmp_path / name).write_text(name)
+        stats[name] = os.stat(tmp_path / name)
+    cache.put("a", stats["a"], "A", 4)
+    cache.put("b", stats["b"], "B", 4)
+    assert cache.get("a", stats["a"]) == "A"
+    cache.put("c", stats["c"], "C", 4)
+    assert cache.get("b", stats["b"]) is None
+    assert cache.get("a", stats["a"]) == "A"
+    # An entry larger than the whole cache is never stored
+    cache.put("c", stats["c"], "C" * 11, 11)
+    assert cache.get("c", stats["c"]) == "C"
+    assert cache.stats()["bytes"] == 8
+
+
+@pytest.mark.parametrize("text, data, encoding", [
+    ("Grüße\n", "Grüße\n".encode("utf-8"), "utf-8"),
+    ("Grüße\n", codecs.BOM_UTF8 + "Grüße\n".encode("utf-8"), "utf-8-sig"),
+    ("Grüße\n", "Grüße\n".encode("utf-16"), "utf-16"),
+    ("Grüße\n", codecs.BOM_UTF16_BE + "Grüße\n".encode("utf-16-be"), "utf-16"),
+    ("Grüße\n", "Grüße\n".encode("utf-32"), "utf-32"),
+    ("Grüße\n", "Grüße\n".encode("latin-1"), "latin-1"),
+    ("“Grüße”\n", "“Grüße”\n".encode("cp1252"), "cp1252"),
+])
+def test_encoding_detection(tmp_path, text, data, encoding):
+    path = tmp_path / "encoded.txt"
+    path.write_bytes(data)
+    response = call_tool("read_document", {"file_path": str(path)})
+    assert f"Encoding: {encoding}\n" in response["result"]["content"][0]["text"]
+    assert content_of(response) == text
+
+
+def test_encoding_probe_tolerates_a_character_split_at_its_edge():
+    from docreader_encoding import decode_bytes, detect_encoding
+
+    data = "aé".encode("utf-8") + b"b"
+    # The probe ends inside "é", which is only a problem if nothing follows
+    assert detect_encoding(data, probe_bytes=2) == "utf-8"
+    assert detect_encoding(data[:2], probe_bytes=2) == "latin-1"
+    # Invalid UTF-8 past the probe is still caught when decoding
+    text, encoding = decode_bytes(b"a" * 70000 + "é".encode("latin-1"))
+    assert (text[-1], encoding) == ("é", "latin-1")
+
+
+def serve(server, requests: list) -> list:
+    """Run requests (decoded objects, or raw lines as bytes) through a server's stdio loop"""
+    lines = [request if isinstance(request, bytes) else json.dumps(request).encode("utf-8") for request in requests]
+    stdout = io.BytesIO()
+    server.serve(io.BytesIO(b"\n".join(lines) + b"\n"), stdout)
+    return [json.loads(line) for line in stdout.getvalue().splitlines()]
+
+
+def test_concurrent_requests_answer_out_of_order():
+    from mcp_server_core import MCPServer
+
+    server = MCPServer("test", max_concurrency=4)
+    released = threading.Event()
+
+    @server.tool("wait", "Block until released", {"type": "object"})
+    def wait(arguments):
+        return "released" if released.wait(5) else "timed out"
+
+    @server.tool("release", "Release the waiting call", {"type": "object"})
+    def release(arguments):
+        released.set()
+        return "released"
+
+    responses = serve(server, [
+        {"jsonrpc": "2.0", "id": 1, "method": "tools/call", "params": {"name": "wait"}},
+        {"jsonrpc": "2.0", "id": 2, "method": "tools/call", "params": {"name": "release"}},
+    ])
+    # The slow call does not hold up the one read after it
+    assert [response["id"] for response in responses] == [2, 1]
+    assert responses[1]["result"]["content"][0]["text"] == "released"
+
+
+def test_document_reader_handles_requests_concurrently():
+    assert mcp_document_reader.server.max_concurrency > 1
+
+
+def test_json_rpc_batches_and_notifications():
+    server = mcp_document_reader.server
+    ping = lambda request_id: {"jsonrpc": "2.0", "id": request_id, "method": "ping"}
+    notification = {"jsonrpc": "2.0", "method": "notifications/initialized"}
+    responses = serve(server, [
+        [ping(1), notification, {"jsonrpc": "2.0", "id": 2, "method": "no/such/method"}, ping(3)],
+        notification,
+        [notification],
+        [],
+        b"{not json",
+        ping(4),
+    ])
+    # Lines are handled concurrently, so only the order inside the batch is fixed
+    [batch] = [response for response in responses if isinstance(response, list)]
+    singles = [response for response in responses if isinstance(response, dict)]
+    # Notifications get no response, in a batch or on their own
+    assert [response["id"] for response in batch] == [1, 2, 3]
+    assert batch[1]["error"]["code"] == -32601
+    assert sorted(response.get("error", {}).get("code", 0) for response in singles) == [-32700, -32600, 0]
+    assert {"jsonrpc": "2.0", "id": 4, "result": {}} in singles
+
+
+def test_batch_tools_read_within_budget(tmp_path):
+    for name, size in [("a.md", 40), ("b.md", 30), ("c.md", 20)]:
+        (tmp_path / name).write_text("x" * (size - 1) + "\n")
+    paths = [str(tmp_path / name) for name in ["a.md", "b.md", "missing.md", "c.md"]]
+
+    text = call_tool("read_documents", {"file_paths": paths, "max_total_size": 65})["result"]["content"][0]["text"]
+    assert text.startswith("Read 2 of 4 documents (60 of 65 byte budget)")
+    sections = text.split("\n=== ")[1:]
+    assert "Size: 40 bytes" in sections[0]
+    assert "Skipped b.md (30 bytes): only 25 bytes" in sections[1]
+    assert "File does not exist" in sections[2]
+    assert "Size: 20 bytes" in sections[3]
+
+    text = call_tool("get_documents_info", {"pattern": "*.md", "directory": str(tmp_path)})["result"]["content"][0]["text"]
+    assert text.startswith("Information for 3 documents")
+    assert call_tool("read_documents", {"file_paths": "a.md"})["error"]["code"] == -32602
+
+
+def server_stats() -> dict:
+    return mcp_document_reader.handle_mcp_request({"jsonrpc": "2.0", "id": 1, "method": "server/stats"})["result"]
+
+
+def test_server_stats_count_methods_tools_and_bytes(tmp_path):
+    path = tmp_path / "stats.md"
+    path.write_text("x" * 99 + "\n")
+    before = server_stats()
+    call_tool("read_document", {"file_path": str(path), "offset": 0, "length": 50})
+    call_tool("read_document", {"file_path": str(path), "offset": -1})
+    stats = server_stats()
+
+    read = stats["tools"]["read_document"]
+    old_read = before["tools"].get("read_document", {"calls": 0, "errors": 0})
+    assert (read["calls"] - old_read["calls"], read["errors"] - old_read["errors"]) == (2, 1)
+    assert stats["bytes_read"] - before["bytes_read"] == 50
+    assert stats["methods"]["tools/call"]["calls"] >= 2
+    assert set(read) == {"calls", "errors", "bytes_returned", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "histogram"}
+    assert sum(read["histogram"].values()) == read["calls"]
+    for provider in ["content_cache", "document_indexes", "search_indexes", "watchers", "outlines",
+                     "chunk_cache", "content_hashes", "versions"]:
+        assert provider in stats
+    assert stats["uptime_seconds"] >= 0
+
+
+def test_latency_histogram_quantiles():
+    from mcp_server_core import LatencyHistogram
+
+    histogram = LatencyHistogram()
+    for seconds in [0.0002] * 90 + [0.003] * 9 + [60.0]:
+        histogram.record(seconds, False, 10)
+    summary = histogram.to_dict()
+    assert (summary["p50_ms"], summary["p95_ms"], summary["p99_ms"]) == (0.25, 5, 5)
+    # The slowest call is past the last bucket, so it has no upper bound
+    assert histogram.quantile_ms(1.0) is None
+    assert summary["histogram"] == {"<=0.25ms": 90, "<=5ms": 9, ">10000ms": 1}
+    assert summary["bytes_returned"] == 1000
+
+
+OUTLINE_DOCUMENT = """---
+title: Front
+---
+# Guide
+
+Intro text.
+
+## Install
+
+```sh
+# not a heading
+```
+
+### Linux
+
+apt install
+
+Windows
+-------
+
+choco install
+
+## Usage ##
+
+Run it.
+
+## Usage
+
+Again.
+"""
+
+
+def tool_text(name: str, arguments: dict) -> str:
+    return call_tool(name, arguments)["result"]["content"][0]["text"]
+
+
+def test_markdown_outline(tmp_path):
+    path = tmp_path / "guide.md"
+    path.write_text(OUTLINE_DOCUMENT)
+    text = tool_text("get_document_outline", {"file_path": str(path)})
+    # Front matter and fenced code are not headings; setext and closed ATX headings are
+    assert text.endswith(
+        "Sections: 6\n\n"
+        "# Guide (#guide, line 4, bytes 21-177)\n"
+        "  ## Install (#install, line 8, bytes 43-106)\n"
+        "    ### Linux (#linux, line 14, bytes 82-106)\n"
+        "  ## Windows (#windows, line 18, bytes 106-138)\n"
+        "  ## Usage (#usage, line 23, bytes 138-160)\n"
+        "  ## Usage (#usage-1, line 27, bytes 160-177)\n"
+    )
+    assert tool_text("get_document_outline", {"file_path": str(path), "max_level": 1}).endswith(
+        "Sections: 1\n\n# Guide (#guide, line 4, bytes 21-177)\n")
+
+    # The cached outline is dropped once the file changes
+    path.write_text("# Renamed\n")
+    assert "# Renamed (#renamed, line 1, bytes 0-10)" in tool_text("get_document_outline", {"file_path": str(path)})
+
+
+def test_read_document_section(tmp_path):
+    path = tmp_path / "guide.md"
+    path.write_text(OUTLINE_DOCUMENT)
+    read = lambda **arguments: tool_text("read_document_section", dict(file_path=str(path), **arguments))
+
+    text = read(heading="Guide > Linux")
+    assert "Section: Guide > Install > Linux (#linux, line 14)\nRange: bytes 82-106 of 177\n" in text
+    assert text.endswith("--- Content ---\n### Linux\n\napt install\n\n")
+    assert read(heading="install", include_subsections=False).endswith(
+        "--- Content ---\n## Install\n\n```sh\n# not a heading\n```\n\n")
+    assert read(anchor="#usage-1").endswith("--- Content ---\n## Usage\n\nAgain.\n")
+    assert read(heading="Usage") == ("Error: 2 sections match 'Usage'; pass a longer heading path "
+                                     "or one of the anchors: #usage, #usage-1")
+    assert read(heading="Nope").startswith("Error: No section 'Nope'")
+    response = call_tool("read_document_section", {"file_path": str(path), "heading": "Usage", "anchor": "usage"})
+    assert response["error"]["code"] == -32602
+
+
+CHUNK_HEADER = re.compile(r"^--- Chunk (\d+)/(\d+) id=(\S+) bytes (\d+)-(\d+)(?:, section: (.*))? ---$", re.M)
+
+
+def chunk_headers(text: str) -> list:
+    return [(chunk_id, int(start), int(end), section)
+            for _, _, chunk_id, start, end, section in CHUNK_HEADER.findall(text)]
+
+
+def write_sectioned(path, sections: int, paragraphs: int = 4, tag: str = ""):
+    parts = []
+    for s in range(sections):
+        parts.append(f"## Section {s}\n\n")
+        for p in range(paragraphs):
+            parts.append(f"Paragraph {p} of section {s}{tag} has a few words to fill the chunk. " * 2 + "\n\n")
+    path.write_text("".join(parts))
+
+
+def test_chunk_ids_and_offsets(tmp_path):
+    path = tmp_path / "chunked.md"
+    write_sectioned(path, 5)
+    headers = chunk_headers(tool_text("chunk_document", {"file_path": str(path), "max_tokens": 64, "overlap_tokens": 8}))
+    data = path.read_bytes()
+    assert len(headers) > 5
+    assert headers[0][1] == 0 and headers[-1][2] == len(data)
+    next_starts = [start for _, start, _, _ in headers[1:]] + [len(data)]
+    for (chunk_id, start, end, _), next_start in zip(headers, next_starts):
+        assert end - start <= 64 * 4
+        assert chunk_id == hashlib.sha1(data[start:end]).hexdigest()[:16]
+        # Chunks overlap, except where the next one starts a new section
+        assert next_start <= end
+    section_starts = [start for _, start, _, _ in headers if data[start:start + 3] == b"## "]
+    assert len(section_starts) == 5
+
+    # An edit only changes the ids of the chunks that contain it
+    text = path.read_text()
+    changed = text.index("Paragraph 1 of section 2")
+    path.write_text(text.replace("Paragraph 1 of section 2", "Paragraph X of section 2", 1))
+    edited = chunk_headers(tool_text("chunk_document", {"file_path": str(path), "max_tokens": 64, "overlap_tokens": 8}))
+    untouched = [header for header in headers if not header[1] <= changed + 10 < header[2]]
+    assert len(untouched) < len(headers)
+    assert [header for header in edited if header in untouched] == untouched
+
+
+def test_chunk_cursor_pages_across_files(tmp_path):
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"doc{i}.md"
+        write_sectioned(path, 2, tag=f" in doc {i}")
+        paths.append(str(path))
+    arguments = {"file_paths": paths, "max_tokens": 64, "overlap_tokens": 8}
+    everything = chunk_headers(tool_text("chunk_documents", dict(arguments, limit=1000)))
+
+    paged = []
+    cursor = None
+    while True:
+        response = call_tool("chunk_documents", dict(arguments, limit=4, **({"cursor": cursor} if cursor else {})))
+        page = chunk_headers(response["result"]["content"][0]["text"])
+        assert 0 < len(page) <= 4
+        paged.extend(page)
+        cursor = next_cursor(response)
+        if cursor is None:
+            break
+    assert paged == everything
+
+    # A cursor for a file that is not in this request is stale
+    first = call_tool("chunk_documents", dict(arguments, limit=4))
+    response = call_tool("chunk_documents", dict(arguments, file_paths=paths[1:], cursor=next_cursor(first)))
+    assert response["error"]["code"] == -32602
+
+
+def test_packed_names_round_trip(monkeypatch):
+    import docreader_listing
+    from docreader_listing import PackedNames
+
+    names = ["a.md", "", "naïve.txt", "caf\udce9.md", "日本語.md"] * 5
+    # Small blocks, so iteration crosses block boundaries
+    monkeypatch.setattr(docreader_listing, "PACKED_NAMES_BLOCK", 3)
+    packed = PackedNames(*PackedNames.pack(names))
+    assert len(packed) == len(names)
+    assert list(packed) == names
+    assert [packed[i] for i in range(len(names))] == names
+    assert packed[-2] == "caf\udce9.md"
+    assert list(PackedNames(*PackedNames.pack([]))) == []
+
+
+def test_document_listing_columns_round_trip(tmp_path):
+    from docreader_listing import DocumentListing, PackedNames
+    from docreader_walker import entry_sort_key, make_document_record
+
+    entries = [("b/c", "Zeta.md", 3, 1.5), ("", "alpha.txt", 10, 2.0), ("b", "alpha.txt", 7, 3.25),
+               ("b/c", "beta.md", 0, 4.0), ("", "caf\udce9.md", 1, 5.0)]
+    listing = DocumentListing(str(tmp_path), entries)
+    assert list(listing) == entries
+    assert listing.dirs == ["b/c", "", "b"]
+    assert listing.to_dicts() == [make_document_record(str(tmp_path), *entry) for entry in entries]
+
+    listing.sort()
+    expected = sorted(entries, key=entry_sort_key)
+    assert list(listing) == expected
+    for i, entry in enumerate(expected):
+        assert listing.position_after(entry_sort_key(entry)) == i + 1
+    assert listing.position_after(("", "")) == 0
+
+    # Columns as a snapshot stores them, with names packed, read back the same
+    packed = DocumentListing.from_columns(listing.root, listing.dirs, listing.dir_index,
+                                          PackedNames(*PackedNames.pack(listing.names)), listing.sizes, listing.mtimes)
+    assert list(packed.entries(1, 4)) == expected[1:4]
+    assert [record.to_dict() for record in packed.records()] == listing.to_dicts()
+    assert packed.record(0).extension == ".txt"
+
+
+def test_snapshot_round_trip(tmp_path):
+    from docreader_listing import DocumentListing
+    from docreader_snapshot import read_snapshot, write_snapshot
+
+    entries = [("", "a.md", 4, 1.5), ("sub", "caf\udce9.md", 9, 2.5), ("sub/deeper", "z.txt", 0, 3.0)]
+    details = [["sub", {"mtime_ns": i}] for i in range(2500)]
+    path = tmp_path / "index.snap"
+    write_snapshot(str(path), {"root": str(tmp_path), "version": 7}, DocumentListing(str(tmp_path), entries), details)
+
+    header, listing, load_details = read_snapshot(str(path))
+    assert (header["root"], header["version"], header["count"]) == (str(tmp_path), 7, 3)
+    assert list(listing) == entries
+    assert list(load_details()) == details
+
+    data = path.read_bytes()
+    path.write_bytes(data[:-100])
+    with pytest.raises(ValueError):
+        read_snapshot(str(path))
+    path.write_bytes(b"not a snapshot" + data)
+    with pytest.raises(ValueError):
+        read_snapshot(str(path))
+
+
+def test_warm_start_serves_the_snapshot_until_revalidated(tmp_path):
+    from docreader_index import DocumentIndex
+
+    docs = tmp_path / "docs"
+    (docs / "sub").mkdir(parents=True)
+    (docs / "a.md").write_text("one\n")
+    (docs / "sub" / "b.md").write_text("two\n")
+    cache_dir = str(tmp_path / "cache")
+    first = DocumentIndex(str(docs), [".md"], cache_dir=cache_dir, refresh_interval=0)
+    first.refresh()
+    first.save()
+
+    # Changes made while the server was not running
+    (docs / "sub" / "b.md").unlink()
+    (docs / "c.md").write_text("three\n")
+
+    restarted = DocumentIndex(str(docs), [".md"], cache_dir=cache_dir, refresh_interval=0)
+    release = threading.Event()
+    revalidated = threading.Event()
+
+    def revalidate():
+        release.wait(5)
+        restarted.refresh()
+        revalidated.set()
+
+    assert restarted.warm_start(revalidate)
+    assert restarted.stale
+    assert sorted(entry[1] for entry in restarted.iter_entries()) == ["a.md", "b.md"]
+    assert restarted.stats()["snapshot_load_ms"] is not None
+
+    release.set()
+    assert revalidated.wait(5)
+    deadline = time.monotonic() + 5
+    while restarted.stale:
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+    assert sorted(entry[1] for entry in restarted.iter_entries()) == ["a.md", "c.md"]
+    # A second warm start is a no-op, and a snapshot for other extensions is not used
+    assert not restarted.warm_start(revalidate)
+    assert not DocumentIndex(str(docs), [".txt"], cache_dir=cache_dir).load()
+
+
+def test_forged_chunk_cursor_is_rejected(tmp_path):
+    from mcp_document_reader import encode_cursor
+
+    path = tmp_path / "doc.md"
+    write_sectioned(path, 2)
+    key = os.path.normcase(str(path))
+    for chunk in ["-1", "x", " 2", "1_0", "²"]:
+        response = call_tool("chunk_document", {"file_path": str(path), "cursor": encode_cursor((key, chunk))})
+        assert response["error"]["code"] == -32602, chunk
+    assert "Chunk 2/" in tool_text("chunk_document", {"file_path": str(path), "max_tokens": 64,
+                                                      "cursor": encode_cursor((key, "1"))})
+
+
+@pytest.mark.parametrize("value", ["false", 0, 1, [], {}])
+def test_include_hash_must_be_a_boolean(tmp_path, value):
+    path = tmp_path / "notes.md"
+    path.write_text("hello\n")
+    for name, arguments in [("get_document_info", {"file_path": str(path)}),
+                            ("get_documents_info", {"file_paths": [str(path)]})]:
+        response = call_tool(name, dict(arguments, include_hash=value))
+        assert response["error"]["code"] == -32602
+        assert "include_hash must be true or false" in response["error"]["message"]
+
+
+def test_batch_read_truncates_a_file_that_grew(tmp_path, monkeypatch):
+    path = tmp_path / "growing.md"
+    path.write_text("x" * 9 + "\n")
+    infos = mcp_document_reader.get_documents_info([str(path)])
+    path.write_text("x" * 99 + "\n")
+    monkeypatch.setattr(mcp_document_reader, "get_documents_info", lambda file_paths, include_hash=False: infos)
+
+    result = mcp_document_reader.read_documents([str(path)], max_total_size=50)
+    [read] = result["results"]
+    assert read["success"] and read["truncated"]
+    assert read["content"] == "x" * 10
+    assert result["bytes_read"] == 10
+
+
+@pytest.mark.parametrize("params", [["read_document"], "read_document", 3, True,
+                                    {"name": "read_document", "arguments": ["notes.md"]},
+                                    {"name": "read_document", "arguments": "notes.md"}])
+def test_non_object_params_are_invalid(params):
+    response = mcp_document_reader.handle_mcp_request({"jsonrpc": "2.0", "id": 1, "method": "tools/call", "params": params})
+    assert response["error"]["code"] == -32602
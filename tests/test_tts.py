@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Tests for the Windows TTS synthesizer host, speech queue, segmentation, voice catalog and audio cache
+Runs them against tools/fake_tts_host.py, so they need neither Windows nor audio
+"""
+
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from tts_cache import AudioCache, audio_key, wav_duration
+from tts_host import SynthesizerHost, HostError
+from tts_jobs import SpeechQueue, SpeechJob, DONE, CANCELLED, SPEAKING
+
+FAKE_HOST = [sys.executable, os.path.join(REPO_ROOT, "tools", "fake_tts_host.py")]
+VOICE = "Microsoft Zira Desktop"
+# Long enough that a job is still speaking when the test acts on it
+LONG_TEXT = "x" * 2000
+
+
+@pytest.fixture
+def host(monkeypatch):
+    # 1 ms per character: LONG_TEXT speaks for two seconds unless cancelled
+    monkeypatch.setenv("FAKE_TTS_CHAR_DELAY", "0.001")
+    host = SynthesizerHost(FAKE_HOST)
+    yield host
+    host.close()
+
+
+@pytest.fixture
+def queue(host):
+    spoken = []
+
+    def speak(job: SpeechJob):
+        spoken.append(job.text)
+        responses = host.pipeline("speak", [{"text": job.text, "voice": VOICE, "rate": 0}], lambda item: 10,
+                                  proceed=lambda: not job.cancel_requested)
+        return {"success": responses[-1].get("ok"), "error": responses[-1].get("error")}
+
+    queue = SpeechQueue(speak, host.interrupt)
+    queue.spoken = spoken
+    yield queue
+    queue.close()
+
+
+def wait_for_status(job: SpeechJob, status: str, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while job.status != status:
+        assert time.monotonic() < deadline, f"job {job.id} stayed {job.status}"
+        time.sleep(0.005)
+
+
+def test_request_round_trip(host):
+    assert host.request("ping", timeout=10) == {"id": 1, "ok": True}
+    voices = host.request("voices", timeout=10)["voices"]
+    assert VOICE in [voice["name"] for voice in voices]
+    assert host.stats()["running"]
+
+
+def test_pipeline_speaks_every_item_in_order(host):
+    items = [{"text": f"sentence {i}", "voice": VOICE, "rate": 0} for i in range(5)]
+    responses = host.pipeline("speak", items, lambda item: 10)
+    assert [response["ok"] for response in responses] == [True] * 5
+    assert [response["id"] for response in responses] == sorted(response["id"] for response in responses)
+
+
+def test_pipeline_stops_at_first_failure(host):
+    items = [{"text": "fine", "voice": VOICE, "rate": 0}, {"text": "bad", "voice": "No Such Voice", "rate": 0},
+             {"text": "never", "voice": VOICE, "rate": 0}]
+    responses = host.pipeline("speak", items, lambda item: 10)
+    assert len(responses) == 2
+    assert not responses[-1]["ok"]
+
+
+def test_host_restarts_after_it_dies(host):
+    host.request("ping", timeout=10)
+    host._process.kill()
+    host._process.wait()
+    assert host.request("ping", timeout=10)["ok"]
+    assert host.restarts == 1
+
+
+def test_queue_speaks_jobs_in_order(queue):
+    jobs = [queue.submit(f"job {i}") for i in range(5)]
+    for job in jobs:
+        assert job.wait(10)
+        assert job.status == DONE
+    assert queue.spoken == [f"job {i}" for i in range(5)]
+
+
+def test_cancel_queued_job_is_never_spoken(queue):
+    speaking = queue.submit(LONG_TEXT)
+    waiting = queue.submit("waiting")
+    wait_for_status(speaking, SPEAKING)
+    assert queue.cancel(waiting.id)
+    assert waiting.status == CANCELLED
+    assert queue.cancel(speaking.id)
+    assert speaking.wait(5)
+    assert queue.spoken == [LONG_TEXT]
+
+
+def test_cancel_speaking_job_keeps_the_host(queue, host):
+    speaking = queue.submit(LONG_TEXT)
+    following = queue.submit("following")
+    wait_for_status(speaking, SPEAKING)
+    assert queue.cancel(speaking.id)
+    # Far sooner than the two seconds LONG_TEXT would take to speak
+    assert speaking.wait(1)
+    assert speaking.status == CANCELLED
+    assert following.wait(5)
+    assert following.status == DONE
+    assert host.is_running()
+    assert host.stats()["restarts"] == 0
+
+
+def test_cancel_finished_job_is_refused(queue):
+    job = queue.submit("done")
+    assert job.wait(5)
+    assert not queue.cancel(job.id)
+    assert job.status == DONE
+
+
+def test_flush_cancels_current_and_queued_jobs(queue, host):
+    jobs = [queue.submit(LONG_TEXT) for _ in range(3)]
+    wait_for_status(jobs[0], SPEAKING)
+    assert queue.flush() == 3
+    for job in jobs:
+        assert job.wait(1)
+        assert job.status == CANCELLED
+    assert queue.spoken == [LONG_TEXT]
+
+    after = queue.submit("after the flush")
+    assert after.wait(5)
+    assert after.status == DONE
+    assert host.stats()["restarts"] == 0
+
+
+def render_with(host: SynthesizerHost, text: str):
+    """A render callback for AudioCache.store that renders text through the host"""
+    def render(temp_path: str):
+        response = host.request("render", timeout=10, text=text, voice=VOICE, rate=0, path=temp_path)
+        if not response.get("ok"):
+            raise HostError(f"Render failed: {response.get('error')}")
+    return render
+
+
+def test_cache_miss_renders_then_hits(host, tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=10 * 1024 * 1024)
+    key = audio_key("hello there", VOICE, 0)
+    assert cache.lookup(key) is None
+    path = cache.store(key, render_with(host, "hello there"))
+    assert wav_duration(path) > 0
+    assert cache.lookup(key) == path
+    assert host.request("play", timeout=10, path=path, duration=wav_duration(path))["ok"]
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    # Another voice or rate is a different entry
+    assert cache.lookup(audio_key("hello there", VOICE, 1)) is None
+
+
+def test_cache_survives_restart_and_evicts_oldest(host, tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=10 * 1024 * 1024)
+    keys = [audio_key(f"phrase {i}", VOICE, 0) for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.store(key, render_with(host, f"phrase {i}"))
+        # mtimes carry the recency order across restarts
+        os.utime(cache.path(key), (i, i))
+    size = os.path.getsize(cache.path(keys[0]))
+
+    reopened = AudioCache(str(tmp_path), max_bytes=2 * size)
+    reopened.load()
+    assert reopened.stats()["entries"] == 2
+    assert reopened.lookup(keys[0]) is None
+    assert reopened.lookup(keys[2]) is not None
+    assert not os.path.exists(cache.path(keys[0]))
+
+
+def test_cancelled_render_is_not_cached(host, tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=10 * 1024 * 1024)
+    key = audio_key(LONG_TEXT, VOICE, 0)
+    host.start()
+    threading.Timer(0.2, host.interrupt).start()
+    with pytest.raises(HostError):
+        cache.store(key, render_with(host, LONG_TEXT))
+    assert cache.lookup(key) is None
+    assert os.listdir(tmp_path) == []
+    assert host.stats()["restarts"] == 0
+
+
+def test_cache_keeps_temp_files_other_renders_may_still_write(tmp_path):
+    fresh = tmp_path / ("a" * 64 + ".wav.999.1.tmp")
+    stale = tmp_path / ("b" * 64 + ".wav.998.1.tmp")
+    fresh.write_bytes(b"RIFF")
+    stale.write_bytes(b"RIFF")
+    old = time.time() - 3600
+    os.utime(stale, (old, old))
+
+    cache = AudioCache(str(tmp_path), max_bytes=1024)
+    cache.load()
+    assert fresh.exists()
+    assert not stale.exists()
+
+
+def test_cache_stats_do_not_rescan(host, tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=10 * 1024 * 1024)
+    assert cache.stats()["loaded"] is False
+    key = audio_key("hello there", VOICE, 0)
+    path = cache.store(key, render_with(host, "hello there"))
+    size = os.path.getsize(path)
+    # Files written behind the cache's back are not picked up by stats
+    (tmp_path / ("c" * 64 + ".wav")).write_bytes(b"x" * 10)
+    stats = cache.stats()
+    assert (stats["loaded"], stats["entries"], stats["bytes"]) == (True, 1, size)
+
+
+def test_host_answers_each_request_exactly_once():
+    # Raw protocol, so a duplicate or missing response cannot be hidden by SynthesizerHost skipping ids
+    process = subprocess.Popen(FAKE_HOST, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+                               env=dict(os.environ, FAKE_TTS_CHAR_DELAY="0"))
+
+    def send(*requests):
+        process.stdin.write("".join(json.dumps(request) + "\n" for request in requests))
+        process.stdin.flush()
+
+    assert json.loads(process.stdout.readline()) == {"ready": True}
+    send({"id": 1, "op": "ping"}, {"id": 2, "op": "voices"},
+         {"id": 3, "op": "speak", "text": "hi", "voice": VOICE, "rate": 0},
+         {"id": 4, "op": "speak", "text": "hi", "voice": "No Such Voice", "rate": 0},
+         {"id": 5, "op": "bogus"})
+    responses = [json.loads(process.stdout.readline()) for _ in range(5)]
+    assert [(response["id"], response["ok"]) for response in responses] == \
+        [(1, True), (2, True), (3, True), (4, False), (5, False)]
+
+    # A cancel with nothing running gets no response of its own
+    send({"op": "cancel"}, {"id": 6, "op": "ping"})
+    output, _ = process.communicate(timeout=10)
+    assert [json.loads(line) for line in output.splitlines()] == [{"id": 6, "ok": True}]
+
+
+@pytest.fixture
+def tts(monkeypatch, host):
+    """The TTS server module speaking through the fake host"""
+    import mcp_tts_windows
+    from tts_voices import VoiceCatalog
+
+    monkeypatch.setattr(mcp_tts_windows, "synth_host", host)
+    monkeypatch.setattr(mcp_tts_windows, "voice_catalog", VoiceCatalog(mcp_tts_windows.fetch_voices))
+    return mcp_tts_windows
+
+
+def test_segmentation_breaks_sentences_then_clauses_then_words(tts):
+    text = "First one. Second one!  Third?\n\n- bullet one\n- bullet two\nwrapped line"
+    assert tts.segment_text(text) == ["First one.", "Second one!", "Third?", "- bullet one", "- bullet two wrapped line"]
+    assert tts.segment_text("alpha beta, gamma delta, epsilon zeta", 14) == ["alpha beta,", "gamma delta,", "epsilon zeta"]
+    # A single word longer than the limit is kept whole rather than cut
+    assert tts.segment_text("a " + "x" * 20 + " b", 5) == ["a", "x" * 20, "b"]
+    assert tts.split_long("aa, bb, cc", tts.CLAUSE_BREAK, 6) == ["aa,", "bb, cc"]
+    assert tts.segment_text(" \n\n ") == []
+
+
+def test_long_text_is_spoken_as_a_pipeline_of_segments(tts, host):
+    result = tts.speak_text_windows("One sentence. " * 5 + "x " * 400, VOICE, 0)
+    assert result["success"], result
+    # Five sentences, then 800 characters of words packed into 300-character segments
+    assert result["segments"] == 8
+    assert host.stats()["requests"] >= 8
+
+
+def test_voice_names_resolve_against_the_catalog(tts):
+    # As main() does when the host starts
+    tts.voice_catalog.load()
+    assert tts.resolve_voice(None) == VOICE
+    assert tts.resolve_voice("Default") == VOICE
+    assert tts.resolve_voice("microsoft david desktop") == "Microsoft David Desktop"
+    assert tts.resolve_voice("zira") == VOICE
+    # "Desktop" matches both voices, so it is not guessed
+    assert tts.resolve_voice("Desktop") is None
+    assert tts.resolve_voice("Hazel") is None
+    response = tts.server.handle_request({"jsonrpc": "2.0", "id": 1, "method": "tools/call",
+                                          "params": {"name": "windows_tts", "arguments": {"text": "hi", "voice": "Hazel"}}})
+    assert "Unknown voice: Hazel. Available voices: Microsoft David Desktop, Microsoft Zira Desktop" in \
+        response["result"]["content"][0]["text"]
+
+
+def test_voice_resolution_does_not_wait_for_the_catalog(tts, monkeypatch):
+    from tts_voices import VoiceCatalog
+
+    release = threading.Event()
+
+    def fetch():
+        # Stands in for a voices request queued behind speech on the host
+        release.wait(5)
+        return tts.fetch_voices()
+
+    monkeypatch.setattr(tts, "voice_catalog", VoiceCatalog(fetch))
+    try:
+        started = time.monotonic()
+        assert tts.resolve_voice("zira") == "zira"
+        assert tts.resolve_voice(None) == VOICE
+        assert time.monotonic() - started < 1
+    finally:
+        release.set()
+    deadline = time.monotonic() + 5
+    while tts.resolve_voice("zira") != VOICE:
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+    assert tts.voice_catalog.stats()["fetches"] == 1
+
+
+@pytest.mark.parametrize("rate", ["fast", 2.5, True, 11, -11])
+def test_invalid_rate_is_rejected(tts, rate):
+    jobs = sum(tts.speech_queue.stats()["jobs_by_status"].values())
+    response = tts.server.handle_request({"jsonrpc": "2.0", "id": 1, "method": "tools/call",
+                                          "params": {"name": "windows_tts", "arguments": {"text": "hi", "rate": rate}}})
+    assert response["error"]["code"] == -32602
+    assert sum(tts.speech_queue.stats()["jobs_by_status"].values()) == jobs
+
+
+def test_voice_catalog_serves_stale_list_while_refreshing():
+    from tts_voices import VoiceCatalog
+
+    lists = [[{"name": "Old"}], [{"name": "New"}]]
+    fetched = threading.Event()
+
+    def fetch():
+        fetched.set()
+        return lists.pop(0)
+
+    catalog = VoiceCatalog(fetch, ttl=60)
+    assert catalog.resolve("old") == "Old"
+    assert catalog.voices() == [{"name": "Old"}]
+    assert catalog.stats()["fetches"] == 1
+
+    # Past the TTL the stale list is still answered at once while one refresh runs behind it
+    catalog.ttl = 0
+    fetched.clear()
+    assert catalog.voices() == [{"name": "Old"}]
+    assert fetched.wait(5)
+    deadline = time.monotonic() + 5
+    while catalog.voices() != [{"name": "New"}]:
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_voice_catalog_keeps_its_list_when_a_fetch_fails():
+    from tts_voices import VoiceCatalog
+
+    results = [[{"name": "Zira"}], HostError("host is gone")]
+
+    def fetch():
+        result = results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    catalog = VoiceCatalog(fetch, ttl=60)
+    assert catalog.load() == [{"name": "Zira"}]
+    assert catalog.load() == [{"name": "Zira"}]
+    # With no catalog at all, names pass through for the synthesizer to judge
+    assert VoiceCatalog(lambda: [], ttl=60).resolve("Anything") == "Anything"
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Fake synthesizer host for testing the Windows TTS MCP server on any platform
+Speaks the tts_host JSON-lines protocol, sleeping instead of producing audio
+
+Usage: TTS_HOST_COMMAND="python tools/fake_tts_host.py" python mcp_tts_windows.py
+"""
+
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import wave
+
+VOICES = [
+    {"name": "Microsoft David Desktop", "culture": "en-US", "gender": "Male"},
+    {"name": "Microsoft Zira Desktop", "culture": "en-US", "gender": "Female"},
+]
+
+# Seconds of simulated speech per character of text
+CHAR_DELAY = float(os.environ.get("FAKE_TTS_CHAR_DELAY", "0.0005"))
+STARTUP_DELAY = float(os.environ.get("FAKE_TTS_STARTUP_DELAY", "0"))
+
+# Stand-in renderer output: silent 8 kHz mono audio as long as the simulated speech
+WAV_FRAME_RATE = 8000
+# How often a simulated operation checks for a cancel
+CANCEL_POLL = 0.005
+
+CANCELLED = {"ok": False, "cancelled": True, "error": "Cancelled"}
+
+# Sequence number of the latest {"op": "cancel"} line; requests read before it are cancelled
+cancelled_through = 0
+
+
+def play_for(seconds, seq):
+    """Sleep for seconds, returning False early if a cancel arrives for request seq"""
+    deadline = time.monotonic() + seconds
+    while seq > cancelled_through:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return True
+        time.sleep(min(remaining, CANCEL_POLL))
+    return False
+
+
+def handle(request, seq):
+    """Return the response for one protocol request, the seq-th line read"""
+    op = request.get("op")
+    if op in ("speak", "render", "play") and seq < cancelled_through:
+        return CANCELLED
+    if op == "speak":
+        voice = request.get("voice")
+        if voice not in [v["name"] for v in VOICES]:
+            return {"ok": False, "error": "Cannot set voice. No matching voice is installed or the voice was disabled."}
+        if not play_for(len(request.get("text", "")) * CHAR_DELAY, seq):
+            return CANCELLED
+        return {"ok": True}
+    if op == "render":
+        voice = request.get("voice")
+        if voice not in [v["name"] for v in VOICES]:
+            return {"ok": False, "error": "Cannot set voice. No matching voice is installed or the voice was disabled."}
+        duration = len(request.get("text", "")) * CHAR_DELAY
+        if not play_for(duration, seq):
+            return CANCELLED
+        with wave.open(request["path"], "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(WAV_FRAME_RATE)
+            f.writeframes(b"\0\0" * int(duration * WAV_FRAME_RATE))
+        return {"ok": True}
+    if op == "play":
+        try:
+            with wave.open(request.get("path", ""), "rb") as f:
+                duration = f.getnframes() / f.getframerate()
+        except (OSError, EOFError, wave.Error) as e:
+            return {"ok": False, "error": f"Cannot play file: {e}"}
+        if not play_for(duration, seq):
+            return CANCELLED
+        return {"ok": True}
+    if op == "voices":
+        return {"ok": True, "voices": VOICES}
+    if op == "ping":
+        return {"ok": True}
+    return {"ok": False, "error": f"Unknown op: {op}"}
+
+
+def read_requests(requests):
+    """Number incoming requests in a thread so a cancel is seen while one is being handled"""
+    global cancelled_through
+    for seq, line in enumerate(sys.stdin, 1):
+        line = line.strip()
+        if not line:
+            continue
+        request = json.loads(line)
+        if request.get("op") == "cancel":
+            cancelled_through = seq
+        else:
+            requests.put((seq, request))
+    requests.put(None)
+
+
+def main():
+    time.sleep(STARTUP_DELAY)
+    print(json.dumps({"ready": True}), flush=True)
+    requests = queue.Queue()
+    threading.Thread(target=read_requests, args=(requests,), daemon=True).start()
+    while True:
+        item = requests.get()
+        if item is None:
+            break
+        seq, request = item
+        response = {"id": request.get("id"), **handle(request, seq)}
+        print(json.dumps(response), flush=True)
+
+
+if __name__ == "__main__":
+    main()
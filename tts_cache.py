@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Rendered-audio cache for the Windows TTS MCP server
+Content-addressed WAV files keyed by (text, voice, rate) with size-bounded LRU eviction
+"""
+
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import wave
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Optional
+
+
+# A temp file untouched for this long was left by an interrupted render; younger
+# ones may still be written by another server process sharing the directory
+STALE_TEMP_SECONDS = 600
+
+
+def get_audio_cache_dir() -> str:
+    """Get the directory rendered speech is cached in"""
+    cache_dir = os.environ.get("TTS_AUDIO_CACHE_DIR")
+    if cache_dir:
+        return cache_dir
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "mcp-windows-tts", "audio")
+
+
+def get_audio_cache_limit(default_mb: int = 100) -> int:
+    """Read the audio cache size limit in megabytes from TTS_AUDIO_CACHE_MB, returning bytes"""
+    try:
+        return int(float(os.environ.get("TTS_AUDIO_CACHE_MB", default_mb)) * 1024 * 1024)
+    except ValueError:
+        return default_mb * 1024 * 1024
+
+
+def audio_key(text: str, voice: str, rate: int) -> str:
+    """Content address for a rendered utterance"""
+    return hashlib.sha256(json.dumps([text, voice, rate]).encode("utf-8")).hexdigest()
+
+
+def wav_duration(path: str) -> float:
+    """Length of a WAV file in seconds, or 0.0 if it cannot be read"""
+    try:
+        with wave.open(path, "rb") as f:
+            rate = f.getframerate()
+            return f.getnframes() / rate if rate else 0.0
+    except (OSError, EOFError, wave.Error):
+        return 0.0
+
+
+class AudioCache:
+    """On-disk LRU of rendered WAV files bounded by total bytes
+
+    Recency is kept in memory and mirrored to file mtimes, so the eviction
+    order survives restarts. The directory is scanned once, on first use or
+    load(); after that entry and byte totals are kept as files come and go.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        # key -> size in bytes, least recently used first
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._bytes = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def path(self, key: str) -> str:
+        """File path for a cache key"""
+        return os.path.join(self.directory, key + ".wav")
+
+    def load(self):
+        """Scan the directory now rather than on the first lookup"""
+        with self._lock:
+            self._load()
+
+    def _load(self):
+        """Pick up files left by earlier runs, oldest first"""
+        if self._loaded:
+            return
+        self._loaded = True
+        found = []
+        stale_before = time.time() - STALE_TEMP_SECONDS
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.name.endswith(".wav") and entry.is_file():
+                        stat = entry.stat()
+                        found.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+                    elif entry.name.endswith(".tmp"):
+                        try:
+                            if entry.stat().st_mtime < stale_before:
+                                os.remove(entry.path)
+                        except OSError:
+                            pass
+        except OSError:
+            return
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._bytes += size
+        self._evict()
+
+    def lookup(self, key: str) -> Optional[str]:
+        """Return the cached WAV path for a key, or None on a miss"""
+        with self._lock:
+            self._load()
+            if key in self._entries:
+                path = self.path(key)
+                try:
+                    os.utime(path)
+                except OSError:
+                    # Deleted behind our back
+                    self._bytes -= self._entries.pop(key)
+                    self.misses += 1
+                    return None
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return path
+            self.misses += 1
+            return None
+
+    def store(self, key: str, render: Callable[[str], None]) -> str:
+        """Render a missing entry via render(temp_path) and add it to the cache
+
+        render must write a complete WAV file to the path it is given; the file is
+        moved into place only after render returns, so readers never see a partial file.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            render(temp_path)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        size = os.path.getsize(path)
+        with self._lock:
+            self._load()
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)
+            self._entries[key] = size
+            self._bytes += size
+            self._evict(keep=key)
+        return path
+
+    def _evict(self, keep: str = None):
+        """Drop least recently used files until under max_bytes, never evicting keep"""
+        while self._bytes > self.max_bytes and self._entries:
+            key = next(iter(self._entries))
+            if key == keep:
+                break
+            size = self._entries.pop(key)
+            self._bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self.path(key))
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss/eviction counters and current occupancy, without touching the disk"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "loaded": self._loaded,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Persistent speech synthesizer host for the Windows TTS MCP server
+Keeps one PowerShell SpeechSynthesizer process alive and drives it over a JSON-lines pipe
+"""
+
+import base64
+import json
+import os
+import queue
+import shlex
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Callable, List, Optional
+
+# Host protocol: one JSON object per line in each direction.
+#   request:  {"id": 1, "op": "speak", "text": "...", "voice": "...", "rate": 0}
+#             render takes the same fields plus "path" and writes a WAV file; play takes "path" and "duration"
+#   response: {"id": 1, "ok": true, ...} or {"id": 1, "ok": false, "error": "..."}
+# {"op": "cancel"} (no id, no response) stops the current operation and fails every
+# request received before it with {"ok": false, "cancelled": true}; the host keeps running.
+# The host prints {"ready": true} once the synthesizer is loaded.
+HOST_SCRIPT = r"""
+$ErrorActionPreference = 'Stop'
+$utf8 = New-Object System.Text.UTF8Encoding $false
+[Console]::OutputEncoding = $utf8
+# Console.In reads synchronously even through ReadLineAsync, so read the raw stream instead
+$stdin = New-Object System.IO.StreamReader ([Console]::OpenStandardInput(), $utf8)
+$pending = $stdin.ReadLineAsync()
+$backlog = New-Object 'System.Collections.Generic.Queue[string]'
+Add-Type -AssemblyName System.Speech
+$synth = New-Object System.Speech.Synthesis.SpeechSynthesizer
+$synth.SetOutputToDefaultAudioDevice()
+
+function Send-Response($resp) {
+    [Console]::Out.WriteLine(($resp | ConvertTo-Json -Compress -Depth 5))
+    [Console]::Out.Flush()
+}
+
+function Test-Cancel([string]$line) {
+    try { return ($line | ConvertFrom-Json).op -eq 'cancel' } catch { return $false }
+}
+
+function Send-Cancelled([string]$line) {
+    $id = $null
+    try { $id = ($line | ConvertFrom-Json).id } catch { }
+    Send-Response @{ id = $id; ok = $false; cancelled = $true; error = 'Cancelled' }
+}
+
+# Next request line, or $null once stdin is closed
+function Read-Request {
+    if ($backlog.Count -gt 0) { return $backlog.Dequeue() }
+    $line = $script:pending.Result
+    if ($null -ne $line) { $script:pending = $stdin.ReadLineAsync() }
+    return $line
+}
+
+# Wait until & $done is true while reading stdin. Requests that arrive are kept for
+# later; a cancel runs & $stop and fails the kept requests. Returns $true if cancelled.
+function Wait-Operation([scriptblock]$done, [scriptblock]$stop) {
+    while (-not (& $done)) {
+        if (-not $script:pending.Wait(20)) { continue }
+        $line = $script:pending.Result
+        if ($null -ne $line) { $script:pending = $stdin.ReadLineAsync() }
+        if ($null -eq $line -or (Test-Cancel $line)) {
+            & $stop
+            while (-not (& $done)) { Start-Sleep -Milliseconds 10 }
+            while ($backlog.Count -gt 0) { Send-Cancelled $backlog.Dequeue() }
+            return $true
+        }
+        $backlog.Enqueue($line)
+    }
+    return $false
+}
+
+function Invoke-Speak($req) {
+    $synth.SelectVoice([string]$req.voice)
+    $synth.Rate = [int]$req.rate
+    $prompt = $synth.SpeakAsync([string]$req.text)
+    return Wait-Operation { $prompt.IsCompleted } { $synth.SpeakAsyncCancelAll() }
+}
+
+Send-Response @{ ready = $true }
+while ($null -ne ($line = Read-Request)) {
+    $req = $null
+    try {
+        $req = $line | ConvertFrom-Json
+        # Branches only set the single response to send (none for a cancel); continue in a switch
+        # would just leave the switch, not skip the send below
+        $response = @{ id = $req.id; ok = $true }
+        $cancelled = $false
+        switch ($req.op) {
+            'cancel' { $response = $null }
+            'speak' { $cancelled = Invoke-Speak $req }
+            'render' {
+                $synth.SetOutputToWaveFile([string]$req.path)
+                try { $cancelled = Invoke-Speak $req } finally { $synth.SetOutputToDefaultAudioDevice() }
+            }
+            'play' {
+                $player = New-Object System.Media.SoundPlayer ([string]$req.path)
+                try {
+                    $player.Load()
+                    $clock = [System.Diagnostics.Stopwatch]::StartNew()
+                    $player.Play()
+                    $cancelled = Wait-Operation { $clock.Elapsed.TotalSeconds -ge [double]$req.duration } { $player.Stop() }
+                } finally { $player.Dispose() }
+            }
+            'voices' {
+                $response.voices = @($synth.GetInstalledVoices() | ForEach-Object {
+                    @{ name = $_.VoiceInfo.Name; culture = $_.VoiceInfo.Culture.Name; gender = $_.VoiceInfo.Gender.ToString() }
+                })
+            }
+            'ping' { }
+            default { $response = @{ id = $req.id; ok = $false; error = "Unknown op: $($req.op)" } }
+        }
+        if ($cancelled) {
+            $response = @{ id = $req.id; ok = $false; cancelled = $true; error = 'Cancelled' }
+        }
+        if ($null -ne $response) {
+            Send-Response $response
+        }
+    } catch {
+        Send-Response @{ id = $(if ($req) { $req.id } else { $null }); ok = $false; error = $_.Exception.Message }
+    }
+}
+"""
+
+
+def cancelled_response(request_id: int = None) -> Dict[str, Any]:
+    """The response to a request that was cancelled before or while the host ran it"""
+    return {"id": request_id, "ok": False, "cancelled": True, "error": "Cancelled"}
+
+
+class HostError(Exception):
+    """The synthesizer host failed to start, died, or timed out"""
+
+
+def get_host_command() -> List[str]:
+    """Get the host command; TTS_HOST_COMMAND overrides it (e.g. with a fake host for testing)"""
+    override = os.environ.get("TTS_HOST_COMMAND")
+    if override:
+        return shlex.split(override, posix=(os.name != "nt"))
+    encoded = base64.b64encode(HOST_SCRIPT.encode("utf-16-le")).decode("ascii")
+    return ["powershell", "-NoProfile", "-NonInteractive", "-ExecutionPolicy", "Bypass",
+            "-EncodedCommand", encoded]
+
+
+class SynthesizerHost:
+    """A resident synthesizer child process, restarted automatically if it dies"""
+
+    def __init__(self, command: List[str] = None, start_timeout: float = 20.0):
+        self.command = command or get_host_command()
+        self.start_timeout = start_timeout
+        self.restarts = 0
+        self._process: Optional[subprocess.Popen] = None
+        self._lines: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._next_id = 0
+        self.interrupts = 0
+        # Serializes whole request/response exchanges and process (re)starts
+        self._lock = threading.RLock()
+        # Serializes writes to the host's stdin, which interrupt() does without the lock above
+        self._write_lock = threading.Lock()
+
+    def _reader(self, process: subprocess.Popen, lines: queue.Queue):
+        """Forward host stdout lines into a queue; None marks end of stream"""
+        try:
+            for line in process.stdout:
+                lines.put(line)
+        except (OSError, ValueError):
+            pass
+        lines.put(None)
+
+    def is_running(self) -> bool:
+        """Check whether the host process is alive"""
+        return self._process is not None and self._process.poll() is None
+
+    def start(self):
+        """Start the host if it is not running and wait until it reports ready"""
+        with self._lock:
+            if self.is_running():
+                return
+            if self._process is not None:
+                self.restarts += 1
+            try:
+                process = subprocess.Popen(
+                    self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=sys.stderr,
+                    text=True, encoding="utf-8", bufsize=1,
+                    creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0)
+                )
+            except OSError as e:
+                raise HostError(f"Could not start synthesizer host: {e}")
+            lines: queue.Queue = queue.Queue()
+            threading.Thread(target=self._reader, args=(process, lines), daemon=True,
+                             name="tts-host-reader").start()
+            self._process = process
+            self._lines = lines
+            deadline = time.monotonic() + self.start_timeout
+            while True:
+                message = self._next_message(deadline)
+                if message.get("ready"):
+                    return
+
+    def _next_message(self, deadline: float) -> Dict[str, Any]:
+        """Read the next JSON message from the host, raising HostError on death or timeout"""
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                line = self._lines.get(timeout=max(remaining, 0.001))
+            except queue.Empty:
+                self._kill()
+                raise HostError("Synthesizer host timed out")
+            if line is None:
+                self._kill()
+                raise HostError("Synthesizer host exited")
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                return json.loads(line)
+            except ValueError:
+                # Stray non-protocol output (e.g. a PowerShell warning) is ignored
+                continue
+
+    def send(self, op: str, proceed: Callable[[], bool] = None, **params) -> Optional[int]:
+        """Write one request to the host, starting it if needed, and return its id
+
+        Returns None without sending if proceed() returns False. proceed is checked
+        under the same lock as interrupt() writes, so a request is either sent before
+        a concurrent interrupt (which then cancels it) or not at all.
+        """
+        with self._lock:
+            self.start()
+            with self._write_lock:
+                if proceed is not None and not proceed():
+                    return None
+                self._next_id += 1
+                request_id = self._next_id
+                line = json.dumps({"id": request_id, "op": op, **params}) + "\n"
+                try:
+                    self._process.stdin.write(line)
+                    self._process.stdin.flush()
+                except (OSError, ValueError):
+                    self._kill()
+                    raise HostError("Synthesizer host exited")
+            return request_id
+
+    def receive(self, request_id: int, timeout: float) -> Dict[str, Any]:
+        """Wait for the response to a request sent earlier; older responses are skipped"""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while True:
+                message = self._next_message(deadline)
+                if message.get("id") == request_id:
+                    return message
+
+    def request(self, op: str, timeout: float, proceed: Callable[[], bool] = None, **params) -> Dict[str, Any]:
+        """Send a request and wait for its response
+
+        If the host turns out to be dead when writing, the request is sent once more
+        to a fresh host; once a host has accepted a request it is never resent. If
+        proceed() returns False the request is not sent and a cancelled response is returned.
+        """
+        with self._lock:
+            try:
+                request_id = self.send(op, proceed, **params)
+            except HostError:
+                request_id = self.send(op, proceed, **params)
+            if request_id is None:
+                return cancelled_response()
+            return self.receive(request_id, timeout)
+
+    def pipeline(self, op: str, items: List[Dict[str, Any]], timeout_for: Callable[[Dict[str, Any]], float],
+                 depth: int = 2, proceed: Callable[[], bool] = None) -> List[Dict[str, Any]]:
+        """Send a sequence of requests keeping up to depth of them outstanding
+
+        The host reads request N+1 as soon as it finishes N, so there is no round trip
+        between items. Each response gets its own timeout from timeout_for(item).
+        Stops at the first failed response or when proceed() returns False; returns the
+        responses received, in order, or a single cancelled response if nothing was sent.
+        """
+        responses: List[Dict[str, Any]] = []
+        pending: "deque[tuple]" = deque()
+        with self._lock:
+            next_item = 0
+            while next_item < len(items) or pending:
+                while next_item < len(items) and len(pending) < depth:
+                    item = items[next_item]
+                    try:
+                        request_id = self.send(op, proceed, **item)
+                    except HostError:
+                        if pending or responses:
+                            raise
+                        request_id = self.send(op, proceed, **item)
+                    if request_id is None:
+                        next_item = len(items)
+                        break
+                    pending.append((request_id, item))
+                    next_item += 1
+                if not pending:
+                    if not responses:
+                        responses.append(cancelled_response())
+                    break
+                request_id, item = pending.popleft()
+                response = self.receive(request_id, timeout_for(item))
+                responses.append(response)
+                if not response.get("ok") or (proceed is not None and not proceed()):
+                    break
+        return responses
+
+    def stats(self) -> Dict[str, Any]:
+        """Return whether the host is running, how often it was restarted and interrupted"""
+        return {"running": self.is_running(), "restarts": self.restarts, "requests": self._next_id,
+                "interrupts": self.interrupts}
+
+    def _kill(self):
+        """Terminate the host process; the next request starts a new one"""
+        process = self._process
+        if process is not None and process.poll() is None:
+            try:
+                process.kill()
+                process.wait(timeout=5)
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+
+    def interrupt(self):
+        """Stop whatever the host is doing and cancel the requests already sent to it
+
+        The host stays up. Deliberately does not take the request lock, so it can be
+        called while another thread is waiting on a response; that waiter gets a
+        response with "cancelled" set. A host that cannot be written to is killed.
+        """
+        process = self._process
+        if process is None or process.poll() is not None:
+            return
+        with self._write_lock:
+            self.interrupts += 1
+            try:
+                process.stdin.write(json.dumps({"op": "cancel"}) + "\n")
+                process.stdin.flush()
+            except (OSError, ValueError):
+                self._kill()
+
+    def close(self):
+        """Shut the host down by closing its stdin, killing it if it does not exit"""
+        with self._lock:
+            process = self._process
+            if process is None:
+                return
+            try:
+                process.stdin.close()
+                process.wait(timeout=2)
+            except (OSError, ValueError, subprocess.TimeoutExpired):
+                self._kill()
+            self._process = None
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Speech job queue for the Windows TTS MCP server
+Speech requests are queued and spoken by a background worker so the server stays responsive
+"""
+
+import itertools
+import threading
+import time
+from collections import deque, OrderedDict
+from typing import Dict, Any, Callable, Optional
+
+QUEUED = "queued"
+SPEAKING = "speaking"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+
+class SpeechJob:
+    """One queued utterance and its progress"""
+
+    __slots__ = ("id", "text", "voice", "rate", "status", "error", "created", "started", "finished",
+                 "cache", "cancel_requested", "_done")
+
+    def __init__(self, job_id: int, text: str, voice: Optional[str], rate: int, cache: bool = False):
+        self.id = job_id
+        self.text = text
+        self.voice = voice
+        self.rate = rate
+        self.cache = cache
+        self.status = QUEUED
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.cancel_requested = False
+        self._done = threading.Event()
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block until the job has finished, returning False on timeout"""
+        return self._done.wait(timeout)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Describe the job for status responses"""
+        return {
+            "id": self.id,
+            "status": self.status,
+            "text": self.text[:50] + ('...' if len(self.text) > 50 else ''),
+            "voice": self.voice,
+            "rate": self.rate,
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished
+        }
+
+
+class SpeechQueue:
+    """FIFO of speech jobs drained by a single background worker
+
+    speak(job) performs the synthesis and returns a result dict with "success"
+    and "error"; interrupt() stops the utterance currently being spoken. interrupt()
+    is called with the queue lock held, so it must not block on speak().
+    """
+
+    def __init__(self, speak: Callable[[SpeechJob], Dict[str, Any]], interrupt: Callable[[], None],
+                 max_queued: int = 100, history: int = 200):
+        self._speak = speak
+        self._interrupt = interrupt
+        self.max_queued = max_queued
+        self.history = history
+        self._queue: "deque[SpeechJob]" = deque()
+        self._jobs: "OrderedDict[int, SpeechJob]" = OrderedDict()
+        self._current: Optional[SpeechJob] = None
+        self._ids = itertools.count(1)
+        self._cond = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+        self._closed = False
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, daemon=True, name="tts-speech-worker")
+            self._worker.start()
+
+    def submit(self, text: str, voice: Optional[str] = None, rate: int = 0, cache: bool = False) -> SpeechJob:
+        """Queue an utterance and return its job immediately"""
+        with self._cond:
+            if len(self._queue) >= self.max_queued:
+                raise OverflowError(f"Speech queue is full ({self.max_queued} jobs waiting)")
+            job = SpeechJob(next(self._ids), text, voice, rate, cache)
+            self._queue.append(job)
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.history:
+                oldest_id, oldest = next(iter(self._jobs.items()))
+                if oldest.status not in FINISHED_STATES:
+                    break
+                del self._jobs[oldest_id]
+            self._ensure_worker()
+            self._cond.notify()
+            return job
+
+    def get(self, job_id: int) -> Optional[SpeechJob]:
+        """Look up a job by id"""
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the current job, the waiting jobs and recent history"""
+        with self._cond:
+            return {
+                "current": self._current.to_dict() if self._current else None,
+                "queued": [job.to_dict() for job in self._queue],
+                "recent": [job.to_dict() for job in self._jobs.values() if job.status in FINISHED_STATES][-10:]
+            }
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue length and job counts by status"""
+        with self._cond:
+            counts = {QUEUED: 0, SPEAKING: 0, DONE: 0, FAILED: 0, CANCELLED: 0}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return {"queued": len(self._queue), "jobs_by_status": counts, "max_queued": self.max_queued}
+
+    def _finish(self, job: SpeechJob, status: str, error: str = None):
+        job.status = status
+        job.error = error
+        job.finished = time.time()
+        job._done.set()
+
+    def cancel(self, job_id: int) -> bool:
+        """Cancel a queued job, or interrupt it if it is being spoken"""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED_STATES:
+                return False
+            if job.status == QUEUED:
+                self._queue.remove(job)
+                self._finish(job, CANCELLED)
+                return True
+            job.cancel_requested = True
+            # The worker needs the lock to move on to the next job, so this cannot hit another one
+            if self._current is job:
+                self._interrupt()
+            return True
+
+    def flush(self) -> int:
+        """Barge-in: cancel every queued job and interrupt the current one; returns jobs cancelled"""
+        with self._cond:
+            cancelled = 0
+            while self._queue:
+                self._finish(self._queue.popleft(), CANCELLED)
+                cancelled += 1
+            current = self._current
+            if current is not None:
+                current.cancel_requested = True
+                cancelled += 1
+                self._interrupt()
+            return cancelled
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                job = self._queue.popleft()
+                job.status = SPEAKING
+                job.started = time.time()
+                self._current = job
+            try:
+                result = self._speak(job)
+                error = None if result.get("success") else result.get("error") or result.get("message")
+            except Exception as e:
+                error = str(e)
+            with self._cond:
+                self._current = None
+                if job.cancel_requested:
+                    self._finish(job, CANCELLED)
+                elif error:
+                    self._finish(job, FAILED, error)
+                else:
+                    self._finish(job, DONE)
+
+    def close(self):
+        """Stop the worker after cancelling outstanding jobs"""
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Voice catalog for the Windows TTS MCP server
+Keeps the installed voice list in memory with a TTL, refreshing it in the background
+"""
+
+import threading
+import time
+from typing import Dict, Any, Callable, List, Optional
+
+
+class VoiceCatalog:
+    """In-memory list of installed voices
+
+    fetch() returns the voice dicts ("name", "culture", "gender") or raises. A stale
+    catalog keeps answering while one background refresh replaces it, so only the very
+    first lookup ever waits on fetch().
+    """
+
+    def __init__(self, fetch: Callable[[], List[Dict[str, str]]], ttl: float = 300.0):
+        self._fetch = fetch
+        self.ttl = ttl
+        self._voices: List[Dict[str, str]] = []
+        self._loaded_at: Optional[float] = None
+        self._refreshing = False
+        self.lookups = 0
+        self.misses = 0
+        self.fetches = 0
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    def load(self) -> List[Dict[str, str]]:
+        """Fetch the voice list now; on failure the previous list is kept"""
+        loaded_at = self._loaded_at
+        with self._load_lock:
+            if self._loaded_at != loaded_at:
+                # Another thread finished a load while this one waited
+                return self._voices
+            self.fetches += 1
+            try:
+                voices = self._fetch()
+            except Exception:
+                return self._voices
+            with self._lock:
+                if voices:
+                    self._voices = voices
+                    self._loaded_at = time.monotonic()
+                return self._voices
+
+    def refresh_in_background(self):
+        """Start a background load unless one is already running"""
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.load()
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, daemon=True, name="tts-voice-refresh").start()
+
+    def voices(self, wait: bool = True) -> List[Dict[str, str]]:
+        """Return the voice list, loading it on first use and refreshing it in the background once stale
+
+        With wait=False a catalog that was never loaded starts a background load and an
+        empty list is returned instead of waiting on fetch().
+        """
+        with self._lock:
+            self.lookups += 1
+            voices = self._voices
+            loaded_at = self._loaded_at
+            if loaded_at is None:
+                self.misses += 1
+        if loaded_at is None:
+            if not wait:
+                self.refresh_in_background()
+                return voices
+            return self.load()
+        if time.monotonic() - loaded_at > self.ttl:
+            self.refresh_in_background()
+        return voices
+
+    def resolve(self, name: str, wait: bool = True) -> Optional[str]:
+        """Map a voice name to an installed voice
+
+        Matches exactly, then ignoring case, then as a unique substring ("zira" for
+        "Microsoft Zira Desktop"). Returns None if nothing matches. When no catalog
+        could be loaded (or, with wait=False, none is loaded yet) the name is returned
+        unchanged for the synthesizer to judge.
+        """
+        voices = self.voices(wait)
+        if not voices:
+            return name
+        names = [voice["name"] for voice in voices]
+        if name in names:
+            return name
+        lowered = name.lower()
+        for candidate in names:
+            if candidate.lower() == lowered:
+                return candidate
+        matches = [candidate for candidate in names if lowered in candidate.lower()]
+        if len(matches) == 1:
+            return matches[0]
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return catalog size, age and how many lookups were answered from memory"""
+        with self._lock:
+            return {
+                "voices": len(self._voices),
+                "age_seconds": time.monotonic() - self._loaded_at if self._loaded_at is not None else None,
+                "lookups": self.lookups,
+                "misses": self.misses,
+                "fetches": self.fetches,
+                "hit_rate": (self.lookups - self.misses) / self.lookups if self.lookups else 0.0
+            }